@@ -17,6 +17,9 @@ def create_app(config_name=None):
 
     # Initialize database
     db.init_app(app)
+    # Per-request SQL timing, registered first so it sees every statement of a request
+    from app import instrumentation
+    instrumentation.init_app(app)
     # Initialize Flask-Migrate
     migrate = Migrate(app, db)
     
@@ -25,6 +28,9 @@ def create_app(config_name=None):
     from app.patients.models import Patient, Vitals, Allergy, Medication, PatientUser, Nationality
     from app.auth.models import Role
     from app.system_params.models import SystemParameter, PayorType, PayorDetail, IDType, Ethnicity, Language
+    # Cached role names for permission checks
+    from app.auth import permissions
+    permissions.init_app(app)
 
     # Initialize Flask-Login
     login_manager = LoginManager()
@@ -32,17 +38,11 @@ def create_app(config_name=None):
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
 
-    # User loader function
-    from app.auth.models import User
-    from app.patients.models import PatientUser
+    # User loader function: a cached principal for a staff or patient-portal user
+    from app.auth.principal import load_principal
     @login_manager.user_loader
     def load_user(id):
-        # Try to load as regular User first
-        user = User.query.get(id)
-        if user:
-            return user
-        # If not found, try to load as PatientUser
-        return PatientUser.query.get(id)
+        return load_principal(id)
 
     # Register blueprints
     from app.auth import bp as auth_bp
@@ -1,8 +1,10 @@
 from flask import render_template, redirect, url_for, flash, request
 from flask_login import current_user
+from sqlalchemy.orm import selectinload
 from app.admin import bp
 from app.admin.forms import RoleForm, UserRoleForm, UserForm, RemoveRoleForm
 from app.auth.models import Role, User, db
+from app.instrumentation import HISTOGRAM_BUCKETS, get_registry
 from app.utils import roles_required
 
 @bp.route('/admin', methods=['GET'])
@@ -13,7 +15,7 @@ def dashboard():
 @bp.route('/admin/users', methods=['GET'])
 @roles_required('Admin')
 def list_users():
-    users = User.query.all()
+    users = User.query.options(selectinload(User.roles)).all()
     return render_template('admin/users/list.html', users=users)
 
 @bp.route('/admin/users/<id>', methods=['GET'])
@@ -232,4 +234,17 @@ def assign_role(user_id):
             flash('Invalid role or user does not have this role.', 'error')
         return redirect(url_for('admin.assign_role', user_id=user.id))
 
-    return render_template('admin/users/assign_role.html', form=form, remove_role_form=remove_role_form, user=user)
\ No newline at end of file
+    return render_template('admin/users/assign_role.html', form=form, remove_role_form=remove_role_form, user=user)
+
+@bp.route('/admin/perf', methods=['GET'])
+@roles_required('Admin')
+def perf():
+    # Statistics are kept per worker process, since it started or was last reset
+    return render_template('admin/perf.html', summaries=get_registry().summaries(), buckets=HISTOGRAM_BUCKETS)
+
+@bp.route('/admin/perf/reset', methods=['POST'])
+@roles_required('Admin')
+def reset_perf():
+    get_registry().reset()
+    flash('Performance statistics reset.')
+    return redirect(url_for('admin.perf'))
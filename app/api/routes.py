@@ -1,64 +1,80 @@
-from flask import jsonify, request
+from datetime import datetime
+from flask import Response, current_app, jsonify, request, url_for
 from app.api import bp
-from app.system_params.models import IDType, PayorType, PayorDetail, Ethnicity, Language, Race
-from app.patients.models import Nationality
+from app.utils import roles_required
+from app.patients.search import find_patients, DEFAULT_PAGE_SIZE
+from app.system_params.bootstrap import get_registration_bootstrap, registration_bootstrap_version
+from app.system_params.reference import DEFAULT_MAX_AGE, get_reference_table, reference_response
 from app.models import db
 
-# API routes for system parameters
+# API routes for system parameters, served from the reference data cache
 @bp.route('/id-types', methods=['GET'])
 def get_id_types():
-    id_types = IDType.query.filter_by(is_active=True).all()
-    return jsonify([{'id': it.id, 'name': it.name} for it in id_types])
+    id_types = get_reference_table('id_types')
+    return reference_response(id_types, [{'id': it.id, 'name': it.name} for it in id_types.items(active_only=True)])
 
 @bp.route('/payor-types', methods=['GET'])
 def get_payor_types():
-    payor_types = PayorType.query.filter_by(is_active=True).all()
-    return jsonify([{'id': pt.id, 'name': pt.name} for pt in payor_types])
+    payor_types = get_reference_table('payor_types')
+    return reference_response(payor_types,
+                              [{'id': pt.id, 'name': pt.name} for pt in payor_types.items(active_only=True)])
 
 @bp.route('/payor-details/<int:payor_type_id>', methods=['GET'])
 def get_payor_details(payor_type_id):
-    payor_details = PayorDetail.query.filter_by(payor_type_id=payor_type_id, is_active=True).all()
-    return jsonify([{'id': pd.id, 'name': pd.name} for pd in payor_details])
+    payor_details = get_reference_table('payor_details')
+    return reference_response(payor_details, [
+        {'id': pd.id, 'name': pd.name}
+        for pd in payor_details.items(active_only=True, parent_id=payor_type_id)
+    ])
 
 @bp.route('/ethnicities', methods=['GET'])
 def get_ethnicities():
-    search = request.args.get('search', '')
-    print(f"API /ethnicities called with search: '{search}'")
-    query = Ethnicity.query
-    if search:
-        query = query.filter(Ethnicity.name.ilike(f'%{search}%'))
-    ethnicities = query.all()
-    print(f"Found {len(ethnicities)} ethnicities")
-    results = [{'id': e.name, 'text': e.name} for e in ethnicities]
-    print(f"Returning results: {results[:5]}...")  # Print first 5 results
-    return jsonify({
+    ethnicities = get_reference_table('ethnicities')
+    results = [{'id': e.name, 'text': e.name} for e in ethnicities.search(request.args.get('search', ''))]
+    return reference_response(ethnicities, {
         'results': results
     })
 
 @bp.route('/languages', methods=['GET'])
 def get_languages():
-    search = request.args.get('search', '')
-    print(f"API /languages called with search: '{search}'")
-    query = Language.query
-    if search:
-        query = query.filter(Language.name.ilike(f'%{search}%'))
-    languages = query.all()
-    print(f"Found {len(languages)} languages")
-    results = [{'id': l.name, 'text': l.name} for l in languages]
-    print(f"Returning results: {results[:5]}...")  # Print first 5 results
-    return jsonify({
+    languages = get_reference_table('languages')
+    results = [{'id': l.name, 'text': l.name} for l in languages.search(request.args.get('search', ''))]
+    return reference_response(languages, {
         'results': results
     })
 
 @bp.route('/nationalities', methods=['GET'])
 def get_nationalities():
-    nationalities = Nationality.query.all()
-    return jsonify([{'id': n.id, 'name': n.name} for n in nationalities])
+    nationalities = get_reference_table('nationalities')
+    return reference_response(nationalities, [{'id': n.id, 'name': n.name} for n in nationalities.items()])
 
 @bp.route('/races', methods=['GET'])
 def get_races():
-    races = Race.query.all()
-    return jsonify([{'id': r.name, 'text': r.name} for r in races])
+    races = get_reference_table('races')
+    return reference_response(races, [{'id': r.name, 'text': r.name} for r in races.items()])
+
+@bp.route('/registration-bootstrap', methods=['GET'])
+def registration_bootstrap():
+    """Every lookup list of the patient registration form in one versioned document."""
+    bootstrap = get_registration_bootstrap()
+    use_gzip = 'gzip' in request.accept_encodings
+    response = Response(bootstrap.gzip_body if use_gzip else bootstrap.body, mimetype='application/json')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.set_etag(f'registration-{bootstrap.version}')
+    if request.args.get('v') == bootstrap.version:
+        # A versioned URL always names the same document
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        max_age = current_app.config.get('REFERENCE_DATA_MAX_AGE', DEFAULT_MAX_AGE)
+        response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    return response.make_conditional(request)
+
+@bp.app_template_global()
+def registration_bootstrap_url():
+    """URL of the current registration bootstrap document, for pages that embed it."""
+    return url_for('api.registration_bootstrap', v=registration_bootstrap_version())
 
 # API routes for patients
 @bp.route('/patients', methods=['GET'])
@@ -66,6 +82,38 @@ def get_patients():
     # TODO: Implement patient listing logic
     return jsonify({'patients': []})
 
+@bp.route('/patients/search', methods=['GET'])
+@roles_required('Receptionist', 'Doctor')
+def search_patients():
+    try:
+        date_of_birth = request.args.get('date_of_birth')
+        page = find_patients(
+            q=request.args.get('q'),
+            first_name=request.args.get('first_name'),
+            last_name=request.args.get('last_name'),
+            date_of_birth=datetime.strptime(date_of_birth, '%Y-%m-%d').date() if date_of_birth else None,
+            gender=request.args.get('gender'),
+            phone=request.args.get('phone'),
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        )
+    except ValueError:
+        return jsonify({'error': 'Invalid search parameters'}), 400
+
+    return jsonify({
+        'patients': [{
+            'id': p.id,
+            'mrn': p.mrn,
+            'first_name': p.first_name,
+            'last_name': p.last_name,
+            'date_of_birth': p.date_of_birth.isoformat() if p.date_of_birth else None,
+            'gender': p.gender,
+            'phone': p.phone,
+            'id_card_number': p.id_card_number
+        } for p in page.patients],
+        'next_cursor': page.next_cursor
+    })
+
 @bp.route('/patients/<int:id>', methods=['GET'])
 def get_patient(id):
     # TODO: Implement patient retrieval logic
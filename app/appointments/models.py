@@ -1,10 +1,22 @@
 import uuid
+from sqlalchemy import event
 from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
 from app.patients.models import Patient
 from app.auth.models import User, db
 from app.hospital.models import Room
 
+# System parameter holding the appointment change counter
+CHANGE_VERSION_PARAMETER = 'appointment_version'
+
 class Appointment(db.Model):
+    __table_args__ = (
+        # Day and calendar views filter on a scheduled_time range, alone or with a doctor or status
+        db.Index('ix_appointment_scheduled_time', 'scheduled_time'),
+        db.Index('ix_appointment_doctor_id_scheduled_time', 'doctor_id', 'scheduled_time'),
+        db.Index('ix_appointment_status_scheduled_time', 'status', 'scheduled_time'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     patient_id = db.Column(db.String(36), db.ForeignKey('patient.id'), nullable=False)
     doctor_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
@@ -18,8 +30,57 @@ class Appointment(db.Model):
     created_by = db.Column(db.String(36))  # User ID of creator
     updated_by = db.Column(db.String(36))  # User ID of last updater
     additional_data = db.Column(JSONB)  # JSONB column for additional data (PostgreSQL) or JSON for other databases
+    # Value of the appointment change counter when this appointment was last created or updated
+    change_version = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
     
     # Relationships
     patient = db.relationship('Patient', backref=db.backref('appointments', lazy=True))
     doctor = db.relationship('User', backref=db.backref('appointments', lazy=True))
-    room = db.relationship('Room', backref=db.backref('appointments', lazy=True))
\ No newline at end of file
+    room = db.relationship('Room', backref=db.backref('appointments', lazy=True))
+
+
+class AppointmentTombstone(db.Model):
+    """Record of a deleted appointment, so incremental calendar syncs can remove it."""
+    id = db.Column(db.Integer, primary_key=True)
+    appointment_id = db.Column(db.String(36), nullable=False)
+    change_version = db.Column(db.Integer, nullable=False, index=True)
+    deleted_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+
+def current_change_version(connection=None):
+    """
+    Get the current value of the appointment change counter.
+
+    Args:
+        connection: Connection to read with; defaults to the current session's connection
+
+    Returns:
+        int: The counter value, 0 if no appointment has been changed yet
+    """
+    from app.system_params.models import get_counter_parameter
+    return get_counter_parameter(CHANGE_VERSION_PARAMETER, connection)
+
+
+def next_change_version(connection):
+    """Increment the appointment change counter in the caller's transaction and return the new value."""
+    from app.system_params.models import increment_counter_parameter
+    return increment_counter_parameter(
+        CHANGE_VERSION_PARAMETER, connection, 'Change counter for incremental appointment calendar sync'
+    )
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_appointment_changes(session, flush_context, instances):
+    # Stamp created and updated appointments with a new change version and leave
+    # tombstones for deleted ones
+    changed = [obj for obj in session.new if isinstance(obj, Appointment)]
+    changed += [obj for obj in session.dirty if isinstance(obj, Appointment) and session.is_modified(obj)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Appointment)]
+    if not changed and not deleted:
+        return
+
+    version = next_change_version(session.connection())
+    for appointment in changed:
+        appointment.change_version = version
+    for appointment in deleted:
+        session.add(AppointmentTombstone(appointment_id=appointment.id, change_version=version))
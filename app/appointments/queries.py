@@ -0,0 +1,149 @@
+"""
+Read-side queries for appointments.
+
+Appointment lists and the calendar feed only need names, not full Patient,
+User and Room objects, so they are read with one joined query that selects
+just the columns they show. An optional ``[start, end)`` window on the
+scheduled time limits the rows to what the caller displays, e.g. the week
+visible in the calendar.
+
+The calendar feed is versioned by the appointment change counter (see
+app.appointments.models). A client that passes the version of its last sync
+as ``since`` only receives the appointments changed after it, plus the ids of
+appointments it should drop.
+"""
+from datetime import datetime, timedelta
+
+from app import db
+from app.appointments.models import Appointment, AppointmentTombstone, current_change_version
+from app.auth.models import User
+from app.hospital.models import Room
+from app.patients.models import Patient
+
+# Columns of one appointment row, as shown in lists and the calendar
+APPOINTMENT_COLUMNS = (
+    Appointment.id,
+    Appointment.patient_id,
+    Appointment.doctor_id,
+    Appointment.room_id,
+    Appointment.scheduled_time,
+    Appointment.duration,
+    Appointment.status,
+    Patient.first_name.label('patient_first_name'),
+    Patient.last_name.label('patient_last_name'),
+    User.first_name.label('doctor_first_name'),
+    User.last_name.label('doctor_last_name'),
+    Room.name.label('room_name'),
+)
+
+
+def parse_window_bound(value):
+    """
+    Parse a window boundary such as FullCalendar's ``start``/``end`` parameters.
+
+    Accepts ISO 8601 dates and datetimes, with or without a UTC offset. Scheduled
+    times are stored as naive local times, so an offset is dropped and the wall-clock
+    time is kept.
+
+    Args:
+        value (str): The boundary, or None/empty for an open window
+
+    Returns:
+        datetime: The boundary, or None
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 date or datetime
+    """
+    if not value:
+        return None
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+
+def appointment_rows(start=None, end=None, doctor_id=None, status=None, changed_since=None):
+    """
+    Get appointments with patient, doctor and room names in a single query.
+
+    Args:
+        start (datetime): Only appointments scheduled at or after this time
+        end (datetime): Only appointments scheduled before this time
+        doctor_id (str): Only appointments of this doctor
+        status (str): Only appointments with this status
+        changed_since (int): Only appointments created or updated after this change version
+
+    Returns:
+        list: Column-limited rows ordered by scheduled time
+    """
+    query = db.session.query(*APPOINTMENT_COLUMNS).join(
+        Patient, Patient.id == Appointment.patient_id
+    ).join(
+        User, User.id == Appointment.doctor_id
+    ).outerjoin(
+        Room, Room.id == Appointment.room_id
+    )
+    # Plain range comparisons on scheduled_time so an index on it can be used
+    if start is not None:
+        query = query.filter(Appointment.scheduled_time >= start)
+    if end is not None:
+        query = query.filter(Appointment.scheduled_time < end)
+    if doctor_id is not None:
+        query = query.filter(Appointment.doctor_id == doctor_id)
+    if status is not None:
+        query = query.filter(Appointment.status == status)
+    if changed_since is not None:
+        query = query.filter(Appointment.change_version > changed_since)
+    return query.order_by(Appointment.scheduled_time, Appointment.id).all()
+
+
+def calendar_event(row):
+    """Format an appointment row as a FullCalendar event."""
+    patient_name = f"{row.patient_first_name} {row.patient_last_name}"
+    end_time = row.scheduled_time + timedelta(minutes=row.duration or 0)
+    return {
+        'id': row.id,
+        'title': f"{patient_name} - {row.doctor_first_name} {row.doctor_last_name}",
+        'start': row.scheduled_time.isoformat(),
+        'end': end_time.isoformat(),
+        'appointment_id': row.id,
+        'extendedProps': {
+            'patient_name': patient_name,
+            'doctor_name': f"Dr. {row.doctor_first_name} {row.doctor_last_name}",
+            'room_name': row.room_name,
+            'status': row.status,
+            'appointment_id': row.id
+        }
+    }
+
+
+def calendar_feed(start=None, end=None, since=None):
+    """
+    Build the calendar feed for a window, in full or as a delta.
+
+    Args:
+        start (datetime): Start of the visible window
+        end (datetime): End of the visible window
+        since (int): Change version of the client's last sync, or None for a full load
+
+    Returns:
+        dict: ``version`` to send back as ``since`` next time, ``delta`` telling whether
+        this is a delta, ``events`` to add or replace and, for deltas, ``removed`` ids
+    """
+    # Read the version first; rows changed in the meantime are simply sent again next time
+    version = current_change_version()
+    if since is None or since < 0 or since > version:
+        events = [calendar_event(row) for row in appointment_rows(start=start, end=end)]
+        return {'version': version, 'delta': False, 'events': events}
+
+    events = []
+    removed = []
+    for row in appointment_rows(changed_since=since):
+        # Appointments moved out of the window are dropped by the client
+        if (start is None or row.scheduled_time >= start) and (end is None or row.scheduled_time < end):
+            events.append(calendar_event(row))
+        else:
+            removed.append(row.id)
+    removed.extend(
+        appointment_id for appointment_id, in db.session.query(AppointmentTombstone.appointment_id).filter(
+            AppointmentTombstone.change_version > since
+        )
+    )
+    return {'version': version, 'delta': True, 'events': events, 'removed': removed}
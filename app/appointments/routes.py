@@ -1,24 +1,25 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import current_user
 from app.appointments import bp
 from app.appointments.forms import AppointmentForm
 from app.appointments.models import Appointment, db
+from app.appointments.queries import appointment_rows, calendar_feed, parse_window_bound
+from app.appointments.windows import day_window, hospital_today
 from app.patients.models import Patient
 from app.auth.models import User
 
 @bp.route('/appointments', methods=['GET'])
 def list_appointments():
-    appointments = Appointment.query.all()
-    
-    # Preload related data to avoid N+1 query problem
-    for appointment in appointments:
-        appointment.patient = Patient.query.get(appointment.patient_id)
-        appointment.doctor = User.query.get(appointment.doctor_id)
-        if appointment.room_id:
-            from app.hospital.models import Room
-            appointment.room = Room.query.get(appointment.room_id)
-        else:
-            appointment.room = None
+    # Optional window, e.g. /appointments?start=2024-01-01&end=2024-01-08
+    try:
+        start = parse_window_bound(request.args.get('start'))
+        end = parse_window_bound(request.args.get('end'))
+    except ValueError:
+        flash('Invalid date range.', 'error')
+        start = end = None
+
+    # Patient, doctor and room names come from the same joined query
+    appointments = appointment_rows(start=start, end=end)
     return render_template('appointments/list.html', appointments=appointments, current_user=current_user)
 
 @bp.route('/appointments/<id>', methods=['GET'])
@@ -91,7 +92,7 @@ def edit_appointment(id):
         return redirect(url_for('auth.login'))
     
     # Allow access to Receptionist, Doctor, and Admin roles
-    if not (current_user.has_role('Receptionist') or current_user.has_role('Doctor') or current_user.has_role('Admin')):
+    if not current_user.has_role('Receptionist', 'Doctor', 'Admin'):
         flash('You do not have permission to edit appointments.', 'error')
         return redirect(url_for('appointments.list_appointments'))
     
@@ -157,7 +158,7 @@ def calendar():
         return redirect(url_for('auth.login'))
     
     # Allow access to Receptionist, Doctor, Nurse, and Admin roles
-    if not (current_user.has_role('Receptionist') or current_user.has_role('Doctor') or current_user.has_role('Nurse') or current_user.has_role('Admin')):
+    if not current_user.has_role('Receptionist', 'Doctor', 'Nurse', 'Admin'):
         flash('You do not have permission to view the calendar.', 'error')
         return redirect(url_for('appointments.list_appointments'))
     
@@ -171,45 +172,25 @@ def calendar_data():
         return {'error': 'Authentication required'}, 401
     
     # Allow access to Receptionist, Doctor, Nurse, and Admin roles
-    if not (current_user.has_role('Receptionist') or current_user.has_role('Doctor') or current_user.has_role('Nurse') or current_user.has_role('Admin')):
+    if not current_user.has_role('Receptionist', 'Doctor', 'Nurse', 'Admin'):
         return {'error': 'Permission denied'}, 403
     
-    # Get all appointments
-    appointments = Appointment.query.all()
-    
-    # Format appointments for FullCalendar
-    events = []
-    for appointment in appointments:
-        # Get patient and doctor details
-        patient = Patient.query.get(appointment.patient_id)
-        doctor = User.query.get(appointment.doctor_id)
-        
-        # Get room details if room is assigned
-        room_name = None
-        if appointment.room_id:
-            from app.hospital.models import Room
-            room = Room.query.get(appointment.room_id)
-            if room:
-                room_name = room.name
-        
-        # Create event object for FullCalendar
-        event = {
-            'id': appointment.id,
-            'title': f"{patient.first_name} {patient.last_name} - {doctor.first_name} {doctor.last_name}",
-            'start': appointment.scheduled_time.isoformat(),
-            'end': (appointment.scheduled_time.replace(minute=appointment.scheduled_time.minute + appointment.duration)).isoformat(),
-            'appointment_id': appointment.id,
-            'extendedProps': {
-                'patient_name': f"{patient.first_name} {patient.last_name}",
-                'doctor_name': f"Dr. {doctor.first_name} {doctor.last_name}",
-                'room_name': room_name,
-                'status': appointment.status,
-                'appointment_id': appointment.id
-            }
-        }
-        events.append(event)
-    
-    return {'events': events}
+    # FullCalendar asks for the visible range only
+    try:
+        start = parse_window_bound(request.args.get('start'))
+        end = parse_window_bound(request.args.get('end'))
+    except ValueError:
+        return {'error': 'Invalid start or end'}, 400
+    since = request.args.get('since', type=int)
+    
+    # Full load, or only the changes since the client's last sync
+    feed = calendar_feed(start=start, end=end, since=since)
+    
+    # The feed for a given URL only changes when the change counter moves
+    response = jsonify(feed)
+    response.set_etag(f"appointments-{feed['version']}")
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
 
 @bp.route('/appointments/today', methods=['GET'])
@@ -220,26 +201,21 @@ def today_appointments():
         return redirect(url_for('auth.login'))
     
     # Check if user has doctor or receptionist role
-    if not (current_user.has_role('Doctor') or current_user.has_role('Receptionist')):
+    if not current_user.has_role('Doctor', 'Receptionist'):
         flash('You do not have permission to view today\'s appointments.', 'error')
         return redirect(url_for('appointments.list_appointments'))
     
-    # Get today's date
-    from datetime import datetime, date
-    today = date.today()
+    # Get today's date at the hospital
+    today = hospital_today()
     
     # Get appointments for today
     # For doctors, show only their appointments
     # For receptionists, show all appointments
+    window = day_window(today)
     if current_user.has_role('Doctor'):
-        appointments = Appointment.query.filter(
-            Appointment.doctor_id == current_user.id,
-            db.func.date(Appointment.scheduled_time) == today
-        ).all()
+        appointments = appointment_rows(start=window.start, end=window.end, doctor_id=current_user.id)
     else:  # Receptionist
-        appointments = Appointment.query.filter(
-            db.func.date(Appointment.scheduled_time) == today
-        ).all()
+        appointments = appointment_rows(start=window.start, end=window.end)
     
     
     return render_template('appointments/today.html', appointments=appointments, today=today)
@@ -253,7 +229,7 @@ def delete_appointment(id):
         return redirect(url_for('auth.login'))
     
     # Allow access to Receptionist, Doctor, and Admin roles
-    if not (current_user.has_role('Receptionist') or current_user.has_role('Doctor') or current_user.has_role('Admin')):
+    if not current_user.has_role('Receptionist', 'Doctor', 'Admin'):
         flash('You do not have permission to delete appointments.', 'error')
         return redirect(url_for('appointments.list_appointments'))
     
@@ -0,0 +1,99 @@
+"""
+Appointment time windows.
+
+Dashboards ask for today's appointments, the next few days', or the next
+few. These helpers turn such requests into half-open ``[start, end)`` ranges
+of ``scheduled_time``, or a single lower bound for "the next N". Queries,
+such as app.appointments.queries.appointment_rows, then compare the bare
+column, so the scheduled_time indexes serve them with a range scan. Wrapping
+the column in ``DATE()`` would rule out the indexes.
+
+Scheduled times are stored as naive wall-clock times of the hospital, so
+day boundaries are local midnights. "Today" is the current date in the
+hospital's time zone (the HOSPITAL_TIMEZONE setting), not the server's.
+"""
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+import pytz
+from flask import current_app
+from sqlalchemy import and_
+
+from app.appointments.models import Appointment
+
+DEFAULT_TIMEZONE = 'Asia/Jakarta'
+
+AppointmentWindow = namedtuple('AppointmentWindow', ['start', 'end'])
+
+
+def hospital_timezone():
+    """Get the hospital's time zone from the HOSPITAL_TIMEZONE setting."""
+    return pytz.timezone(current_app.config.get('HOSPITAL_TIMEZONE') or DEFAULT_TIMEZONE)
+
+
+def hospital_now():
+    """Get the current wall-clock time at the hospital, as a naive datetime like stored scheduled times."""
+    return datetime.now(hospital_timezone()).replace(tzinfo=None)
+
+
+def hospital_today():
+    """Get the current date at the hospital."""
+    return hospital_now().date()
+
+
+def day_window(day=None, days=1):
+    """
+    Get the window covering whole days.
+
+    Args:
+        day (date): First day of the window, or None for today at the hospital
+        days (int): Number of days covered
+
+    Returns:
+        AppointmentWindow: From midnight starting ``day`` to midnight after the last day
+    """
+    start = datetime.combine(day or hospital_today(), time.min)
+    return AppointmentWindow(start, start + timedelta(days=days))
+
+
+def upcoming_days_window(days, day=None):
+    """
+    Get the window covering the days after a day, e.g. the next 7 days after today.
+
+    Args:
+        days (int): Number of days covered
+        day (date): The day before the window, or None for today at the hospital
+
+    Returns:
+        AppointmentWindow: From the midnight after ``day`` to ``days`` days later
+    """
+    return day_window((day or hospital_today()) + timedelta(days=1), days=days)
+
+
+def in_window(window, column=Appointment.scheduled_time):
+    """Get the range condition selecting values of ``column`` inside a window."""
+    return and_(column >= window.start, column < window.end)
+
+
+def upcoming_appointments(limit, patient_id=None, doctor_id=None, status='Scheduled', after=None):
+    """
+    Get the next appointments from now on.
+
+    Args:
+        limit (int): Number of appointments
+        patient_id (str): Only appointments of this patient
+        doctor_id (str): Only appointments of this doctor
+        status (str): Only appointments with this status, or None for any status
+        after (datetime): Start from this wall-clock time instead of now at the hospital
+
+    Returns:
+        Query: At most ``limit`` appointments ordered by scheduled time
+    """
+    query = Appointment.query.filter(Appointment.scheduled_time >= (after or hospital_now()))
+    if patient_id is not None:
+        query = query.filter(Appointment.patient_id == patient_id)
+    if doctor_id is not None:
+        query = query.filter(Appointment.doctor_id == doctor_id)
+    if status is not None:
+        query = query.filter(Appointment.status == status)
+    return query.order_by(Appointment.scheduled_time, Appointment.id).limit(limit)
@@ -24,8 +24,8 @@ class User(UserMixin, db.Model):
     updated_by = db.Column(db.String(36))  # User ID of last updater
     additional_data = db.Column(JSONB)  # JSONB column for additional data (PostgreSQL) or JSON for other databases
 
-    # Many-to-many relationship with roles
-    roles = db.relationship('Role', secondary=user_roles, lazy='subquery',
+    # Many-to-many relationship with roles; permission checks use the cached role_names instead
+    roles = db.relationship('Role', secondary=user_roles, lazy='select',
                             backref=db.backref('users', lazy=True))
 
     def set_password(self, password):
@@ -37,6 +37,11 @@ class User(UserMixin, db.Model):
         # Check a hashed password
         return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
 
+    def get_id(self):
+        # Typed session id, so the user loader only queries the user table
+        from app.auth.principal import STAFF_PRINCIPAL, session_id
+        return session_id(STAFF_PRINCIPAL, self.id)
+
     def has_role(self, *roles):
         """
         Check if the user has any of the specified roles.
@@ -47,11 +52,18 @@ class User(UserMixin, db.Model):
         Returns:
             bool: True if user has any of the specified roles, False otherwise
         """
-        if not self.roles:
-            return False
+        return not self.role_names.isdisjoint(roles)
+
+    @property
+    def role_names(self):
+        """
+        Get the names of the user's roles, cached per request and per process.
 
-        user_roles = [role.name for role in self.roles]
-        return any(role in user_roles for role in roles)
+        Returns:
+            frozenset: Role names of the user
+        """
+        from app.auth.permissions import get_role_names
+        return get_role_names(self)
 
 class Role(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -0,0 +1,158 @@
+"""
+Role resolution for permission checks.
+
+A user's role names are resolved once into a frozenset and kept in two
+places: on ``flask.g`` for the rest of the request, and in a process-local
+cache shared by later requests. Checks such as ``User.has_role`` and
+``roles_required`` are then set intersections.
+
+Flushes that add or remove roles of a user, or rename or delete a role, bump
+the ``role_version`` system parameter in the same transaction. Each request
+reads the counter once, before its first check, and empties the process cache
+if the counter has moved, so a role revoked in one worker stops being honoured
+by every worker on its next request.
+"""
+import threading
+
+from flask import current_app, g, has_app_context, has_request_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.auth.models import Role, User, user_roles
+
+ROLE_VERSION_PARAMETER = 'role_version'
+
+# Session.info key marking a transaction that changed roles
+PENDING_CHANGE_KEY = 'role_change'
+
+_cache_lock = threading.Lock()
+
+
+class RoleCache:
+    """Role names per user id, as of one value of the role counter."""
+
+    def __init__(self, version):
+        self.version = version
+        self.roles = {}
+
+
+def init_app(app):
+    """
+    Start every request with an empty request-level role cache.
+
+    Args:
+        app (Flask): The application
+    """
+    # The app context, and so g, can outlive a request (e.g. under the test client)
+    app.before_request(_reset_request_roles)
+
+
+def _reset_request_roles():
+    g.pop('role_names', None)
+
+
+def load_role_names(user_id):
+    """
+    Load the names of a user's roles from the database, bypassing the caches.
+
+    Args:
+        user_id (str): User ID
+
+    Returns:
+        frozenset: Role names of the user
+    """
+    rows = db.session.query(Role.name).join(
+        user_roles, user_roles.c.role_id == Role.id
+    ).filter(user_roles.c.user_id == user_id)
+    return frozenset(name for (name,) in rows)
+
+
+def _request_roles():
+    # Role names resolved so far in this request; reads the role counter on first use
+    request_roles = g.get('role_names')
+    if request_roles is None:
+        from app.system_params.models import get_counter_parameter
+
+        version = get_counter_parameter(ROLE_VERSION_PARAMETER)
+        with _cache_lock:
+            cache = current_app.extensions.get('role_cache')
+            if cache is None or cache.version != version:
+                current_app.extensions['role_cache'] = RoleCache(version)
+        request_roles = g.role_names = {}
+    return request_roles
+
+
+def get_role_names(user):
+    """
+    Get the names of a user's roles.
+
+    Args:
+        user (User): A user
+
+    Returns:
+        frozenset: Role names of the user
+    """
+    state = inspect(user)
+    # Users not yet saved, or with role changes not yet flushed, are resolved from the relationship
+    if not has_request_context() or not state.persistent or state.attrs.roles.history.has_changes():
+        return frozenset(role.name for role in user.roles)
+    return role_names_for(user.id)
+
+
+def role_names_for(user_id):
+    """
+    Get the names of a saved user's roles by user ID, through the request and process caches.
+
+    Args:
+        user_id (str): User ID
+
+    Returns:
+        frozenset: Role names of the user
+    """
+    if not has_request_context():
+        return load_role_names(user_id)
+
+    request_roles = _request_roles()
+    names = request_roles.get(user_id)
+    if names is None:
+        cache = current_app.extensions['role_cache']
+        names = cache.roles.get(user_id)
+        if names is None:
+            names = load_role_names(user_id)
+            with _cache_lock:
+                if current_app.extensions.get('role_cache') is cache:
+                    cache.roles[user_id] = names
+        request_roles[user_id] = names
+    return names
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_role_changes(session, flush_context, instances):
+    # Bump the role counter when any user's set of role names may change
+    changed = any(isinstance(obj, Role) for obj in session.deleted)
+    for obj in session.dirty:
+        if changed:
+            break
+        if isinstance(obj, User):
+            changed = inspect(obj).attrs.roles.history.has_changes()
+        elif isinstance(obj, Role):
+            changed = inspect(obj).attrs.name.history.has_changes()
+    if not changed or session.info.get(PENDING_CHANGE_KEY):
+        return
+
+    from app.system_params.models import increment_counter_parameter
+    increment_counter_parameter(ROLE_VERSION_PARAMETER, session.connection(), 'Change counter of user roles')
+    session.info[PENDING_CHANGE_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _forget_request_roles(session):
+    # Later checks in the same request must see the committed roles
+    if session.info.pop(PENDING_CHANGE_KEY, None) and has_app_context():
+        g.pop('role_names', None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_role_change(session):
+    session.info.pop(PENDING_CHANGE_KEY, None)
@@ -0,0 +1,212 @@
+"""
+Session principals.
+
+Staff users and patient-portal users live in different tables. The id kept in
+the login session is prefixed with the principal kind ("user:<id>" or
+"patient:<id>"), so loading the logged-in principal hits only its own table.
+Sessions created before the prefix existed still load, by trying both tables.
+
+The columns requests need on every page (names, email) are kept in a
+process-local cache for PRINCIPAL_CACHE_TTL seconds, so most requests load the
+principal without a database round-trip. Commits that change a user or a
+patient user drop the affected entries from the cache straight away; changes
+committed by other workers are picked up once the entry expires.
+
+Roles are not part of the cached entry: ``has_role`` resolves them through
+app.auth.permissions, which checks the ``role_version`` counter on every
+request, so a revoked role stops being honoured by every worker on its next
+request.
+
+``current_user`` is a Principal. Cached fields are plain attributes; anything
+else (``roles``, ``patient``, ``set_password`` ...) is read from, and written
+to, the underlying model row, which is loaded on first use.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.auth.models import User
+
+STAFF_PRINCIPAL = 'user'
+PATIENT_PRINCIPAL = 'patient'
+
+DEFAULT_CACHE_TTL = 30
+
+# Session.info key collecting the principals changed by the current transaction
+PENDING_CHANGES_KEY = 'principal_changes'
+
+PrincipalData = namedtuple('PrincipalData', ['kind', 'id', 'fields'])
+
+# Columns cached for each kind of principal
+CACHED_FIELDS = {
+    STAFF_PRINCIPAL: ('username', 'email', 'first_name', 'last_name'),
+    PATIENT_PRINCIPAL: ('username', 'email', 'patient_id'),
+}
+
+_cache_lock = threading.Lock()
+
+
+def session_id(kind, principal_id):
+    """
+    Build the id stored in the login session for a principal.
+
+    Args:
+        kind (str): STAFF_PRINCIPAL or PATIENT_PRINCIPAL
+        principal_id (str): Primary key of the user or patient user
+
+    Returns:
+        str: The session id
+    """
+    return f"{kind}:{principal_id}"
+
+
+class Principal(UserMixin):
+    """The logged-in user or patient user of the current request."""
+
+    def __init__(self, data, record=None):
+        object.__setattr__(self, '_data', data)
+        object.__setattr__(self, '_record', record)
+        object.__setattr__(self, 'id', data.id)
+        object.__setattr__(self, 'kind', data.kind)
+        for name, value in data.fields.items():
+            object.__setattr__(self, name, value)
+
+    @property
+    def is_patient(self):
+        """bool: True for patient-portal users."""
+        return self.kind == PATIENT_PRINCIPAL
+
+    @property
+    def role_names(self):
+        """frozenset: Role names of a staff user, resolved per request; empty for patient users."""
+        if self.is_patient:
+            return frozenset()
+        from app.auth.permissions import role_names_for
+        return role_names_for(self.id)
+
+    @property
+    def record(self):
+        """The User or PatientUser row behind this principal, loaded on first use."""
+        if self._record is None:
+            object.__setattr__(self, '_record', db.session.get(_model(self.kind), self.id))
+        return self._record
+
+    def get_id(self):
+        return session_id(self.kind, self.id)
+
+    def has_role(self, *roles):
+        """
+        Check if the principal has any of the specified roles.
+
+        Args:
+            *roles: Variable number of role names as strings
+
+        Returns:
+            bool: True if the principal has any of the specified roles, False otherwise
+        """
+        return not self.role_names.isdisjoint(roles)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.record, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.record, name, value)
+        if name in self._data.fields:
+            # Keep the copied field in step with the row for the rest of the request
+            object.__setattr__(self, name, getattr(self.record, name))
+
+    def __repr__(self):
+        return f'<Principal {self.kind}:{self.id}>'
+
+
+def is_patient_principal(user):
+    """Check whether ``user`` (e.g. current_user) is a logged-in patient-portal user."""
+    return bool(getattr(user, 'is_patient', False))
+
+
+def _model(kind):
+    from app.patients.models import PatientUser
+    return User if kind == STAFF_PRINCIPAL else PatientUser
+
+
+def _principal_data(kind, record):
+    fields = {name: getattr(record, name) for name in CACHED_FIELDS[kind]}
+    return PrincipalData(kind, record.id, fields)
+
+
+def _cache():
+    return current_app.extensions.setdefault('principal_cache', {})
+
+
+def load_principal(principal_session_id):
+    """
+    Load the principal for an id kept in the login session.
+
+    Args:
+        principal_session_id (str): "user:<id>", "patient:<id>", or a bare id from an older session
+
+    Returns:
+        Principal: The principal, or None if it no longer exists
+    """
+    kind, _, principal_id = principal_session_id.rpartition(':')
+    key = (kind, principal_id)
+    cache = _cache()
+    entry = cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return Principal(entry[1])
+
+    if kind in CACHED_FIELDS:
+        record = db.session.get(_model(kind), principal_id)
+    else:
+        # Sessions from before principals were typed: try staff users, then patient users
+        kind = STAFF_PRINCIPAL
+        record = db.session.get(User, principal_id)
+        if record is None:
+            kind = PATIENT_PRINCIPAL
+            record = db.session.get(_model(PATIENT_PRINCIPAL), principal_id)
+    if record is None:
+        return None
+
+    data = _principal_data(kind, record)
+    ttl = current_app.config.get('PRINCIPAL_CACHE_TTL', DEFAULT_CACHE_TTL)
+    with _cache_lock:
+        cache[key] = (time.monotonic() + ttl, data)
+    return Principal(data, record)
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_principal_changes(session, flush_context, instances):
+    from app.patients.models import PatientUser
+
+    changed = session.info.setdefault(PENDING_CHANGES_KEY, set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            changed.add((STAFF_PRINCIPAL, obj.id))
+        elif isinstance(obj, PatientUser):
+            changed.add((PATIENT_PRINCIPAL, obj.id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _forget_changed_principals(session):
+    changed = session.info.pop(PENDING_CHANGES_KEY, None)
+    if not changed or not has_app_context():
+        return
+    cache = _cache()
+    with _cache_lock:
+        for kind, principal_id in changed:
+            cache.pop((kind, principal_id), None)
+            # Entries for bare ids from older sessions
+            cache.pop(('', principal_id), None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_principal_changes(session):
+    session.info.pop(PENDING_CHANGES_KEY, None)
@@ -16,8 +16,6 @@ def dashboard_redirect():
     if not current_user.is_authenticated:
         return redirect(url_for('auth.home'))
     
-    print(f"Current user: {current_user.username}, Roles: {[role.name for role in current_user.roles]}")
-
     # Import here to avoid circular imports
     from app.helpers import get_user_dashboard_url
     return redirect(get_user_dashboard_url(current_user))
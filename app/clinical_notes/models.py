@@ -3,6 +3,10 @@ from app.patients.models import Patient
 from app.auth.models import User, db
 
 class ClinicalNote(db.Model):
+    __table_args__ = (
+        db.Index('ix_clinical_note_patient_id_date', 'patient_id', 'date', 'id'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     patient_id = db.Column(db.String(36), db.ForeignKey('patient.id'), nullable=False)
     written_by = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
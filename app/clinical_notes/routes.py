@@ -7,14 +7,14 @@ from app.clinical_notes.models import ClinicalNote
 from app.auth.models import db
 from app.patients.models import Patient
 
-@bp.route('/patients/<int:patient_id>/clinical_notes', methods=['GET'])
+@bp.route('/patients/<string:patient_id>/clinical_notes', methods=['GET'])
 @roles_required('Doctor')
 def view_clinical_notes(patient_id):
     patient = Patient.query.get_or_404(patient_id)
     clinical_notes = ClinicalNote.query.filter_by(patient_id=patient.id).order_by(ClinicalNote.date.desc()).all()
     return render_template('clinical_notes/view.html', patient=patient, clinical_notes=clinical_notes)
 
-@bp.route('/patients/<int:patient_id>/clinical_notes/new', methods=['GET', 'POST'])
+@bp.route('/patients/<string:patient_id>/clinical_notes/new', methods=['GET', 'POST'])
 @roles_required('Doctor')
 def add_clinical_note(patient_id):
     patient = Patient.query.get_or_404(patient_id)
@@ -42,7 +42,7 @@ def add_clinical_note(patient_id):
     
     return render_template('clinical_notes/new.html', form=form, patient=patient)
 
-@bp.route('/patients/<int:patient_id>/clinical_notes/<string:note_id>', methods=['GET'])
+@bp.route('/patients/<string:patient_id>/clinical_notes/<string:note_id>', methods=['GET'])
 @roles_required('Doctor')
 def view_clinical_note(patient_id, note_id):
     patient = Patient.query.get_or_404(patient_id)
@@ -0,0 +1,178 @@
+"""
+Doctor dashboard read model.
+
+The dashboard shows a doctor's appointments for today, their latest clinical
+notes and their completed lab orders. Each panel is loaded with one joined
+query that selects only the columns the page shows, so the page costs three
+queries however many rows it lists.
+
+Doctors reload the dashboard many times a day, so the panels are kept in a
+process-local cache for DOCTOR_DASHBOARD_CACHE_TTL seconds. Commits that
+create, change or delete one of a doctor's appointments, clinical notes, lab
+orders or lab results drop that doctor's entry straight away; changes
+committed by other workers, and renamed patients or rooms, are picked up once
+the entry expires.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.appointments.models import Appointment
+from app.appointments.windows import day_window, hospital_today, in_window
+from app.clinical_notes.models import ClinicalNote
+from app.hospital.models import Room
+from app.lab.models import LabOrder, LabResult
+from app.patients.models import Patient
+
+DEFAULT_CACHE_TTL = 5
+
+# Rows shown per panel of recent notes and lab results
+RECENT_LIMIT = 5
+
+# Session.info key collecting the doctors whose dashboards the current transaction changes
+PENDING_CHANGES_KEY = 'doctor_dashboard_changes'
+
+DashboardAppointment = namedtuple('DashboardAppointment', [
+    'id', 'scheduled_time', 'duration', 'status', 'patient_id', 'patient_first_name', 'patient_last_name',
+    'room_name'])
+DashboardNote = namedtuple('DashboardNote', [
+    'id', 'date', 'note_type', 'patient_id', 'patient_first_name', 'patient_last_name'])
+DashboardLabOrder = namedtuple('DashboardLabOrder', [
+    'id', 'test_type', 'order_date', 'status', 'patient_id', 'patient_first_name', 'patient_last_name'])
+DoctorDashboard = namedtuple('DoctorDashboard', ['today', 'appointments', 'recent_notes', 'lab_results'])
+
+_cache_lock = threading.Lock()
+
+
+def load_dashboard(doctor_id, today=None):
+    """
+    Load the panels of a doctor's dashboard from the database.
+
+    Args:
+        doctor_id (str): ID of the doctor
+        today (date): Day of the appointments panel; defaults to today at the hospital
+
+    Returns:
+        DoctorDashboard: The panels, as lists of named tuples
+    """
+    today = today or hospital_today()
+    appointments = db.session.query(
+        Appointment.id, Appointment.scheduled_time, Appointment.duration, Appointment.status,
+        Patient.id, Patient.first_name, Patient.last_name, Room.name,
+    ).join(Patient, Patient.id == Appointment.patient_id)\
+        .outerjoin(Room, Room.id == Appointment.room_id)\
+        .filter(in_window(day_window(today)), Appointment.doctor_id == doctor_id)\
+        .order_by(Appointment.scheduled_time, Appointment.id)
+
+    notes = db.session.query(
+        ClinicalNote.id, ClinicalNote.date, ClinicalNote.note_type,
+        Patient.id, Patient.first_name, Patient.last_name,
+    ).join(Patient, Patient.id == ClinicalNote.patient_id)\
+        .filter(ClinicalNote.written_by == doctor_id)\
+        .order_by(ClinicalNote.date.desc()).limit(RECENT_LIMIT)
+
+    lab_orders = db.session.query(
+        LabOrder.id, LabOrder.test_type, LabOrder.order_date, LabOrder.status,
+        Patient.id, Patient.first_name, Patient.last_name,
+    ).join(Patient, Patient.id == LabOrder.patient_id)\
+        .filter(LabOrder.ordered_by == doctor_id, LabOrder.status == 'Completed')\
+        .order_by(LabOrder.order_date.desc()).limit(RECENT_LIMIT)
+
+    return DoctorDashboard(
+        today=today,
+        appointments=[DashboardAppointment(*row) for row in appointments],
+        recent_notes=[DashboardNote(*row) for row in notes],
+        lab_results=[DashboardLabOrder(*row) for row in lab_orders],
+    )
+
+
+def _cache():
+    return current_app.extensions.setdefault('doctor_dashboards', {})
+
+
+def get_dashboard(doctor_id):
+    """
+    Get a doctor's dashboard for today, from the cache if it is fresh.
+
+    Args:
+        doctor_id (str): ID of the doctor
+
+    Returns:
+        DoctorDashboard: The panels, as lists of named tuples
+    """
+    today = hospital_today()
+    cache = _cache()
+    entry = cache.get(doctor_id)
+    # An entry from before midnight is stale whatever its age
+    if entry is not None and entry[0] > time.monotonic() and entry[1].today == today:
+        return entry[1]
+
+    dashboard = load_dashboard(doctor_id, today)
+    ttl = current_app.config.get('DOCTOR_DASHBOARD_CACHE_TTL', DEFAULT_CACHE_TTL)
+    if ttl > 0:
+        with _cache_lock:
+            cache[doctor_id] = (time.monotonic() + ttl, dashboard)
+    return dashboard
+
+
+def mark_dashboards_changed(session, doctor_ids):
+    """
+    Drop the cached dashboards of some doctors when the session's transaction commits.
+
+    For writes that bypass the ORM, such as bulk UPDATE statements, which the
+    flush tracking below cannot see.
+
+    Args:
+        session: The session the changes are made in
+        doctor_ids: IDs of the doctors whose dashboards change
+    """
+    session.info.setdefault(PENDING_CHANGES_KEY, set()).update(doctor_ids)
+
+
+def _column_values(obj, name):
+    # The current value, and the committed one if it is being changed
+    history = inspect(obj).attrs[name].history
+    values = set(history.added) | set(history.deleted) | set(history.unchanged)
+    values.add(getattr(obj, name))
+    return values
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_dashboard_changes(session, flush_context, instances):
+    changed = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Appointment):
+            changed |= _column_values(obj, 'doctor_id')
+        elif isinstance(obj, ClinicalNote):
+            changed |= _column_values(obj, 'written_by')
+        elif isinstance(obj, LabOrder):
+            changed |= _column_values(obj, 'ordered_by')
+        elif isinstance(obj, LabResult):
+            with session.no_autoflush:
+                order = obj.order or (session.get(LabOrder, obj.order_id) if obj.order_id else None)
+            if order is not None:
+                changed.add(order.ordered_by)
+    changed.discard(None)
+    if changed:
+        mark_dashboards_changed(session, changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _forget_changed_dashboards(session):
+    changed = session.info.pop(PENDING_CHANGES_KEY, None)
+    if not changed or not has_app_context():
+        return
+    cache = _cache()
+    with _cache_lock:
+        for doctor_id in changed:
+            cache.pop(doctor_id, None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_dashboard_changes(session):
+    session.info.pop(PENDING_CHANGES_KEY, None)
@@ -0,0 +1,149 @@
+"""
+Bed map: every bed of the hospital grouped by ward, room class and room.
+
+The layout (wards, room classes, rooms and beds) rarely changes, so it is
+loaded with one joined query, grouped with dict lookups, and cached per
+process until the ``bed_structure_version`` counter moves. Occupancy is
+volatile and is laid over the cached layout on every request, from the bed
+occupancy index and the ward census. Rendering the map therefore costs a
+fixed handful of queries however many beds there are.
+"""
+import threading
+from collections import namedtuple
+
+from flask import current_app
+
+from app import db
+from app.hospital.models import Bed, RoomClass, Ward, WardRoom
+from app.hospital.occupancy import STRUCTURE_VERSION_PARAMETER, get_bed_occupancy_index
+from app.hospital.queries import ward_census
+
+WardNode = namedtuple('WardNode', ['id', 'name'])
+RoomClassNode = namedtuple('RoomClassNode', ['id', 'name'])
+RoomNode = namedtuple('RoomNode', ['id', 'name', 'capacity'])
+BedNode = namedtuple('BedNode', ['id', 'name'])
+
+_structure_lock = threading.Lock()
+
+
+class BedMapStructure:
+    """The cached layout of the bed map, as of one value of the structure counter."""
+
+    def __init__(self, version, wards, room_classes, tree):
+        self.version = version
+        self.wards = wards
+        self.room_classes = room_classes
+        # [(WardNode, [(RoomClassNode, [(RoomNode, [BedNode, ...]), ...]), ...]), ...]
+        self.tree = tree
+
+    @classmethod
+    def load(cls):
+        """
+        Load the layout from the database.
+
+        Returns:
+            BedMapStructure: Wards and room classes for the filters, and the ward -> room class ->
+            room -> bed tree, each level sorted by name
+        """
+        from app.system_params.models import get_counter_parameter
+
+        version = get_counter_parameter(STRUCTURE_VERSION_PARAMETER)
+        wards = [WardNode(ward_id, name) for ward_id, name in
+                 db.session.query(Ward.id, Ward.name).order_by(Ward.name)]
+        room_classes = [RoomClassNode(room_class_id, name) for room_class_id, name in
+                        db.session.query(RoomClass.id, RoomClass.name).order_by(RoomClass.name)]
+
+        rows = db.session.query(
+            Ward.id.label('ward_id'), Ward.name.label('ward_name'),
+            RoomClass.id.label('room_class_id'), RoomClass.name.label('room_class_name'),
+            WardRoom.id.label('room_id'), WardRoom.name.label('room_name'), WardRoom.capacity,
+            Bed.id.label('bed_id'), Bed.name.label('bed_name')
+        ).join(
+            WardRoom, Bed.ward_room_id == WardRoom.id
+        ).join(
+            Ward, WardRoom.ward_id == Ward.id
+        ).join(
+            RoomClass, WardRoom.room_class_id == RoomClass.id
+        ).order_by(Ward.name, Ward.id, RoomClass.name, RoomClass.id, WardRoom.name, WardRoom.id, Bed.name)
+
+        # Group with dict lookups; rows arrive sorted, so dicts keep the display order
+        grouped = {}
+        for row in rows:
+            ward = grouped.setdefault(row.ward_id, (WardNode(row.ward_id, row.ward_name), {}))
+            room_class = ward[1].setdefault(
+                row.room_class_id, (RoomClassNode(row.room_class_id, row.room_class_name), {})
+            )
+            room = room_class[1].setdefault(row.room_id, (RoomNode(row.room_id, row.room_name, row.capacity), []))
+            room[1].append(BedNode(row.bed_id, row.bed_name))
+
+        tree = tuple(
+            (ward_node, tuple(
+                (room_class_node, tuple((room_node, tuple(beds)) for room_node, beds in rooms.values()))
+                for room_class_node, rooms in room_classes_by_id.values()
+            ))
+            for ward_node, room_classes_by_id in grouped.values()
+        )
+        return cls(version, wards, room_classes, tree)
+
+
+def get_bed_map_structure():
+    """
+    Get the cached bed map layout, reloading it if the layout changed in any worker.
+
+    Returns:
+        BedMapStructure: The current layout
+    """
+    from app.system_params.models import get_counter_parameter
+
+    version = get_counter_parameter(STRUCTURE_VERSION_PARAMETER)
+    structure = current_app.extensions.get('bed_map_structure')
+    if structure is None or structure.version != version:
+        with _structure_lock:
+            structure = current_app.extensions.get('bed_map_structure')
+            if structure is None or structure.version != version:
+                structure = BedMapStructure.load()
+                current_app.extensions['bed_map_structure'] = structure
+    return structure
+
+
+def build_bed_map():
+    """
+    Build the bed map for display.
+
+    Returns:
+        tuple: (bed_data, wards, room_classes) where bed_data is
+        ward_id -> {'ward', 'room_classes': room_class_id -> {'room_class', 'rooms': [{'ward_room', 'beds'}]}}
+        and each bed is a dict with ``id``, ``name``, ``is_occupied`` and the current ``patient_name``
+    """
+    structure = get_bed_map_structure()
+    occupancy = get_bed_occupancy_index()
+    patients = {
+        row.bed_id: f"{row.first_name} {row.last_name}"
+        for row in ward_census() if row.patient_id
+    }
+
+    bed_data = {}
+    for ward_node, room_classes in structure.tree:
+        ward_entry = bed_data[ward_node.id] = {'ward': ward_node, 'room_classes': {}}
+        for room_class_node, rooms in room_classes:
+            ward_entry['room_classes'][room_class_node.id] = {
+                'room_class': room_class_node,
+                'rooms': [
+                    {
+                        'ward_room': room_node,
+                        'beds': [_bed_view(bed_node, occupancy, patients) for bed_node in beds]
+                    }
+                    for room_node, beds in rooms
+                ]
+            }
+    return bed_data, structure.wards, structure.room_classes
+
+
+def _bed_view(bed_node, occupancy, patients):
+    entry = occupancy.beds.get(bed_node.id)
+    return {
+        'id': bed_node.id,
+        'name': bed_node.name,
+        'is_occupied': bool(entry and entry.is_occupied),
+        'patient_name': patients.get(bed_node.id)
+    }
@@ -167,6 +167,10 @@ class WardRoomClassAssignment(db.Model):
 
 
 class Bed(db.Model):
+    __table_args__ = (
+        db.Index('ix_bed_is_occupied_is_active', 'is_occupied', 'is_active'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     ward_room_id = db.Column(db.String(36), db.ForeignKey('ward_room.id'), nullable=False)
     name = db.Column(db.String(50), nullable=False)
@@ -185,6 +189,12 @@ class Bed(db.Model):
 
 
 class Admission(db.Model):
+    __table_args__ = (
+        # Current admission of a bed or of a patient
+        db.Index('ix_admission_bed_id_status', 'bed_id', 'status'),
+        db.Index('ix_admission_patient_id_status', 'patient_id', 'status'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     patient_id = db.Column(db.String(36), db.ForeignKey('patient.id'), nullable=False)
     bed_id = db.Column(db.String(36), db.ForeignKey('bed.id'), nullable=False)
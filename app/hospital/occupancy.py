@@ -0,0 +1,288 @@
+"""
+Bed occupancy index.
+
+A process-local index of every bed's ward, room class, room and occupancy.
+Free beds are kept in sets keyed by (ward, room class), ward, room class and
+room, so questions like "free beds in ward X of class Y" are dictionary
+lookups instead of scans of the Bed table.
+
+Flushes that change beds or ward rooms bump the ``bed_occupancy_version``
+system parameter in the same transaction as the change. Once the transaction
+commits, the writing process applies the bed changes to a copy of its index
+and swaps the copy in, so requests reading the index concurrently always see
+one consistent version of it. Other workers notice the counter has moved on
+their next lookup and rebuild their index with a single query.
+
+Changes to the layout of the hospital (wards, room classes, rooms and beds
+being added, removed, renamed or moved) also bump ``bed_structure_version``,
+which caches of the layout alone, such as the bed map, are keyed on.
+"""
+import threading
+from collections import defaultdict, namedtuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.hospital.models import Bed, RoomClass, Ward, WardRoom
+
+OCCUPANCY_VERSION_PARAMETER = 'bed_occupancy_version'
+STRUCTURE_VERSION_PARAMETER = 'bed_structure_version'
+
+# Session.info key collecting the occupancy changes of the current transaction
+PENDING_CHANGES_KEY = 'bed_occupancy_changes'
+
+# Bed attributes that only change occupancy; any other change to beds or rooms rebuilds the index
+OCCUPANCY_ATTRIBUTES = ('is_occupied', 'is_active')
+STRUCTURAL_ATTRIBUTES = {
+    Bed: ('ward_room_id', 'name', 'code'),
+    WardRoom: ('ward_id', 'room_class_id', 'name', 'capacity'),
+    Ward: ('name',),
+    RoomClass: ('name',),
+}
+STRUCTURAL_MODELS = tuple(STRUCTURAL_ATTRIBUTES)
+
+BedEntry = namedtuple('BedEntry', ['bed_id', 'ward_id', 'room_class_id', 'room_id', 'label', 'is_active',
+                                   'is_occupied'])
+
+_index_lock = threading.Lock()
+
+
+class BedOccupancyIndex:
+    """
+    Free and occupied beds of the hospital, as of one value of the occupancy counter.
+
+    An index is never changed once it is published; changes produce a new index.
+    """
+
+    # Free bed sets keyed by a property of the bed
+    KEYED_SETS = ('_free_by_ward', '_free_by_room_class', '_free_by_ward_room_class', '_free_by_room')
+
+    def __init__(self, entries, version):
+        self.version = version
+        self.beds = {}
+        self._free = set()
+        self._free_by_ward = defaultdict(set)
+        self._free_by_room_class = defaultdict(set)
+        self._free_by_ward_room_class = defaultdict(set)
+        self._free_by_room = defaultdict(set)
+        for entry in entries:
+            self._add(entry)
+
+    @classmethod
+    def load(cls):
+        """
+        Build the index from the database.
+
+        Returns:
+            BedOccupancyIndex: Index of all beds, tagged with the counter value read before loading
+        """
+        from app.system_params.models import get_counter_parameter
+
+        # Read the counter first; changes committed while loading just trigger another rebuild
+        version = get_counter_parameter(OCCUPANCY_VERSION_PARAMETER)
+        rows = db.session.query(
+            Bed.id, Bed.name, Bed.is_active, Bed.is_occupied,
+            WardRoom.id.label('room_id'), WardRoom.name.label('room_name'), WardRoom.room_class_id,
+            Ward.id.label('ward_id'), Ward.name.label('ward_name')
+        ).join(
+            WardRoom, Bed.ward_room_id == WardRoom.id
+        ).join(
+            Ward, WardRoom.ward_id == Ward.id
+        )
+        entries = [
+            BedEntry(row.id, row.ward_id, row.room_class_id, row.room_id,
+                     f"{row.name} - {row.ward_name} - {row.room_name}", bool(row.is_active), bool(row.is_occupied))
+            for row in rows
+        ]
+        return cls(entries, version)
+
+    @staticmethod
+    def _keys(entry):
+        return (entry.ward_id, entry.room_class_id, (entry.ward_id, entry.room_class_id), entry.room_id)
+
+    def _free_sets(self, entry):
+        return (self._free,) + tuple(getattr(self, name)[key] for name, key in zip(self.KEYED_SETS, self._keys(entry)))
+
+    def _add(self, entry):
+        self.beds[entry.bed_id] = entry
+        if entry.is_active and not entry.is_occupied:
+            for free in self._free_sets(entry):
+                free.add(entry.bed_id)
+
+    def _remove(self, bed_id):
+        entry = self.beds.pop(bed_id, None)
+        if entry is not None:
+            for free in self._free_sets(entry):
+                free.discard(bed_id)
+
+    def _free_set(self, ward_id=None, room_class_id=None, room_id=None):
+        if room_id is not None:
+            return self._free_by_room.get(room_id, ())
+        if ward_id is not None and room_class_id is not None:
+            return self._free_by_ward_room_class.get((ward_id, room_class_id), ())
+        if ward_id is not None:
+            return self._free_by_ward.get(ward_id, ())
+        if room_class_id is not None:
+            return self._free_by_room_class.get(room_class_id, ())
+        return self._free
+
+    def free_beds(self, ward_id=None, room_class_id=None, room_id=None):
+        """
+        Count free beds (active and unoccupied).
+
+        Args:
+            ward_id (str): Only count beds in this ward
+            room_class_id (str): Only count beds in rooms of this class
+            room_id (str): Only count beds in this ward room
+
+        Returns:
+            int: Number of free beds
+        """
+        return len(self._free_set(ward_id, room_class_id, room_id))
+
+    def free_bed_ids(self, ward_id=None, room_class_id=None, room_id=None):
+        """Get the ids of free beds, filtered like free_beds."""
+        return frozenset(self._free_set(ward_id, room_class_id, room_id))
+
+    def is_free(self, bed_id):
+        """Check whether a bed is active and unoccupied."""
+        return bed_id in self._free
+
+    def availability(self):
+        """Get free bed counts keyed by (ward_id, room_class_id)."""
+        return {key: len(free) for key, free in self._free_by_ward_room_class.items() if free}
+
+    def free_bed_choices(self):
+        """Get (bed_id, "bed - ward - room") choices for every free bed, sorted by label."""
+        return sorted(((bed_id, self.beds[bed_id].label) for bed_id in self._free), key=lambda choice: choice[1])
+
+    def apply(self, changes, version):
+        """
+        Build a copy of the index with committed occupancy changes applied.
+
+        The bed map and the dictionaries of free bed sets are copied shallowly,
+        which takes time linear in the number of beds but no query. Of the free
+        bed sets themselves only those the changed beds belong to are copied;
+        the others are shared with this index, which is left as it is.
+
+        Args:
+            changes (dict): Mapping of bed_id to (is_active, is_occupied)
+            version (int): Occupancy counter value the changes bring the index to
+
+        Returns:
+            BedOccupancyIndex: The new index, or None if a bed is unknown to the index,
+            which must then be rebuilt
+        """
+        if any(bed_id not in self.beds for bed_id in changes):
+            return None
+        index = object.__new__(type(self))
+        index.version = version
+        index.beds = dict(self.beds)
+        index._free = set(self._free)
+        for name in self.KEYED_SETS:
+            setattr(index, name, defaultdict(set, getattr(self, name)))
+        for bed_id in changes:
+            for name, key in zip(self.KEYED_SETS, self._keys(self.beds[bed_id])):
+                sets = getattr(index, name)
+                if key in sets and sets[key] is getattr(self, name).get(key):
+                    sets[key] = set(sets[key])
+        for bed_id, (is_active, is_occupied) in changes.items():
+            entry = index.beds[bed_id]
+            index._remove(bed_id)
+            index._add(entry._replace(is_active=bool(is_active), is_occupied=bool(is_occupied)))
+        return index
+
+
+def get_bed_occupancy_index():
+    """
+    Get this process's bed occupancy index, rebuilding it if another worker changed any bed.
+
+    Costs one lookup of the occupancy counter when the index is current. Inside a
+    transaction that has flushed bed changes, the counter holds the transaction's
+    own, uncommitted version; the index is then built for the caller alone and not
+    cached, as the transaction may still roll back.
+
+    Returns:
+        BedOccupancyIndex: The up to date index
+    """
+    from app.system_params.models import get_counter_parameter
+
+    version = get_counter_parameter(OCCUPANCY_VERSION_PARAMETER)
+    index = current_app.extensions.get('bed_occupancy_index')
+    if PENDING_CHANGES_KEY in db.session.info:
+        return index if index is not None and index.version == version else BedOccupancyIndex.load()
+    if index is None or index.version != version:
+        with _index_lock:
+            index = current_app.extensions.get('bed_occupancy_index')
+            if index is None or index.version != version:
+                index = BedOccupancyIndex.load()
+                current_app.extensions['bed_occupancy_index'] = index
+    return index
+
+
+def _is_changed(obj, attributes):
+    state = inspect(obj)
+    return any(state.attrs[attribute].history.has_changes() for attribute in attributes)
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_bed_changes(session, flush_context, instances):
+    # Note occupancy changes and whether the structure changed, and bump the counters
+    occupancy = {}
+    structural = False
+    for obj in session.new:
+        if isinstance(obj, STRUCTURAL_MODELS):
+            structural = True
+    for obj in session.deleted:
+        if isinstance(obj, STRUCTURAL_MODELS):
+            structural = True
+    for obj in session.dirty:
+        attributes = STRUCTURAL_ATTRIBUTES.get(type(obj))
+        if attributes is None:
+            continue
+        if _is_changed(obj, attributes):
+            structural = True
+        elif isinstance(obj, Bed) and _is_changed(obj, OCCUPANCY_ATTRIBUTES):
+            occupancy[obj.id] = (obj.is_active, obj.is_occupied)
+    if not occupancy and not structural:
+        return
+
+    from app.system_params.models import increment_counter_parameter
+    version = increment_counter_parameter(
+        OCCUPANCY_VERSION_PARAMETER, session.connection(), 'Change counter of bed occupancy'
+    )
+    if structural:
+        increment_counter_parameter(
+            STRUCTURE_VERSION_PARAMETER, session.connection(), 'Change counter of the ward, room and bed layout'
+        )
+    pending = session.info.setdefault(PENDING_CHANGES_KEY, {'versions': [], 'beds': {}, 'structural': False})
+    pending['versions'].append(version)
+    pending['beds'].update(occupancy)
+    pending['structural'] = pending['structural'] or structural
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_bed_changes(session):
+    pending = session.info.pop(PENDING_CHANGES_KEY, None)
+    if pending is None or not has_app_context():
+        return
+    with _index_lock:
+        index = current_app.extensions.get('bed_occupancy_index')
+        if index is None:
+            return
+        versions = pending['versions']
+        # Only catch up locally if no other change was committed in between
+        in_sequence = versions == list(range(index.version + 1, index.version + 1 + len(versions)))
+        index = index.apply(pending['beds'], versions[-1]) if in_sequence and not pending['structural'] else None
+        if index is not None:
+            # Requests holding the previous index keep reading it undisturbed
+            current_app.extensions['bed_occupancy_index'] = index
+        else:
+            current_app.extensions.pop('bed_occupancy_index', None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_bed_changes(session):
+    session.info.pop(PENDING_CHANGES_KEY, None)
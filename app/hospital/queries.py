@@ -0,0 +1,87 @@
+"""
+Read-side queries for ward and bed views.
+
+Dashboards read the columns they show with one joined query and group the
+rows in memory, rather than walking bed, room, ward and admission
+relationships one lazy load at a time.
+"""
+from app import db
+from app.hospital.models import Admission, Bed, Ward, WardRoom
+from app.patients.models import Patient
+
+
+def ward_census():
+    """
+    Get every occupied bed with its room, ward and current patient in a single query.
+
+    Returns:
+        list: Rows of (bed_id, bed_name, room_id, room_name, ward_id, ward_name, patient_id,
+        first_name, last_name, date_of_birth, gender, admission_date), ordered by ward, room
+        and bed name; the patient columns are None for beds without an active admission
+    """
+    rows = db.session.query(
+        Bed.id.label('bed_id'),
+        Bed.name.label('bed_name'),
+        WardRoom.id.label('room_id'),
+        WardRoom.name.label('room_name'),
+        Ward.id.label('ward_id'),
+        Ward.name.label('ward_name'),
+        Patient.id.label('patient_id'),
+        Patient.first_name,
+        Patient.last_name,
+        Patient.date_of_birth,
+        Patient.gender,
+        Admission.admission_date
+    ).join(
+        WardRoom, Bed.ward_room_id == WardRoom.id
+    ).join(
+        Ward, WardRoom.ward_id == Ward.id
+    ).outerjoin(
+        Admission, (Admission.bed_id == Bed.id) & (Admission.status == 'Admitted')
+    ).outerjoin(
+        Patient, Admission.patient_id == Patient.id
+    ).filter(
+        Bed.is_occupied == True
+    ).order_by(Ward.name, WardRoom.name, Bed.name, Admission.admission_date).all()
+
+    # A bed should have one active admission; if there are more, keep the earliest
+    census = []
+    seen = set()
+    for row in rows:
+        if row.bed_id not in seen:
+            seen.add(row.bed_id)
+            census.append(row)
+    return census
+
+
+def group_census_by_ward(census):
+    """
+    Group census rows by ward and room for the nurse ward dashboard.
+
+    Args:
+        census (list): Rows returned by ward_census
+
+    Returns:
+        dict: ward_id -> {'ward_name', 'rooms': room_id -> {'room_name', 'beds': [bed info]}}
+    """
+    ward_data = {}
+    for row in census:
+        ward = ward_data.setdefault(row.ward_id, {'ward_name': row.ward_name, 'rooms': {}})
+        room = ward['rooms'].setdefault(row.room_id, {'room_name': row.room_name, 'beds': []})
+
+        patient_info = None
+        if row.patient_id:
+            patient_info = {
+                'id': row.patient_id,
+                'first_name': row.first_name,
+                'last_name': row.last_name,
+                'date_of_birth': row.date_of_birth,
+                'gender': row.gender,
+                'admission_date': row.admission_date
+            }
+        room['beds'].append({
+            'id': row.bed_id,
+            'name': row.bed_name,
+            'patient': patient_info
+        })
+    return ward_data
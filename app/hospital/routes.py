@@ -3,6 +3,9 @@ from flask_login import current_user
 from app.hospital import bp
 from app.hospital.forms import HospitalForm, ClinicForm, WardForm, RoomClassForm, DoctorProfileForm, DoctorScheduleForm, BedAssignmentForm, DischargeForm, TransferForm, WardRoomClassAssignmentForm
 from app.hospital.models import Hospital, Clinic, Ward, RoomClass, DoctorProfile, DoctorSchedule, db, Bed, WardRoom, Admission, WardRoomClassAssignment
+from app.hospital.bed_map import build_bed_map
+from app.hospital.occupancy import get_bed_occupancy_index
+from app.hospital.queries import ward_census, group_census_by_ward
 from app.auth.models import User
 from app.utils import roles_required
 from app.patients.models import Patient
@@ -521,51 +524,8 @@ def create_doctor_schedule(doctor_id):
 @roles_required('Admissions Clerk', 'Nurse')
 def view_beds():
     try:
-        # Fetch all beds with their relationships
-        beds = Bed.query.all()
-        
-        # Fetch wards and room classes for filtering
-        wards = Ward.query.all()
-        room_classes = RoomClass.query.all()
-        
-        # Organize beds by ward and room class
-        bed_data = {}
-        for bed in beds:
-            # Ensure bed has required relationships
-            if not bed.ward_room or not bed.ward_room.ward or not bed.ward_room.room_class:
-                continue
-                
-            ward_id = bed.ward_room.ward.id
-            room_class_id = bed.ward_room.room_class.id
-            
-            # Initialize ward data if not exists
-            if ward_id not in bed_data:
-                bed_data[ward_id] = {
-                    'ward': bed.ward_room.ward,
-                    'room_classes': {}
-                }
-            
-            # Initialize room class data if not exists
-            if room_class_id not in bed_data[ward_id]['room_classes']:
-                bed_data[ward_id]['room_classes'][room_class_id] = {
-                    'room_class': bed.ward_room.room_class,
-                    'rooms': []
-                }
-            
-            # Check if room already exists in the list
-            room_exists = False
-            for room_data in bed_data[ward_id]['room_classes'][room_class_id]['rooms']:
-                if room_data['ward_room'].id == bed.ward_room.id:
-                    room_data['beds'].append(bed)
-                    room_exists = True
-                    break
-            
-            # If room doesn't exist, create new room entry
-            if not room_exists:
-                bed_data[ward_id]['room_classes'][room_class_id]['rooms'].append({
-                    'ward_room': bed.ward_room,
-                    'beds': [bed]
-                })
+        # Cached ward/room class/room layout with current occupancy laid over it
+        bed_data, wards, room_classes = build_bed_map()
         
         return render_template('hospital/beds/view.html', bed_data=bed_data, wards=wards, room_classes=room_classes)
     except Exception as e:
@@ -585,7 +545,7 @@ def assign_bed():
     form.patient_id.choices = [(patient.id, f"{patient.first_name} {patient.last_name}") for patient in Patient.query.all()]
     
     # Populate bed choices (only available beds)
-    form.bed_id.choices = [(bed.id, f"{bed.name} - {bed.ward_room.ward.name} - {bed.ward_room.name}") for bed in Bed.query.filter_by(is_occupied=False, is_active=True).all()]
+    form.bed_id.choices = get_bed_occupancy_index().free_bed_choices()
     
     if form.validate_on_submit():
         try:
@@ -713,63 +673,13 @@ def delete_doctor_schedule(id):
 @roles_required('Nurse')
 def nurse_ward_dashboard():
     try:
-        # Fetch all wards
-        wards = Ward.query.all()
-        
-        # Fetch occupied beds with patient information
-        occupied_beds = Bed.query.filter_by(is_occupied=True).all()
-        
-        # Organize data by ward
-        ward_data = {}
-        for bed in occupied_beds:
-            if bed.ward_room and bed.ward_room.ward:
-                ward_id = bed.ward_room.ward.id
-                ward_name = bed.ward_room.ward.name
-                
-                # Initialize ward data if not exists
-                if ward_id not in ward_data:
-                    ward_data[ward_id] = {
-                        'ward_name': ward_name,
-                        'rooms': {}
-                    }
-                
-                # Get room information
-                room_id = bed.ward_room.id
-                room_name = bed.ward_room.name
-                
-                # Initialize room data if not exists
-                if room_id not in ward_data[ward_id]['rooms']:
-                    ward_data[ward_id]['rooms'][room_id] = {
-                        'room_name': room_name,
-                        'beds': []
-                    }
-                
-                # Get patient information for occupied bed
-                admission = Admission.query.filter_by(bed_id=bed.id, status='Admitted').first()
-                patient_info = None
-                if admission and admission.patient:
-                    patient_info = {
-                        'id': admission.patient.id,
-                        'first_name': admission.patient.first_name,
-                        'last_name': admission.patient.last_name,
-                        'date_of_birth': admission.patient.date_of_birth,
-                        'gender': admission.patient.gender,
-                        'admission_date': admission.admission_date
-                    }
-                
-                # Add bed information
-                bed_info = {
-                    'id': bed.id,
-                    'name': bed.name,
-                    'patient': patient_info
-                }
-                
-                ward_data[ward_id]['rooms'][room_id]['beds'].append(bed_info)
+        # Occupied beds with room, ward and current patient, in one census query
+        ward_data = group_census_by_ward(ward_census())
         
-        return render_template('hospital/nurse_ward_dashboard.html', ward_data=ward_data, wards=wards)
+        return render_template('hospital/nurse_ward_dashboard.html', ward_data=ward_data)
     except Exception as e:
         flash(f'Error loading ward dashboard: {str(e)}', 'error')
-        return render_template('hospital/nurse_ward_dashboard.html', ward_data={}, wards=[])
+        return render_template('hospital/nurse_ward_dashboard.html', ward_data={})
 
 
 # Patient Transfer Routes
@@ -792,7 +702,7 @@ def transfer_patient():
     form.current_bed_id.choices = [(admission.bed.id, f"{admission.bed.name} - {admission.bed.ward_room.ward.name} - {admission.bed.ward_room.name}") for admission in active_admissions]
     
     # Populate new bed choices (only available beds)
-    form.new_bed_id.choices = [(bed.id, f"{bed.name} - {bed.ward_room.ward.name} - {bed.ward_room.name}") for bed in Bed.query.filter_by(is_occupied=False, is_active=True).all()]
+    form.new_bed_id.choices = get_bed_occupancy_index().free_bed_choices()
     
     if form.validate_on_submit():
         try:
@@ -1,12 +1,63 @@
 from app.hospital.models import Ward, RoomClass, WardRoomClassAssignment, WardRoom, Bed, Admission
 from app.patients.models import Patient
 from app.auth.models import db
+from app.hospital.occupancy import get_bed_occupancy_index
 from sqlalchemy import and_, or_
 
 
+class PlacementSnapshot:
+    """
+    Everything ward and bed scoring needs, loaded with a fixed number of queries.
+
+    Bed availability by ward and room class comes from the bed occupancy index,
+    so the cost of scoring does not depend on the number of wards, room class
+    assignments or beds.
+    """
+
+    def __init__(self, wards, room_classes, ward_assignments, available_beds):
+        self.wards = wards
+        self.room_classes = room_classes
+        self.ward_assignments = ward_assignments
+        self.available_beds = available_beds
+
+    @classmethod
+    def load(cls):
+        """
+        Load the placement snapshot.
+
+        Returns:
+            PlacementSnapshot: Active wards, room classes by id, active assignments by ward id,
+            and available bed counts by (ward_id, room_class_id)
+        """
+        wards = Ward.query.filter_by(is_active=True).all()
+        room_classes = {room_class.id: room_class for room_class in RoomClass.query.all()}
+
+        ward_assignments = {}
+        for assignment in WardRoomClassAssignment.query.filter_by(is_active=True).all():
+            ward_assignments.setdefault(assignment.ward_id, []).append(assignment)
+
+        available_beds = get_bed_occupancy_index().availability()
+        return cls(wards, room_classes, ward_assignments, available_beds)
+
+    def available_in_ward(self, ward_id, room_class_id=None):
+        """
+        Count available beds in a ward.
+
+        Args:
+            ward_id (str): The ward
+            room_class_id (str): Only count beds in rooms of this class
+
+        Returns:
+            int: Number of unoccupied, active beds
+        """
+        if room_class_id is not None:
+            return self.available_beds.get((ward_id, room_class_id), 0)
+        return sum(count for (bed_ward_id, _), count in self.available_beds.items() if bed_ward_id == ward_id)
+
+
 class PatientPlacementService:
     @staticmethod
-    def get_optimal_ward(patient, required_care_level=None, required_specialty=None):
+    def get_optimal_ward(patient, required_care_level=None, required_specialty=None, snapshot=None):
         """
         Get the optimal ward for a patient based on their needs and ward preferences.
         
@@ -14,32 +65,22 @@ class PatientPlacementService:
             patient (Patient): The patient to be placed
             required_care_level (str): Required care level for the patient
             required_specialty (str): Required specialty for the patient
+            snapshot (PlacementSnapshot): Snapshot to score against; loaded if not given
             
         Returns:
             Ward: The optimal ward for the patient, or None if no suitable ward is found
         """
-        # Get all active wards
-        wards = Ward.query.filter_by(is_active=True).all()
+        snapshot = snapshot or PlacementSnapshot.load()
         
         # If no wards are available, return None
-        if not wards:
+        if not snapshot.wards:
             return None
             
-        # Get ward-room class assignments
-        assignments = WardRoomClassAssignment.query.filter_by(is_active=True).all()
-        
-        # Create a mapping of ward_id to assignments
-        ward_assignments = {}
-        for assignment in assignments:
-            if assignment.ward_id not in ward_assignments:
-                ward_assignments[assignment.ward_id] = []
-            ward_assignments[assignment.ward_id].append(assignment)
-            
         # Score each ward based on preferences and availability
         ward_scores = []
-        for ward in wards:
+        for ward in snapshot.wards:
             score = PatientPlacementService._calculate_ward_score(
-                ward, patient, required_care_level, required_specialty, ward_assignments
+                ward, patient, required_care_level, required_specialty, snapshot
             )
             if score > 0:  # Only consider wards with a positive score
                 ward_scores.append((ward, score))
@@ -51,7 +92,7 @@ class PatientPlacementService:
         return ward_scores[0][0] if ward_scores else None
     
     @staticmethod
-    def _calculate_ward_score(ward, patient, required_care_level, required_specialty, ward_assignments):
+    def _calculate_ward_score(ward, patient, required_care_level, required_specialty, snapshot):
         """
         Calculate a score for a ward based on various factors.
         
@@ -60,7 +101,7 @@ class PatientPlacementService:
             patient (Patient): The patient to be placed
             required_care_level (str): Required care level for the patient
             required_specialty (str): Required specialty for the patient
-            ward_assignments (dict): Mapping of ward_id to assignments
+            snapshot (PlacementSnapshot): Room classes, assignments and bed availability
             
         Returns:
             int: The score for the ward
@@ -68,58 +109,40 @@ class PatientPlacementService:
         score = 0
         
         # Check if the ward has a preferred room class
-        if ward.preferred_room_class_id:
-            preferred_room_class = RoomClass.query.get(ward.preferred_room_class_id)
-            if preferred_room_class:
-                # Add points if the preferred room class matches requirements
-                if required_care_level and preferred_room_class.care_level == required_care_level:
-                    score += 10
-                if required_specialty and preferred_room_class.specialty == required_specialty:
-                    score += 10
-                    
-                # Check if there are available beds in the preferred room class
-                available_beds = Bed.query.join(WardRoom).filter(
-                    and_(
-                        Bed.is_occupied == False,
-                        Bed.is_active == True,
-                        WardRoom.ward_id == ward.id,
-                        WardRoom.room_class_id == preferred_room_class.id
-                    )
-                ).count()
+        preferred_room_class = snapshot.room_classes.get(ward.preferred_room_class_id)
+        if preferred_room_class:
+            # Add points if the preferred room class matches requirements
+            if required_care_level and preferred_room_class.care_level == required_care_level:
+                score += 10
+            if required_specialty and preferred_room_class.specialty == required_specialty:
+                score += 10
                 
-                if available_beds > 0:
-                    score += 5  # Add points for available beds
+            # Check if there are available beds in the preferred room class
+            if snapshot.available_in_ward(ward.id, preferred_room_class.id) > 0:
+                score += 5  # Add points for available beds
                     
         # Check ward-room class assignments
-        if ward.id in ward_assignments:
-            for assignment in ward_assignments[ward.id]:
-                room_class = RoomClass.query.get(assignment.room_class_id)
-                if room_class:
-                    # Add points based on assignment priority
-                    score += assignment.priority or 0
+        for assignment in snapshot.ward_assignments.get(ward.id, []):
+            room_class = snapshot.room_classes.get(assignment.room_class_id)
+            if room_class:
+                # Add points based on assignment priority
+                score += assignment.priority or 0
+                
+                # Add points if the room class matches requirements
+                if required_care_level and room_class.care_level == required_care_level:
+                    score += 5
+                if required_specialty and room_class.specialty == required_specialty:
+                    score += 5
                     
-                    # Add points if the room class matches requirements
-                    if required_care_level and room_class.care_level == required_care_level:
-                        score += 5
-                    if required_specialty and room_class.specialty == required_specialty:
-                        score += 5
-                        
-                    # Check capacity
-                    if assignment.min_capacity and assignment.min_capacity <= available_beds:
-                        score += 2
-                    if assignment.max_capacity and assignment.max_capacity >= available_beds:
-                        score += 2
+                # Check capacity against the beds available in this room class
+                available_beds = snapshot.available_in_ward(ward.id, room_class.id)
+                if assignment.min_capacity and assignment.min_capacity <= available_beds:
+                    score += 2
+                if assignment.max_capacity and assignment.max_capacity >= available_beds:
+                    score += 2
                         
         # Check overall bed availability in the ward
-        available_beds = Bed.query.join(WardRoom).filter(
-            and_(
-                Bed.is_occupied == False,
-                Bed.is_active == True,
-                WardRoom.ward_id == ward.id
-            )
-        ).count()
-        
-        if available_beds > 0:
+        if snapshot.available_in_ward(ward.id) > 0:
             score += 3  # Add points for overall availability
             
         return score
@@ -138,14 +161,18 @@ class PatientPlacementService:
         Returns:
             Bed: The optimal bed for the patient, or None if no suitable bed is found
         """
-        # Get all available beds in the ward
-        available_beds = Bed.query.join(WardRoom).filter(
+        # Get all available beds in the ward together with their room class, in one query
+        available_beds = db.session.query(Bed, RoomClass).join(
+            WardRoom, Bed.ward_room_id == WardRoom.id
+        ).join(
+            RoomClass, WardRoom.room_class_id == RoomClass.id
+        ).filter(
             and_(
                 Bed.is_occupied == False,
                 Bed.is_active == True,
                 WardRoom.ward_id == ward.id
             )
-        ).all()
+        ).order_by(Bed.code).all()
         
         # If no beds are available, return None
         if not available_beds:
@@ -153,9 +180,9 @@ class PatientPlacementService:
             
         # Score each bed based on room class preferences
         bed_scores = []
-        for bed in available_beds:
+        for bed, room_class in available_beds:
             score = PatientPlacementService._calculate_bed_score(
-                bed, patient, required_care_level, required_specialty
+                bed, room_class, ward, patient, required_care_level, required_specialty
             )
             bed_scores.append((bed, score))
             
@@ -166,12 +193,14 @@ class PatientPlacementService:
         return bed_scores[0][0] if bed_scores else None
     
     @staticmethod
-    def _calculate_bed_score(bed, patient, required_care_level, required_specialty):
+    def _calculate_bed_score(bed, room_class, ward, patient, required_care_level, required_specialty):
         """
         Calculate a score for a bed based on various factors.
         
         Args:
             bed (Bed): The bed to score
+            room_class (RoomClass): The room class of the bed's room
+            ward (Ward): The ward the bed is in
             patient (Patient): The patient to be placed
             required_care_level (str): Required care level for the patient
             required_specialty (str): Required specialty for the patient
@@ -180,15 +209,6 @@ class PatientPlacementService:
             int: The score for the bed
         """
         score = 0
-        
-        # Get the room class for this bed
-        ward_room = WardRoom.query.filter_by(id=bed.ward_room_id).first()
-        if not ward_room:
-            return score
-            
-        room_class = RoomClass.query.get(ward_room.room_class_id)
-        if not room_class:
-            return score
             
         # Add points if the room class matches requirements
         if required_care_level and room_class.care_level == required_care_level:
@@ -197,8 +217,7 @@ class PatientPlacementService:
             score += 10
             
         # Add points if this is the ward's preferred room class
-        ward = Ward.query.get(ward_room.ward_id)
-        if ward and ward.preferred_room_class_id == room_class.id:
+        if ward.preferred_room_class_id == room_class.id:
             score += 5
             
         return score
@@ -0,0 +1,247 @@
+"""
+Per-request SQL instrumentation.
+
+Every statement run through SQLAlchemy during a request is timed with engine
+events and tallied on ``flask.g``: the number of statements, the total time
+spent in the database and the slowest few statements. When the request ends:
+
+- the response gets a ``Server-Timing`` header (``db`` and ``app`` entries),
+  so browser dev tools show the database share of each request,
+- the request is added to the per-endpoint statistics of this process, shown
+  to administrators on /admin/perf,
+- statements slower than SLOW_QUERY_THRESHOLD_MS and requests slower than
+  SLOW_REQUEST_THRESHOLD_MS are written to the ``app.instrumentation`` logger
+  as one JSON object per line.
+
+Statement parameters are never recorded; they carry patient data.
+
+Settings: SQL_INSTRUMENTATION turns the whole layer on or off, SERVER_TIMING
+the header, PERF_SAMPLE_SIZE the number of recent requests per endpoint the
+percentiles are computed from. A threshold of 0 turns its log off.
+"""
+import heapq
+import json
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_SIZE = 500
+DEFAULT_SLOW_QUERY_MS = 100
+DEFAULT_SLOW_REQUEST_MS = 1000
+
+# Slowest statements kept per request and per endpoint
+SLOWEST_STATEMENTS = 5
+
+# Longest statement text kept; long IN lists would otherwise fill the log
+MAX_STATEMENT_LENGTH = 1000
+
+# Upper bounds of the request time histogram buckets, in milliseconds; the last bucket is open
+HISTOGRAM_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Endpoints that never reach the database
+IGNORED_ENDPOINTS = ('static',)
+
+SlowStatement = namedtuple('SlowStatement', ['duration_ms', 'statement'])
+
+# Statistics of one endpoint; times in milliseconds, histogram counts per HISTOGRAM_BUCKETS bucket
+EndpointSummary = namedtuple('EndpointSummary', ['endpoint', 'requests', 'p50_ms', 'p95_ms', 'db_p50_ms',
+                                                 'db_p95_ms', 'queries_p50', 'queries_p95', 'max_queries',
+                                                 'histogram', 'slowest'])
+
+
+class RequestStats:
+    """Statements run by the current request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.slowest = []
+
+    def add(self, duration, statement):
+        self.query_count += 1
+        self.db_time += duration
+        _keep_slowest(self.slowest, duration, statement)
+
+
+class EndpointStats:
+    """Recent requests of one endpoint."""
+
+    def __init__(self, sample_size):
+        self.requests = 0
+        self.durations = deque(maxlen=sample_size)
+        self.db_times = deque(maxlen=sample_size)
+        self.query_counts = deque(maxlen=sample_size)
+        self.histogram = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        self.slowest = []
+
+
+class PerfRegistry:
+    """Per-endpoint request statistics of this process."""
+
+    def __init__(self, sample_size=DEFAULT_SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, duration, stats):
+        """
+        Add a finished request to the statistics of its endpoint.
+
+        Args:
+            endpoint (str): Endpoint name
+            duration (float): Request time in seconds
+            stats (RequestStats): Statements run by the request
+        """
+        with self._lock:
+            endpoint_stats = self._endpoints.get(endpoint)
+            if endpoint_stats is None:
+                endpoint_stats = self._endpoints[endpoint] = EndpointStats(self.sample_size)
+            endpoint_stats.requests += 1
+            endpoint_stats.durations.append(duration)
+            endpoint_stats.db_times.append(stats.db_time)
+            endpoint_stats.query_counts.append(stats.query_count)
+            endpoint_stats.histogram[_bucket(duration * 1000)] += 1
+            for slow_duration, statement in stats.slowest:
+                _keep_slowest(endpoint_stats.slowest, slow_duration, statement)
+
+    def summaries(self):
+        """
+        Summarize the statistics of every endpoint.
+
+        Returns:
+            list: EndpointSummary objects, slowest p95 first
+        """
+        with self._lock:
+            summaries = [EndpointSummary(
+                endpoint=endpoint,
+                requests=stats.requests,
+                p50_ms=_percentile(stats.durations, 50) * 1000,
+                p95_ms=_percentile(stats.durations, 95) * 1000,
+                db_p50_ms=_percentile(stats.db_times, 50) * 1000,
+                db_p95_ms=_percentile(stats.db_times, 95) * 1000,
+                queries_p50=_percentile(stats.query_counts, 50),
+                queries_p95=_percentile(stats.query_counts, 95),
+                max_queries=max(stats.query_counts),
+                histogram=list(stats.histogram),
+                slowest=[SlowStatement(duration * 1000, statement)
+                         for duration, statement in sorted(stats.slowest, reverse=True)],
+            ) for endpoint, stats in self._endpoints.items()]
+        return sorted(summaries, key=lambda summary: summary.p95_ms, reverse=True)
+
+    def reset(self):
+        """Forget all statistics."""
+        with self._lock:
+            self._endpoints.clear()
+
+
+def _keep_slowest(heap, duration, statement):
+    # Min-heap of the slowest statements seen so far
+    entry = (duration, statement)
+    if len(heap) < SLOWEST_STATEMENTS:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+
+def _bucket(duration_ms):
+    for index, bound in enumerate(HISTOGRAM_BUCKETS):
+        if duration_ms <= bound:
+            return index
+    return len(HISTOGRAM_BUCKETS)
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of a non-empty sample."""
+    ordered = sorted(values)
+    index = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[int(index)]
+
+
+def _threshold(name, default):
+    # Thresholds are configured in milliseconds; 0 turns the log off
+    value = current_app.config.get(name, default)
+    return value / 1000 if value else None
+
+
+def _log(event_name, **fields):
+    logger.warning(json.dumps({'event': event_name, **fields}, default=str))
+
+
+def init_app(app):
+    """
+    Instrument the requests of an application.
+
+    Args:
+        app (Flask): The application
+    """
+    app.extensions['perf'] = PerfRegistry(app.config.get('PERF_SAMPLE_SIZE') or DEFAULT_SAMPLE_SIZE)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    # The listeners are global and cheap outside instrumented requests
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def get_registry():
+    """Get the request statistics of the current application."""
+    return current_app.extensions['perf']
+
+
+def _start_request():
+    if current_app.config.get('SQL_INSTRUMENTATION', True):
+        g.sql_stats = RequestStats()
+    else:
+        g.pop('sql_stats', None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and has_request_context() and 'sql_stats' in g:
+        context._instrumentation_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_instrumentation_started', None)
+    if started is None or not has_request_context():
+        return
+    stats = g.get('sql_stats')
+    if stats is None:
+        return
+    duration = time.perf_counter() - started
+    statement = statement[:MAX_STATEMENT_LENGTH]
+    stats.add(duration, statement)
+
+    threshold = _threshold('SLOW_QUERY_THRESHOLD_MS', DEFAULT_SLOW_QUERY_MS)
+    if threshold is not None and duration >= threshold:
+        _log('slow_query', endpoint=request.endpoint, method=request.method, path=request.path,
+             duration_ms=round(duration * 1000, 2), statement=statement)
+
+
+def _finish_request(response):
+    stats = g.pop('sql_stats', None)
+    if stats is None:
+        return response
+    duration = time.perf_counter() - stats.started
+    endpoint = request.endpoint or '<unmatched>'
+
+    if current_app.config.get('SERVER_TIMING', True):
+        response.headers.add('Server-Timing', f'db;dur={stats.db_time * 1000:.2f};desc="{stats.query_count} queries"')
+        response.headers.add('Server-Timing', f'app;dur={duration * 1000:.2f}')
+
+    if endpoint not in IGNORED_ENDPOINTS:
+        get_registry().record(endpoint, duration, stats)
+
+    threshold = _threshold('SLOW_REQUEST_THRESHOLD_MS', DEFAULT_SLOW_REQUEST_MS)
+    if threshold is not None and duration >= threshold:
+        _log('slow_request', endpoint=endpoint, method=request.method, path=request.path,
+             status=response.status_code, duration_ms=round(duration * 1000, 2),
+             db_ms=round(stats.db_time * 1000, 2), queries=stats.query_count)
+    return response
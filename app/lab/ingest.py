@@ -0,0 +1,220 @@
+"""
+Batched lab result ingestion.
+
+Analyzer runs deliver results for hundreds of samples at once, as CSV or
+JSON rows keyed by lab order id. A batch is handled in one transaction:
+
+- the orders of every row are loaded and locked with one query,
+- rows that cannot be accepted (unknown order, order already completed or
+  cancelled, duplicate order in the batch, missing result) are reported
+  with their row number instead of failing the batch,
+- results of the accepted rows are written with one bulk INSERT,
+- their orders are marked Completed with one UPDATE.
+
+The bulk statements bypass the ORM, so the lab order change counter is
+bumped here, and the accepted orders are stamped with it for worklist
+polling, and the dashboards of the ordering doctors are dropped from the
+dashboard cache on commit.
+"""
+import csv
+import io
+import json
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from sqlalchemy import exists, select
+
+from app import db
+from app.doctor.dashboard import mark_dashboards_changed
+from app.lab.models import LabOrder, LabResult, next_change_version
+
+BATCH_FORMATS = ('csv', 'json')
+
+# Most rows accepted in one batch; larger analyzer exports are split by the sender
+MAX_BATCH_ROWS = 5000
+
+ResultRow = namedtuple('ResultRow', ['row_number', 'order_id', 'result_data', 'result_date'])
+RowError = namedtuple('RowError', ['row_number', 'order_id', 'message'])
+IngestReport = namedtuple('IngestReport', ['accepted', 'errors'])
+
+
+class BatchFormatError(ValueError):
+    """Raised when a batch cannot be read at all, as opposed to single rows being rejected."""
+
+
+def _parse_result_date(value):
+    if not value:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    # Results are stored as naive UTC times like the rest of the lab module
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_batch(content, batch_format):
+    """
+    Read the rows of a result batch.
+
+    CSV batches need a header row with ``order_id`` and ``result_data`` columns and may
+    have a ``result_date`` column (ISO 8601). JSON batches are a list of objects with the
+    same keys, or an object holding that list under ``results``.
+
+    Args:
+        content (str): The batch
+        batch_format (str): One of BATCH_FORMATS
+
+    Returns:
+        tuple: (rows, errors), the ResultRow objects that could be read and RowError objects
+        for the rows that could not; row numbers count data rows from 1
+
+    Raises:
+        BatchFormatError: If the batch is malformed or too large
+    """
+    if batch_format == 'csv':
+        reader = csv.DictReader(io.StringIO(content))
+        if not reader.fieldnames or not {'order_id', 'result_data'}.issubset(reader.fieldnames):
+            raise BatchFormatError('CSV batches need order_id and result_data columns')
+        records = list(reader)
+    elif batch_format == 'json':
+        try:
+            records = json.loads(content)
+        except ValueError:
+            raise BatchFormatError('Batch is not valid JSON')
+        if isinstance(records, dict):
+            records = records.get('results')
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise BatchFormatError('JSON batches must be a list of result objects')
+    else:
+        raise BatchFormatError(f'Unknown batch format: {batch_format}')
+    if len(records) > MAX_BATCH_ROWS:
+        raise BatchFormatError(f'Batches are limited to {MAX_BATCH_ROWS} rows')
+
+    rows = []
+    errors = []
+    for row_number, record in enumerate(records, start=1):
+        order_id = str(record.get('order_id') or '').strip()
+        result_data = record.get('result_data')
+        if not isinstance(result_data, str):
+            result_data = json.dumps(result_data) if result_data is not None else ''
+        if not order_id:
+            errors.append(RowError(row_number, None, 'Missing order_id'))
+            continue
+        if not result_data.strip():
+            errors.append(RowError(row_number, order_id, 'Missing result_data'))
+            continue
+        try:
+            result_date = _parse_result_date(record.get('result_date'))
+        except ValueError:
+            errors.append(RowError(row_number, order_id, 'Invalid result_date'))
+            continue
+        rows.append(ResultRow(row_number, order_id, result_data, result_date))
+    return rows, errors
+
+
+def ingest_results(rows, performed_by, dry_run=False):
+    """
+    Record the results of a batch in the current transaction and commit it.
+
+    Args:
+        rows (list): ResultRow objects, e.g. from parse_batch
+        performed_by (str): ID of the user recording the results
+        dry_run (bool): Only validate the rows; nothing is written
+
+    Returns:
+        IngestReport: Order ids of the accepted rows, and RowError objects for the rejected ones
+    """
+    order_ids = {row.order_id for row in rows}
+    has_result = exists().where(LabResult.order_id == LabOrder.id)
+    orders = {}
+    if order_ids:
+        # One query for every order of the batch; the rows stay locked until commit
+        orders = {order_id: (status, completed, ordered_by)
+                  for order_id, status, completed, ordered_by in db.session.execute(
+                      select(LabOrder.id, LabOrder.status, has_result, LabOrder.ordered_by)
+                      .where(LabOrder.id.in_(order_ids)).with_for_update()
+                  )}
+
+    accepted = []
+    errors = []
+    seen = set()
+    for row in rows:
+        if row.order_id in seen:
+            errors.append(RowError(row.row_number, row.order_id, 'Duplicate order in batch'))
+            continue
+        seen.add(row.order_id)
+        if row.order_id not in orders:
+            errors.append(RowError(row.row_number, row.order_id, 'Unknown lab order'))
+            continue
+        status, completed, _ = orders[row.order_id]
+        if completed or status == 'Completed':
+            errors.append(RowError(row.row_number, row.order_id, 'Results already entered'))
+        elif status == 'Cancelled':
+            errors.append(RowError(row.row_number, row.order_id, 'Lab order is cancelled'))
+        else:
+            accepted.append(row)
+
+    if dry_run or not accepted:
+        db.session.rollback()
+        return IngestReport([row.order_id for row in accepted], errors)
+
+    try:
+        connection = db.session.connection()
+        now = datetime.utcnow()
+        db.session.execute(LabResult.__table__.insert(), [{
+            'id': str(uuid.uuid4()),
+            'order_id': row.order_id,
+            'performed_by': performed_by,
+            'result_data': row.result_data,
+            'result_date': row.result_date or now,
+            'released': False,
+            'created_at': now,
+            'updated_at': now,
+        } for row in accepted])
+        version = next_change_version(connection)
+        orders_table = LabOrder.__table__
+        db.session.execute(
+            orders_table.update()
+            .where(orders_table.c.id.in_([row.order_id for row in accepted]))
+            .values(status='Completed', change_version=version, updated_at=now)
+        )
+        mark_dashboards_changed(db.session, {orders[row.order_id][2] for row in accepted})
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return IngestReport([row.order_id for row in accepted], errors)
+
+
+def ingest_batch(content, batch_format, performed_by, dry_run=False):
+    """
+    Read a CSV or JSON result batch and record its results in one transaction.
+
+    Args:
+        content (str): The batch
+        batch_format (str): One of BATCH_FORMATS
+        performed_by (str): ID of the user recording the results
+        dry_run (bool): Only validate the batch; nothing is written
+
+    Returns:
+        IngestReport: Order ids of the accepted rows, and RowError objects for every rejected
+        row, in row order
+
+    Raises:
+        BatchFormatError: If the batch is malformed or too large
+    """
+    rows, errors = parse_batch(content, batch_format)
+    report = ingest_results(rows, performed_by, dry_run=dry_run)
+    return report._replace(errors=sorted(errors + report.errors, key=lambda error: error.row_number))
+
+
+def report_json(report):
+    """Format an ingestion report for the API and the import script."""
+    return {
+        'accepted': len(report.accepted),
+        'rejected': len(report.errors),
+        'accepted_order_ids': report.accepted,
+        'errors': [error._asdict() for error in report.errors],
+    }
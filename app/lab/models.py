@@ -1,8 +1,20 @@
 import uuid
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from app.auth.models import db, User
 from app.patients.models import Patient
 
+# System parameter holding the lab order change counter
+CHANGE_VERSION_PARAMETER = 'lab_order_version'
+
 class LabOrder(db.Model):
+    __table_args__ = (
+        db.Index('ix_lab_order_patient_id_status', 'patient_id', 'status'),
+        db.Index('ix_lab_order_status_order_date', 'status', 'order_date'),
+        # Worklist pages are read newest first along this index
+        db.Index('ix_lab_order_order_date_id', 'order_date', 'id'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     patient_id = db.Column(db.String(36), db.ForeignKey('patient.id'), nullable=False)
     ordered_by = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
@@ -12,6 +24,8 @@ class LabOrder(db.Model):
     
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    # Value of the lab order change counter when this order or its results last changed
+    change_version = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
     
     # Relationships
     patient = db.relationship('Patient', backref=db.backref('lab_orders', lazy=True))
@@ -19,6 +33,10 @@ class LabOrder(db.Model):
 
 
 class LabResult(db.Model):
+    __table_args__ = (
+        db.Index('ix_lab_result_order_id_result_date', 'order_id', 'result_date'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     order_id = db.Column(db.String(36), db.ForeignKey('lab_order.id'), nullable=False)
     performed_by = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
@@ -31,4 +49,47 @@ class LabResult(db.Model):
     
     # Relationships
     order = db.relationship('LabOrder', backref=db.backref('lab_results', lazy=True))
-    performer = db.relationship('User', backref=db.backref('performed_labs', lazy=True))
\ No newline at end of file
+    performer = db.relationship('User', backref=db.backref('performed_labs', lazy=True))
+
+
+def current_change_version(connection=None):
+    """
+    Get the current value of the lab order change counter.
+
+    Args:
+        connection: Connection to read with; defaults to the current session's connection
+
+    Returns:
+        int: The counter value, 0 if no lab order has been changed yet
+    """
+    from app.system_params.models import get_counter_parameter
+    return get_counter_parameter(CHANGE_VERSION_PARAMETER, connection)
+
+
+def next_change_version(connection):
+    """Increment the lab order change counter in the caller's transaction and return the new value."""
+    from app.system_params.models import increment_counter_parameter
+    return increment_counter_parameter(
+        CHANGE_VERSION_PARAMETER, connection, 'Change counter for incremental lab worklist polling'
+    )
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_lab_order_changes(session, flush_context, instances):
+    # Stamp created and updated orders, and the orders of created and updated
+    # results, with a new change version
+    changed = {id(obj): obj for obj in session.new if isinstance(obj, LabOrder)}
+    changed.update((id(obj), obj) for obj in session.dirty if isinstance(obj, LabOrder) and session.is_modified(obj))
+    results = [obj for obj in session.new if isinstance(obj, LabResult)]
+    results += [obj for obj in session.dirty if isinstance(obj, LabResult) and session.is_modified(obj)]
+    with session.no_autoflush:
+        for result in results:
+            order = result.order or (session.get(LabOrder, result.order_id) if result.order_id else None)
+            if order is not None:
+                changed[id(order)] = order
+    if not changed:
+        return
+
+    version = next_change_version(session.connection())
+    for order in changed.values():
+        order.change_version = version
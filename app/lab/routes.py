@@ -1,87 +1,76 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import current_user
 from app.lab import bp
 from app.utils import roles_required
 from app.lab.forms import LabOrderForm, LabResultForm, LabOrderSearchForm
-from app.lab.models import LabOrder, LabResult, db
+from app.lab.models import LabOrder, LabResult, current_change_version, db
+from app.lab.ingest import BatchFormatError, ingest_batch, report_json
+from app.lab.worklist import WorklistFilters, status_counts, worklist_feed, worklist_page
 from app.patients.models import Patient
-from app.auth.models import User
-from datetime import datetime, timedelta
+from datetime import datetime
 
-@bp.route('/dashboard', methods=['GET', 'POST'])
+def _parse_date(value):
+    """Parse a YYYY-MM-DD filter value, ignoring malformed ones."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+def _worklist_filters():
+    """Read the worklist filters from the query string or the posted search form."""
+    values = request.values
+    status = values.get('status') or 'Ordered'
+    return WorklistFilters(
+        patient_name=values.get('patient_name', '').strip() or None,
+        test_type=values.get('test_type') or None,
+        ordered_by=values.get('ordered_by', '').strip() or None,
+        start_date=_parse_date(values.get('start_date')),
+        end_date=_parse_date(values.get('end_date')),
+        # 'all' shows every status
+        status=None if status == 'all' else status
+    )
+
+@bp.route('/lab/dashboard', methods=['GET', 'POST'])
 @roles_required('Lab Technician')
 def technician_dashboard():
     form = LabOrderSearchForm()
-    
-    # Get filter parameters from form or query args
-    patient_name = request.args.get('patient_name') or request.form.get('patient_name', '')
-    test_type = request.args.get('test_type') or request.form.get('test_type', '')
-    ordered_by = request.args.get('ordered_by') or request.form.get('ordered_by', '')
-    start_date = request.args.get('start_date') or request.form.get('start_date')
-    end_date = request.args.get('end_date') or request.form.get('end_date')
-    status = request.args.get('status') or request.form.get('status', 'Ordered')
-    
-    # Build query
-    query = LabOrder.query
-    
-    # Apply filters
-    if patient_name:
-        query = query.join(Patient).filter(
-            db.or_(
-                Patient.first_name.ilike(f"%{patient_name}%"),
-                Patient.last_name.ilike(f"%{patient_name}%")
-            )
-        )
-    
-    if test_type and test_type != '':
-        query = query.filter(LabOrder.test_type == test_type)
-    
-    if ordered_by:
-        query = query.join(User, LabOrder.ordered_by == User.id).filter(
-            db.or_(
-                User.first_name.ilike(f"%{ordered_by}%"),
-                User.last_name.ilike(f"%{ordered_by}%")
-            )
-        )
-    
-    if start_date:
-        if isinstance(start_date, str):
-            try:
-                from datetime import datetime
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            except ValueError:
-                start_date = None
-        if start_date:
-            query = query.filter(LabOrder.order_date >= start_date)
-    
-    if end_date:
-        if isinstance(end_date, str):
-            try:
-                from datetime import datetime
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            except ValueError:
-                end_date = None
-        if end_date:
-            # Add one day to include the entire end date
-            end_date_plus_one = datetime.combine(end_date, datetime.min.time()) + timedelta(days=1)
-            query = query.filter(LabOrder.order_date < end_date_plus_one)
-    
-    # Apply status filter (special handling for 'all')
-    if status and status != 'all':
-        query = query.filter(LabOrder.status == status)
-    
-    # Order by order_date descending
-    lab_orders = query.order_by(LabOrder.order_date.desc()).all()
+    filters = _worklist_filters()
+    status = filters.status or 'all'
+    
+    # Read the version first, so the poller picks up orders changed while the page renders
+    version = current_change_version()
+    try:
+        page = worklist_page(filters, cursor=request.args.get('cursor'))
+    except ValueError:
+        flash('The worklist page is no longer valid. Showing the newest orders.', 'error')
+        page = worklist_page(filters)
+    counts = status_counts(filters)
     
     # Set form data for display
-    form.patient_name.data = patient_name
-    form.test_type.data = test_type
-    form.ordered_by.data = ordered_by
-    form.start_date.data = start_date if isinstance(start_date, (datetime, type(None))) else None
-    form.end_date.data = end_date if isinstance(end_date, (datetime, type(None))) else None
+    form.patient_name.data = filters.patient_name
+    form.test_type.data = filters.test_type
+    form.ordered_by.data = filters.ordered_by
+    form.start_date.data = filters.start_date
+    form.end_date.data = filters.end_date
     form.status.data = status
     
-    return render_template('lab/dashboard.html', lab_orders=lab_orders, form=form, status=status)
+    # Query string of the current filters, for the next page link and the poller
+    filter_args = {key: value for key, value in request.values.items() if key not in ('cursor', 'csrf_token', 'submit')}
+    return render_template('lab/dashboard.html', lab_orders=page.orders, next_cursor=page.next_cursor,
+                           counts=counts, form=form, status=status, filter_args=filter_args,
+                           version=version)
+
+@bp.route('/api/lab/worklist', methods=['GET'])
+@roles_required('Lab Technician')
+def worklist_data():
+    # Full first page, or only the orders changed since the client's last poll
+    feed = worklist_feed(_worklist_filters(), since=request.args.get('since', type=int))
+    
+    # The feed for a given URL only changes when the change counter moves
+    response = jsonify(feed)
+    response.set_etag(f"lab-worklist-{feed['version']}")
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
 @bp.route('/patients/<string:patient_id>/lab_orders', methods=['GET'])
 @roles_required('Doctor')
@@ -169,6 +158,29 @@ def enter_lab_result(patient_id, order_id):
     
     return render_template('lab/enter_result.html', form=form, patient=patient, lab_order=lab_order)
 
+@bp.route('/api/lab/results/batch', methods=['POST'])
+@roles_required('Lab Technician')
+def ingest_result_batch():
+    # A CSV or JSON batch, posted as the request body or as an uploaded file
+    upload = request.files.get('file')
+    if upload:
+        content = upload.read().decode('utf-8-sig', errors='replace')
+        default_format = 'json' if upload.filename.lower().endswith('.json') else 'csv'
+    else:
+        content = request.get_data(as_text=True)
+        default_format = 'json' if request.is_json else 'csv'
+    batch_format = request.args.get('format', default_format)
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    
+    try:
+        report = ingest_batch(content, batch_format, performed_by=str(current_user.id), dry_run=dry_run)
+    except BatchFormatError as e:
+        return {'error': str(e)}, 400
+    
+    result = report_json(report)
+    result['dry_run'] = dry_run
+    return jsonify(result)
+
 @bp.route('/help', methods=['GET'])
 @roles_required('Lab Technician')
 def help():
@@ -0,0 +1,207 @@
+"""
+Lab technician worklist.
+
+The worklist lists lab orders newest first, optionally filtered by patient
+name, test type, ordering physician, order date range and status. Pages are
+read with the keyset cursors of the patient search engine on
+``(order_date, id)``, so a busy lab with years of historical orders pays
+the same for every page. Each page is one joined query that selects only
+the columns the worklist shows (patient and physician names included), plus
+one query for the results of the orders on the page.
+
+Per-status counts for the same filters come from one GROUP BY query.
+
+Polling clients use the lab order change counter (see app.lab.models): a
+client passes the version of its last poll as ``since`` and only receives
+the orders changed after it. Changed orders that no longer match its
+filters come back as ids to drop.
+"""
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import func, or_, select, tuple_
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.auth.models import User
+from app.lab.models import LabOrder, LabResult, current_change_version
+from app.patients.models import Patient
+from app.patients.search import decode_cursor, encode_cursor, name_prefix_condition
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Statuses the worklist counts, in display order
+WORKLIST_STATUSES = ('Ordered', 'Completed', 'Cancelled')
+
+# The worklist has a single ordering, so every cursor carries the same rank
+WORKLIST_RANK = 0
+
+# Filters of a worklist view; every field is optional
+WorklistFilters = namedtuple('WorklistFilters', ['patient_name', 'test_type', 'ordered_by', 'start_date',
+                                                 'end_date', 'status'])
+WorklistFilters.__new__.__defaults__ = (None,) * len(WorklistFilters._fields)
+
+WorklistPage = namedtuple('WorklistPage', ['orders', 'next_cursor'])
+
+# One worklist row; the result fields are None until a result is entered
+WorklistOrder = namedtuple('WorklistOrder', ['id', 'patient_id', 'test_type', 'order_date', 'status',
+                                             'patient_first_name', 'patient_last_name', 'orderer_first_name',
+                                             'orderer_last_name', 'result_date', 'performer_first_name',
+                                             'performer_last_name'])
+
+Orderer = aliased(User, name='orderer')
+Performer = aliased(User, name='performer')
+
+
+def _filter_conditions(filters, with_status=True):
+    """Get the conditions on LabOrder for a set of filters."""
+    conditions = []
+    if filters.patient_name:
+        condition = name_prefix_condition(filters.patient_name)
+        if condition is not None:
+            conditions.append(LabOrder.patient_id.in_(select(Patient.id).where(condition)))
+    if filters.test_type:
+        conditions.append(LabOrder.test_type == filters.test_type)
+    if filters.ordered_by:
+        pattern = f'%{filters.ordered_by}%'
+        conditions.append(LabOrder.ordered_by.in_(
+            select(User.id).where(or_(User.first_name.ilike(pattern), User.last_name.ilike(pattern)))
+        ))
+    # Whole days, as half-open ranges on the bare column
+    if filters.start_date:
+        conditions.append(LabOrder.order_date >= datetime.combine(filters.start_date, time.min))
+    if filters.end_date:
+        conditions.append(LabOrder.order_date < datetime.combine(filters.end_date, time.min) + timedelta(days=1))
+    if with_status and filters.status:
+        conditions.append(LabOrder.status == filters.status)
+    return conditions
+
+
+def _order_rows(conditions, limit=None):
+    query = db.session.query(
+        LabOrder.id, LabOrder.patient_id, LabOrder.test_type, LabOrder.order_date, LabOrder.status,
+        Patient.first_name, Patient.last_name, Orderer.first_name, Orderer.last_name
+    ).join(
+        Patient, Patient.id == LabOrder.patient_id
+    ).outerjoin(
+        Orderer, Orderer.id == LabOrder.ordered_by
+    ).filter(*conditions).order_by(LabOrder.order_date.desc(), LabOrder.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def _with_results(rows):
+    """Add the first result of each order (the earliest by result date) to its row, with one query for all of them."""
+    results = {}
+    if rows:
+        for order_id, result_date, first_name, last_name in db.session.query(
+            LabResult.order_id, LabResult.result_date, Performer.first_name, Performer.last_name
+        ).outerjoin(
+            Performer, Performer.id == LabResult.performed_by
+        ).filter(
+            LabResult.order_id.in_([row[0] for row in rows])
+        ).order_by(LabResult.result_date, LabResult.created_at):
+            results.setdefault(order_id, (result_date, first_name, last_name))
+    return [WorklistOrder(*row, *results.get(row[0], (None, None, None))) for row in rows]
+
+
+def worklist_page(filters, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Get one page of the lab worklist.
+
+    Args:
+        filters (WorklistFilters): Filters of the view
+        cursor (str): Cursor returned with the previous page, or None for the first page
+        limit (int): Page size, capped at MAX_PAGE_SIZE
+
+    Returns:
+        WorklistPage: The WorklistOrder rows on this page and the cursor of the next page,
+        or None if this is the last page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    conditions = _filter_conditions(filters)
+    if cursor:
+        rank, order_date, order_id = decode_cursor(cursor)
+        if rank != WORKLIST_RANK or not isinstance(order_date, str):
+            raise ValueError('Invalid worklist cursor')
+        conditions.append(tuple_(LabOrder.order_date, LabOrder.id) <
+                          tuple_(datetime.fromisoformat(order_date), order_id))
+    rows = _order_rows(conditions, limit + 1)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(WORKLIST_RANK, rows[-1].order_date.isoformat(), rows[-1].id)
+    return WorklistPage(_with_results(rows), next_cursor)
+
+
+def status_counts(filters):
+    """
+    Count the orders matching a view's filters, by status, with a single query.
+
+    Args:
+        filters (WorklistFilters): Filters of the view; its status filter is ignored
+
+    Returns:
+        dict: Status -> number of orders, with every status of WORKLIST_STATUSES present
+    """
+    counts = dict.fromkeys(WORKLIST_STATUSES, 0)
+    counts.update(db.session.query(LabOrder.status, func.count(LabOrder.id))
+                  .filter(*_filter_conditions(filters, with_status=False))
+                  .group_by(LabOrder.status))
+    return counts
+
+
+def worklist_order_json(order):
+    """Format a worklist row for the JSON feed."""
+    return {
+        'id': order.id,
+        'patient_id': order.patient_id,
+        'patient_name': f'{order.patient_first_name} {order.patient_last_name}',
+        'test_type': order.test_type,
+        'order_date': order.order_date.isoformat() if order.order_date else None,
+        'status': order.status,
+        'ordered_by': f'{order.orderer_first_name} {order.orderer_last_name}' if order.orderer_first_name else None,
+        'result_date': order.result_date.isoformat() if order.result_date else None,
+        'performed_by': (f'{order.performer_first_name} {order.performer_last_name}'
+                         if order.performer_first_name else None),
+    }
+
+
+def worklist_feed(filters, since=None):
+    """
+    Build the worklist feed for polling clients, as the first page or as a delta.
+
+    Args:
+        filters (WorklistFilters): Filters of the view
+        since (int): Change version of the client's last poll, or None for the first page
+
+    Returns:
+        dict: ``version`` to send back as ``since`` next time, ``delta`` telling whether this
+        is a delta, ``orders`` to add or replace, ``counts`` by status and, for deltas,
+        ``removed`` ids of changed orders that no longer match the filters; the first page
+        also carries ``next_cursor``. Deltas of a poll with nothing changed carry no
+        ``counts``, as they cannot have changed either.
+    """
+    # Read the version first; orders changed in the meantime are simply sent again next time
+    version = current_change_version()
+    if since == version:
+        # Nothing changed since the client's last poll
+        return {'version': version, 'delta': True, 'removed': [], 'orders': []}
+    counts = status_counts(filters)
+    if since is None or since < 0 or since > version:
+        page = worklist_page(filters)
+        return {'version': version, 'delta': False, 'counts': counts, 'next_cursor': page.next_cursor,
+                'orders': [worklist_order_json(order) for order in page.orders]}
+
+    changed = LabOrder.change_version > since
+    orders = _with_results(_order_rows(_filter_conditions(filters) + [changed]))
+    matching = {order.id for order in orders}
+    removed = [order_id for order_id, in db.session.query(LabOrder.id).filter(changed) if order_id not in matching]
+    return {'version': version, 'delta': True, 'counts': counts, 'removed': removed,
+            'orders': [worklist_order_json(order) for order in orders]}
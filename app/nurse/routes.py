@@ -7,31 +7,20 @@ from app.clinical_notes.models import ClinicalNote
 from app.patients.models import Patient, Vitals, Allergy
 from app.hospital.models import Admission, Bed, Ward
 from app.auth.models import User
-from datetime import date, datetime, timedelta
+from app.appointments.queries import appointment_rows
+from app.appointments.windows import day_window, hospital_today
 
 
 @bp.route('/patients')
 @roles_required('Nurse')
 def dashboard():
     try:
-        # Get today's date
-        today = date.today()
+        # Get today's date at the hospital
+        today = hospital_today()
         
         # Get today's appointments (for all doctors, as nurses may assist with appointments)
-        today_appointments = Appointment.query.filter(
-            Appointment.scheduled_time >= today,
-            Appointment.scheduled_time < today + timedelta(days=1)
-        ).order_by(Appointment.scheduled_time).all()
-        
-        # Preload related data to avoid N+1 query problem
-        for appointment in today_appointments:
-            appointment.patient = Patient.query.get(appointment.patient_id)
-            appointment.doctor = User.query.get(appointment.doctor_id)
-            if appointment.room_id:
-                from app.hospital.models import Room
-                appointment.room = Room.query.get(appointment.room_id)
-            else:
-                appointment.room = None
+        window = day_window(today)
+        today_appointments = appointment_rows(start=window.start, end=window.end)
         
         # Get recent patient encounters (last 5 vital signs recorded by any user)
         recent_encounters = Vitals.query.order_by(Vitals.date.desc()).limit(5).all()
@@ -73,7 +62,7 @@ def dashboard():
     except Exception as e:
         flash(f'Error loading dashboard: {str(e)}', 'error')
         # Get today's date for error case
-        today = date.today()
+        today = hospital_today()
         return render_template('nurse/dashboard.html',
                               today_appointments=[],
                               recent_encounters=[],
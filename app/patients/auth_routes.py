@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, current_user
 from app.patients.auth import bp
 from app.patients.auth_forms import PatientLoginForm, PatientRegistrationForm
 from app.patients.models import PatientUser, Patient, db
+from app.auth.principal import is_patient_principal
 from urllib.parse import urlparse
 
 @bp.route('/')
@@ -11,7 +12,7 @@ def home():
 
 @bp.route('/patient/login', methods=['GET', 'POST'])
 def patient_login():
-    if current_user.is_authenticated and isinstance(current_user, PatientUser):
+    if current_user.is_authenticated and is_patient_principal(current_user):
         return redirect(url_for('patients.patient_dashboard'))
     
     form = PatientLoginForm()
@@ -41,7 +42,7 @@ def patient_logout():
 
 @bp.route('/patient/register', methods=['GET', 'POST'])
 def patient_register():
-    if current_user.is_authenticated and isinstance(current_user, PatientUser):
+    if current_user.is_authenticated and is_patient_principal(current_user):
         return redirect(url_for('patients.patient_dashboard'))
     
     form = PatientRegistrationForm()
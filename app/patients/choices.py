@@ -0,0 +1,77 @@
+"""
+Choice lists for the patient forms.
+
+The payor type, payor detail and nationality dropdowns of PatientForm and
+PatientRegistrationForm are built from the reference data cache once per
+version of the tables behind them, and the same (immutable) lists are shared
+by every form instance. Constructing a form costs one read of the version
+counters instead of a query per lookup table.
+"""
+import threading
+from collections import namedtuple
+
+from flask import current_app
+
+from app.system_params.reference import get_reference_tables
+
+CHOICE_TABLES = ('payor_types', 'payor_details', 'nationalities')
+
+PAYOR_TYPE_PLACEHOLDER = ('', 'Select Payor Type')
+PAYOR_DETAIL_PLACEHOLDER = ('', 'Select Payor Type First')
+NATIONALITY_PLACEHOLDER = ('', 'Select Nationality')
+
+_choices_lock = threading.Lock()
+
+
+class PatientFormChoices(namedtuple('PatientFormChoices', ['version', 'payor_types', 'payor_details',
+                                                           'nationalities'])):
+    """(value, label) choice tuples for the patient forms, as of one version of the reference tables."""
+
+    def payor_detail_choices(self, payor_type):
+        """
+        Get the payor detail choices for a payor type.
+
+        Args:
+            payor_type (str): Payor type name, or None
+
+        Returns:
+            tuple: Choices, starting with a placeholder
+        """
+        if not payor_type:
+            return (PAYOR_DETAIL_PLACEHOLDER,)
+        return self.payor_details.get(payor_type, (('', f'Select {payor_type} Detail'),))
+
+
+def _build_choices(version, tables):
+    payor_types = tables['payor_types'].items(active_only=True)
+    payor_type_names = {row.id: row.name for row in payor_types}
+    details = {name: [] for name in payor_type_names.values()}
+    for row in tables['payor_details'].items(active_only=True):
+        if row.parent_id in payor_type_names:
+            details[payor_type_names[row.parent_id]].append((row.name, row.name))
+    return PatientFormChoices(
+        version=version,
+        payor_types=(PAYOR_TYPE_PLACEHOLDER,) + tuple((row.name, row.name) for row in payor_types),
+        payor_details={name: (('', f'Select {name} Detail'),) + tuple(choices) for name, choices in details.items()},
+        nationalities=(NATIONALITY_PLACEHOLDER,) + tuple((row.id, row.name)
+                                                         for row in tables['nationalities'].items())
+    )
+
+
+def get_patient_form_choices():
+    """
+    Get the shared choice lists for the patient forms, rebuilding them if the reference data changed.
+
+    Returns:
+        PatientFormChoices: The current choice lists
+    """
+    tables = get_reference_tables(CHOICE_TABLES)
+    version = tuple(tables[table].version for table in CHOICE_TABLES)
+    choices = current_app.extensions.get('patient_form_choices')
+    if choices is None or choices.version != version:
+        with _choices_lock:
+            choices = current_app.extensions.get('patient_form_choices')
+            if choices is None or choices.version != version:
+                choices = _build_choices(version, tables)
+                current_app.extensions['patient_form_choices'] = choices
+    return choices
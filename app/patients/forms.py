@@ -5,6 +5,7 @@ import requests
 import json
 from flask import current_app
 from app.system_params.models import SystemParameter, PayorType, PayorDetail, IDType, Race, Ethnicity
+from app.patients.choices import get_patient_form_choices
 
 # Choice constants for better organization and reusability
 ETHNICITY_CHOICES = [
@@ -104,7 +105,7 @@ class PatientForm(FlaskForm):
     privacy_practices_acknowledged = SelectField('Privacy Practices Acknowledged', choices=[(True, 'Yes'), (False, 'No')], default=False)
     submit = SubmitField('Save Patient')
 
-    def __init__(self, *args, db=None, **kwargs):
+    def __init__(self, *args, **kwargs):
         super(PatientForm, self).__init__(*args, **kwargs)
         # Fetch nationalities from the API
         # try:
@@ -125,23 +126,13 @@ class PatientForm(FlaskForm):
             # self.ethnicity.choices = get_ethnicities(db)
 
         
-        # Set payor type choices
-        if db:
-            payor_types = db.session.query(PayorType).filter_by(is_active=True).all()
-            self.payor_type.choices = [('', 'Select Payor Type')] + [(pt.name, pt.name) for pt in payor_types]
-        else:
-            self.payor_type.choices = [('', 'Select Payor Type')]
+        # Choice lists shared by every form instance, rebuilt only when the reference data changes
+        self.reference_choices = get_patient_form_choices()
+        self.payor_type.choices = self.reference_choices.payor_types
         
         # Set payor detail choices based on payor type
         payor_type = kwargs.get('obj', None) and getattr(kwargs['obj'], 'payor_type', None)
-        if payor_type and db:
-            payor_details = db.session.query(PayorDetail).join(PayorType).filter(
-                PayorType.name == payor_type,
-                PayorDetail.is_active == True
-            ).all()
-            self.payor_detail.choices = [('', f'Select {payor_type} Detail')] + [(pd.name, pd.name) for pd in payor_details]
-        else:
-            self.payor_detail.choices = [('', 'Select Payor Type First')]
+        self.payor_detail.choices = self.reference_choices.payor_detail_choices(payor_type)
 
     def get_payor_detail_choices(self, payor_type):
         """Return payor detail choices based on payor type"""
@@ -154,6 +145,7 @@ class PatientForm(FlaskForm):
         return payor_details.get(payor_type, [('', 'Select Payor Type First')])
 
 class PatientSearchForm(FlaskForm):
+    q = StringField('MRN, ID Number, Phone or Name', validators=[Optional()])
     first_name = StringField('First Name', validators=[Optional()])
     last_name = StringField('Last Name', validators=[Optional()])
     date_of_birth = DateField('Date of Birth', validators=[Optional()])
@@ -250,31 +242,9 @@ class PatientRegistrationForm(PatientForm):
     submit = SubmitField('Register Patient')
 
     def __init__(self, *args, **kwargs):
+        # Payor type and detail choices are set by PatientForm
         super(PatientRegistrationForm, self).__init__(*args, **kwargs)
-        # Set payor type choices
-        if hasattr(self, 'db') and self.db:
-            payor_types = self.db.session.query(PayorType).filter_by(is_active=True).all()
-            self.payor_type.choices = [('', 'Select Payor Type')] + [(pt.name, pt.name) for pt in payor_types]
-        else:
-            self.payor_type.choices = [('', 'Select Payor Type')]
-        
-        # Set payor detail choices based on payor type
-        payor_type = kwargs.get('obj', None) and getattr(kwargs['obj'], 'payor_type', None)
-        if payor_type and hasattr(self, 'db') and self.db:
-            payor_details = self.db.session.query(PayorDetail).join(PayorType).filter(
-                PayorType.name == payor_type,
-                PayorDetail.is_active == True
-            ).all()
-            self.payor_detail.choices = [('', f'Select {payor_type} Detail')] + [(pd.name, pd.name) for pd in payor_details]
-        else:
-            self.payor_detail.choices = [('', 'Select Payor Type First')]
-            
-        # Set nationality choices from database
-        if hasattr(self, 'db') and self.db:
-            nationalities = self.db.session.query(Nationality).all()
-            self.nationality_id.choices = [('', 'Select Nationality')] + [(n.id, n.name) for n in nationalities]
-        else:
-            self.nationality_id.choices = [('', 'Select Nationality')]
+        self.nationality_id.choices = self.reference_choices.nationalities
 
 class MedicationForm(FlaskForm):
     drug_name = StringField('Drug Name', validators=[DataRequired()])
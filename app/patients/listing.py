@@ -0,0 +1,110 @@
+"""
+Patient list and export.
+
+The list is ordered by last name then first name, using the normalized
+``search_name_reversed`` column and its ``(search_name_reversed, id)`` index,
+and is paginated with the same keyset cursors as the search engine. Only the
+columns the list shows are loaded.
+
+Exports stream every patient as CSV or NDJSON. Rows are fetched in batches
+with ``yield_per`` and written out as they arrive, so memory use does not
+grow with the size of the registry.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from sqlalchemy import tuple_
+
+from app import db
+from app.patients.models import Patient
+from app.patients.search import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, RESULT_COLUMNS, SearchPage, decode_cursor, \
+    encode_cursor
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+# The list has a single ordering, so every cursor carries the same rank
+LIST_RANK = 0
+
+
+def list_patients_page(cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Get one page of the patient list.
+
+    Args:
+        cursor (str): Cursor returned with the previous page, or None for the first page
+        limit (int): Page size, capped at MAX_PAGE_SIZE
+
+    Returns:
+        SearchPage: The patients on this page (column-limited rows) and the cursor of the next page,
+        or None if this is the last page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    sort_column = Patient.search_name_reversed
+    query = db.session.query(*RESULT_COLUMNS, sort_column.label('sort_value'))
+    if cursor:
+        rank, sort_value, patient_id = decode_cursor(cursor)
+        if rank != LIST_RANK:
+            raise ValueError('Invalid list cursor')
+        query = query.filter(tuple_(sort_column, Patient.id) > tuple_(sort_value, patient_id))
+    rows = query.order_by(sort_column, Patient.id).limit(limit + 1).all()
+
+    if len(rows) > limit:
+        last_row = rows[limit - 1]
+        return SearchPage(rows[:limit], encode_cursor(LIST_RANK, last_row.sort_value, last_row.id))
+    return SearchPage(rows, None)
+
+
+def _export_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def iter_export_rows(batch_size=EXPORT_BATCH_SIZE):
+    """Yield every patient as a dict of the exported columns, fetching ``batch_size`` rows at a time."""
+    query = db.session.query(*RESULT_COLUMNS).order_by(Patient.search_name_reversed, Patient.id)
+    for row in query.yield_per(batch_size):
+        yield {key: _export_value(value) for key, value in row._mapping.items()}
+
+
+def generate_export(export_format, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Generate the patient export as chunks of text, one chunk per batch of rows.
+
+    Args:
+        export_format (str): 'csv' or 'ndjson'
+        batch_size (int): Rows fetched from the database and written per chunk
+
+    Raises:
+        ValueError: If the export format is not supported
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported export format: {export_format}')
+
+    def generate():
+        buffer = io.StringIO()
+        writer = None
+        if export_format == 'csv':
+            writer = csv.DictWriter(buffer, fieldnames=[column.key for column in RESULT_COLUMNS])
+            writer.writeheader()
+
+        for count, row in enumerate(iter_export_rows(batch_size), start=1):
+            if writer:
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(row) + '\n')
+            if count % batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    return generate()
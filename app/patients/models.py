@@ -8,7 +8,20 @@ import uuid
 # Import choice constants from forms for reference
 from app.patients.forms import ETHNICITY_CHOICES, PREFERRED_LANGUAGE_CHOICES
 
+
+def search_string(length):
+    """String type for normalized search columns; byte-wise collation on PostgreSQL keeps prefix range scans exact."""
+    return db.String(length).with_variant(db.String(length, collation='C'), 'postgresql')
+
 class Patient(db.Model):
+    __table_args__ = (
+        # Search indexes end with id so keyset pages are read straight from the index
+        db.Index('ix_patient_search_name', 'search_name', 'id'),
+        db.Index('ix_patient_search_name_reversed', 'search_name_reversed', 'id'),
+        db.Index('ix_patient_search_phone', 'search_phone', 'id'),
+        db.Index('ix_patient_search_id_card', 'search_id_card', 'id'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
@@ -56,6 +69,11 @@ class Patient(db.Model):
     is_deceased = db.Column(db.Boolean, default=False)
     consent_to_treat = db.Column(db.Boolean, nullable=True)
     privacy_practices_acknowledged = db.Column(db.Boolean, nullable=True)
+    # Normalized copies of searchable fields, maintained by app.patients.search
+    search_name = db.Column(search_string(101), nullable=True)  # "first last"
+    search_name_reversed = db.Column(search_string(101), nullable=True)  # "last first"
+    search_phone = db.Column(search_string(20), nullable=True)
+    search_id_card = db.Column(search_string(50), nullable=True)
 
     # Use string reference for the relationship to avoid circular import
     nationality = db.relationship('Nationality', backref=db.backref('patients', lazy=True))
@@ -92,6 +110,11 @@ class Nationality(db.Model):
         return f'<Nationality {self.name}>'
 
 class Vitals(db.Model):
+    __table_args__ = (
+        # Timeline reads a patient's readings newest first straight from this index
+        db.Index('ix_vitals_patient_id_date', 'patient_id', 'date', 'id'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     patient_id = db.Column(db.String(36), db.ForeignKey('patient.id'), nullable=False)
     recorded_by = db.Column(db.String(50), nullable=False)
@@ -146,6 +169,11 @@ class PatientUser(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    def get_id(self):
+        # Typed session id, so the user loader only queries the patient user table
+        from app.auth.principal import PATIENT_PRINCIPAL, session_id
+        return session_id(PATIENT_PRINCIPAL, self.id)
+
     def __repr__(self):
         return f'<PatientUser {self.username}>'
 
@@ -154,53 +182,16 @@ from app.system_params.models import get_all_nationalities
 from sqlalchemy import func
 
 
+# Sequence backing MRN allocation on PostgreSQL (ignored by other databases)
+mrn_sequence = db.Sequence('patient_mrn_seq', minvalue=1, maxvalue=99999999, metadata=db.metadata)
+
+
 def generate_mrn():
     """
     Generate a new MRN in the format "00-00-00-00".
-    The MRN is generated by incrementing the last used MRN stored in system parameters.
+    The MRN is taken from a block of MRNs leased by the application's MRN allocator,
+    so this does not touch or commit the caller's database session.
     """
-    # Get the last used MRN from system parameters
-    # Import SystemParameter inside the function to avoid circular import
-    from app.system_params.models import SystemParameter
-    last_mrn_param = SystemParameter.query.filter_by(name='last_mrn').first()
-    
-    if last_mrn_param:
-        # Parse the last MRN
-        last_mrn = last_mrn_param.value  # Format: "00-00-00-00"
-        parts = last_mrn.split('-')  # Split into parts
-        # Convert to integers and increment the last part
-        numbers = [int(part) for part in parts]
-        
-        # Increment the MRN (handling carry-over)
-        carry = 1
-        for i in range(len(numbers) - 1, -1, -1):
-            numbers[i] += carry
-            if numbers[i] > 99:
-                numbers[i] = 0
-                carry = 1
-            else:
-                carry = 0
-                break
-        
-        # Format the new MRN
-        new_mrn = '-'.join(f"{num:02d}" for num in numbers)
-    else:
-        # If no last MRN exists, start with "00-00-00-01"
-        new_mrn = "00-00-00-01"
-    
-    # Update the system parameter with the new MRN
-    if last_mrn_param:
-        last_mrn_param.value = new_mrn
-    else:
-        # Create a new system parameter if it doesn't exist
-        last_mrn_param = SystemParameter(
-            name='last_mrn',
-            value=new_mrn,
-            description='Last used Medical Record Number for patient registration'
-        )
-        db.session.add(last_mrn_param)
-    
-    # Commit the changes to the database
-    db.session.commit()
-    
-    return new_mrn
\ No newline at end of file
+    # Import inside the function to avoid circular import
+    from app.patients.mrn import get_mrn_allocator
+    return get_mrn_allocator().allocate()
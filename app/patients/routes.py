@@ -1,12 +1,20 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, Response, stream_with_context
 from flask_login import current_user
 from app.patients import bp
 from app.utils import roles_required
 from app.patients.forms import PatientForm, PatientSearchForm, VitalsForm, AllergyForm, MedicationForm, PatientRegistrationForm
-from app.patients.models import Patient, Vitals, Allergy, Medication, db, PatientUser, generate_mrn
+from app.patients.models import Patient, Vitals, Allergy, Medication, db, generate_mrn
+from app.patients.search import find_patients
+from app.patients.listing import list_patients_page, generate_export
+from app.patients.timeline import TIMELINE_TYPES, get_patient_timeline
 from app.auth.models import User
+from app.auth.principal import is_patient_principal
 from app.clinical_notes.models import ClinicalNote
 from app.hospital.models import Admission
+
+# Search form fields passed to the patient search engine
+SEARCH_FIELDS = ('q', 'first_name', 'last_name', 'date_of_birth', 'gender', 'phone')
+
 def is_patient_admitted(patient_id):
     """Check if a patient is currently admitted"""
     admission = Admission.query.filter_by(
@@ -24,9 +32,29 @@ def index():
 @bp.route('/patients/list', methods=['GET'])
 @roles_required('Receptionist', 'Doctor', 'Nurse')
 def list_patients():
-    # Get all patients
-    patients = Patient.query.all()
-    return render_template('patients/list.html', patients=patients)
+    # Get one page of patients, loading only the columns the list shows
+    cursor = request.args.get('cursor')
+    try:
+        page = list_patients_page(cursor=cursor)
+    except ValueError:
+        flash('The patient list has changed, showing the first page.', 'warning')
+        return redirect(url_for('patients.list_patients'))
+    return render_template('patients/list.html', patients=page.patients, next_cursor=page.next_cursor,
+                           is_first_page=not cursor)
+
+@bp.route('/patients/export.<export_format>', methods=['GET'])
+@roles_required('Receptionist', 'Doctor', 'Nurse')
+def export_patients(export_format):
+    # Stream the whole registry instead of building it in memory
+    mimetypes = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+    if export_format not in mimetypes:
+        flash('Unsupported export format.', 'error')
+        return redirect(url_for('patients.list_patients'))
+    return Response(
+        stream_with_context(generate_export(export_format)),
+        mimetype=mimetypes[export_format],
+        headers={'Content-Disposition': f'attachment; filename=patients.{export_format}'}
+    )
 
 @bp.route('/patients/<id>', methods=['GET'])
 @roles_required('Doctor', 'Nurse', 'Receptionist')
@@ -38,7 +66,7 @@ def view_patient(id):
 @bp.route('/patients/new', methods=['GET', 'POST'])
 @roles_required('Receptionist')
 def create_patient():
-    form = PatientRegistrationForm(db=db)
+    form = PatientRegistrationForm()
     if form.validate_on_submit():
         try:
             # Generate MRN for the new patient
@@ -110,7 +138,7 @@ def create_patient():
 @roles_required('Receptionist')
 def edit_patient(id):
     patient = Patient.query.get_or_404(id)
-    form = PatientForm(obj=patient, db=db)
+    form = PatientForm(obj=patient)
 
     if form.validate_on_submit():
         try:
@@ -205,29 +233,23 @@ def test_receptionist_only():
 def test_multiple_roles():
     return "Success! You are either a Doctor or Nurse (or have one of these roles)."
 
-@bp.route('/patients/search', methods=['GET', 'POST'])
+@bp.route('/patients/search', methods=['GET'])
 @roles_required('Receptionist', 'Doctor')
 def search_patients():
-    form = PatientSearchForm()
-    patients = []
-    if form.validate_on_submit() or request.method == 'GET':
-        # Build query based on form data
-        query = Patient.query
-        
-        if form.first_name.data:
-            query = query.filter(Patient.first_name.ilike(f"%{form.first_name.data}%"))
-        if form.last_name.data:
-            query = query.filter(Patient.last_name.ilike(f"%{form.last_name.data}%"))
-        if form.date_of_birth.data:
-            query = query.filter(Patient.date_of_birth == form.date_of_birth.data)
-        if form.gender.data:
-            query = query.filter(Patient.gender == form.gender.data)
-        if form.phone.data:
-            query = query.filter(Patient.phone.ilike(f"%{form.phone.data}%"))
-        
-        patients = query.all()
+    form = PatientSearchForm(request.args, meta={'csrf': False})
+    page = None
+    criteria = {field: form[field].data for field in SEARCH_FIELDS}
 
-    return render_template('patients/search.html', form=form, patients=patients)
+    # Only search once some criteria have been entered
+    if any(criteria.values()) and form.validate():
+        try:
+            page = find_patients(cursor=request.args.get('cursor'), **criteria)
+        except ValueError:
+            flash('The search results page is no longer valid. Please search again.', 'error')
+
+    # Query string for the next page link, without the current cursor
+    search_args = {key: value for key, value in request.args.items() if key != 'cursor'}
+    return render_template('patients/search.html', form=form, page=page, search_args=search_args)
 
 @bp.route('/patients/<patient_id>/vitals', methods=['GET'])
 @roles_required('Doctor', 'Nurse')
@@ -272,52 +294,15 @@ def add_vitals(patient_id):
 @roles_required('Doctor', 'Nurse')
 def view_encounters(patient_id):
     patient = Patient.query.get_or_404(patient_id)
-    
-    # Get all clinical notes for this patient
-    clinical_notes = ClinicalNote.query.filter_by(patient_id=patient.id).order_by(ClinicalNote.date.desc()).all()
-    
-    # Get all vital signs for this patient
-    vitals = Vitals.query.filter_by(patient_id=patient.id).order_by(Vitals.date.desc()).all()
-    
-    # Combine and sort all encounters by date
-    encounters = []
-    
-    # Add clinical notes to encounters list
-    for note in clinical_notes:
-        encounters.append({
-            'type': 'clinical_note',
-            'date': note.date,
-            'data': note
-        })
-    
-    # Add vital signs to encounters list
-    for vital in vitals:
-        encounters.append({
-            'type': 'vital_signs',
-            'date': vital.date,
-            'data': vital
-        })
-    
-    # Add lab results to encounters list
-    from app.lab.models import LabOrder, LabResult
-    lab_orders = LabOrder.query.filter_by(patient_id=patient.id).order_by(LabOrder.order_date.desc()).all()
-    for order in lab_orders:
-        # Only include completed lab orders that have results
-        if order.status == 'Completed' and order.lab_results:
-            for result in order.lab_results:
-                encounters.append({
-                    'type': 'lab_result',
-                    'date': result.result_date,
-                    'data': {
-                        'order': order,
-                        'result': result
-                    }
-                })
-    
-    # Sort encounters by date (most recent first)
-    encounters.sort(key=lambda x: x['date'], reverse=True)
-    
-    return render_template('patients/encounters.html', patient=patient, encounters=encounters)
+    types = [entry_type for entry_type in request.args.getlist('type') if entry_type]
+    try:
+        page = get_patient_timeline(patient.id, types=types, cursor=request.args.get('cursor'))
+    except ValueError:
+        flash('The encounters page is no longer valid. Showing the latest entries.', 'error')
+        return redirect(url_for('patients.view_encounters', patient_id=patient.id))
+
+    return render_template('patients/encounters.html', patient=patient, encounters=page.entries,
+                           next_cursor=page.next_cursor, types=types, timeline_types=TIMELINE_TYPES)
 
 # Allergy routes
 @bp.route('/patients/<patient_id>/allergies', methods=['GET'])
@@ -473,20 +458,17 @@ def edit_medication(patient_id, medication_id):
 @bp.route('/patients/dashboard')
 def patient_dashboard():
     # Check if current user is a PatientUser
-    if not isinstance(current_user, PatientUser):
+    if not is_patient_principal(current_user):
         flash('Access denied. Patients only.', 'error')
         return redirect(url_for('auth.login'))
     
     try:
         # Get upcoming appointments for the patient
         from app.appointments.models import Appointment
+        from app.appointments.windows import hospital_now, upcoming_appointments as next_appointments
         from app.auth.models import User
-        from datetime import datetime
-        upcoming_appointments = Appointment.query.filter(
-            Appointment.patient_id == current_user.patient.id,
-            Appointment.scheduled_time >= datetime.now(),
-            Appointment.status == 'Scheduled'
-        ).order_by(Appointment.scheduled_time.asc()).limit(5).all()
+        now = hospital_now()
+        upcoming_appointments = next_appointments(5, patient_id=current_user.patient.id, after=now).all()
         
         # Preload doctor information for upcoming appointments
         for appointment in upcoming_appointments:
@@ -495,7 +477,7 @@ def patient_dashboard():
         # Get appointment history for the patient
         appointment_history = Appointment.query.filter(
             Appointment.patient_id == current_user.patient.id,
-            (Appointment.scheduled_time < datetime.now()) | (Appointment.status != 'Scheduled')
+            (Appointment.scheduled_time < now) | (Appointment.status != 'Scheduled')
         ).order_by(Appointment.scheduled_time.desc()).limit(5).all()
         
         # Preload doctor information for appointment history
@@ -515,7 +497,7 @@ def patient_dashboard():
 @bp.route('/patients/lab_results', methods=['GET'])
 def view_lab_results():
     # Check if current user is a PatientUser
-    if not isinstance(current_user, PatientUser):
+    if not is_patient_principal(current_user):
         flash('Access denied. Patients only.', 'error')
         return redirect(url_for('auth.login'))
     
@@ -0,0 +1,238 @@
+"""
+Patient search engine.
+
+Searchable fields are copied into normalized ``search_*`` columns on Patient
+(lowercase ASCII "first last" and "last first" names, digits-only phone
+numbers, alphanumeric ID card numbers) whenever a patient is inserted or
+updated. Each column has a composite ``(column, id)`` index.
+
+A search is split into ranked branches (MRN, then ID card number, then phone,
+then name). Every branch is a single equality or prefix predicate, written as
+a range comparison, and is read in index order, so each page is answered with
+a few index range scans that stop as soon as the page is full instead of
+scanning and sorting the registry. Pages are addressed with an opaque keyset
+cursor, so deep pages cost the same as the first one and no request returns
+an unbounded number of rows.
+"""
+import base64
+import json
+import re
+import unicodedata
+from collections import namedtuple
+
+from sqlalchemy import and_, event, or_, tuple_
+
+from app import db
+from app.patients.models import Patient
+from app.patients.mrn import MAX_MRN, format_mrn
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+MIN_PHONE_DIGITS = 4
+
+# Rank of each kind of match; lower ranks are listed first
+RANK_MRN = 0
+RANK_ID_CARD = 1
+RANK_PHONE = 2
+RANK_NAME = 3
+RANK_NAME_REVERSED = 4
+RANK_OTHER = 5
+
+SearchPage = namedtuple('SearchPage', ['patients', 'next_cursor'])
+
+# One ranked part of a search: rows matching ``condition``, read in ``column`` order
+Branch = namedtuple('Branch', ['rank', 'column', 'condition'])
+
+# Only the columns the search results show are loaded
+RESULT_COLUMNS = (
+    Patient.id,
+    Patient.mrn,
+    Patient.first_name,
+    Patient.last_name,
+    Patient.date_of_birth,
+    Patient.gender,
+    Patient.phone,
+    Patient.id_card_number,
+)
+
+
+def normalize_name(value):
+    """Lowercase a name, strip accents and punctuation, and collapse whitespace."""
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value)
+    ascii_only = ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', ascii_only).split())
+
+
+def normalize_digits(value):
+    """Keep only the digits of a value, e.g. a phone number."""
+    return re.sub(r'\D', '', value) if value else ''
+
+
+def normalize_identifier(value):
+    """Keep only the letters and digits of an identifier, lowercased."""
+    return re.sub(r'[^a-z0-9]', '', value.lower()) if value else ''
+
+
+def update_search_columns(patient):
+    """Refresh the normalized search columns of a patient from its current field values."""
+    first_name = normalize_name(patient.first_name)
+    last_name = normalize_name(patient.last_name)
+    patient.search_name = f'{first_name} {last_name}'.strip()[:101]
+    patient.search_name_reversed = f'{last_name} {first_name}'.strip()[:101]
+    patient.search_phone = normalize_digits(patient.phone)[:20] or None
+    patient.search_id_card = normalize_identifier(patient.id_card_number)[:50] or None
+
+
+@event.listens_for(Patient, 'before_insert')
+@event.listens_for(Patient, 'before_update')
+def _refresh_search_columns(mapper, connection, patient):
+    update_search_columns(patient)
+
+
+def encode_cursor(rank, sort_value, patient_id):
+    """Encode the position of the last row on a page as an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps([rank, sort_value, patient_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is malformed."""
+    try:
+        rank, sort_value, patient_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Invalid search cursor')
+    return rank, sort_value, patient_id
+
+
+def _prefix(column, prefix):
+    """Sargable prefix match: a range on the column instead of LIKE 'prefix%'."""
+    upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper_bound)
+
+
+def name_prefix_condition(name):
+    """
+    Get the condition matching patients whose first or last name starts with ``name``.
+
+    Args:
+        name (str): Name or name prefix, in any case and with or without accents
+
+    Returns:
+        Condition on Patient that can be served by the name search indexes, or None if
+        ``name`` holds no searchable characters
+    """
+    name = normalize_name(name)
+    if not name:
+        return None
+    return or_(_prefix(Patient.search_name, name), _prefix(Patient.search_name_reversed, name))
+
+
+def _free_text_branches(q):
+    """
+    Split a free-text query into ranked branches.
+
+    Args:
+        q (str): MRN, ID card number, phone number or (the start of) a name
+
+    Returns:
+        list: Branches in rank order; empty if nothing in the query is searchable
+    """
+    digits = normalize_digits(q)
+    identifier = normalize_identifier(q)
+    branches = []
+
+    if digits and digits == identifier:
+        if len(digits) == 8 and 0 < int(digits) <= MAX_MRN:
+            branches.append(Branch(RANK_MRN, Patient.mrn, Patient.mrn == format_mrn(int(digits))))
+        branches.append(Branch(RANK_ID_CARD, Patient.search_id_card, Patient.search_id_card == identifier[:50]))
+        if len(digits) >= MIN_PHONE_DIGITS:
+            branches.append(Branch(RANK_PHONE, Patient.search_phone, _prefix(Patient.search_phone, digits[:20])))
+        return branches
+
+    if digits:
+        # Letters and digits, e.g. a passport number
+        branches.append(Branch(RANK_ID_CARD, Patient.search_id_card, Patient.search_id_card == identifier[:50]))
+
+    name = normalize_name(q)
+    if name:
+        # "budi san" finds Budi Santoso by "first last", "santoso bu" finds him by "last first"
+        branches.append(Branch(RANK_NAME, Patient.search_name, _prefix(Patient.search_name, name)))
+        branches.append(Branch(RANK_NAME_REVERSED, Patient.search_name_reversed,
+                               _prefix(Patient.search_name_reversed, name)))
+    return branches
+
+
+def find_patients(q=None, first_name=None, last_name=None, date_of_birth=None, gender=None, phone=None,
+                  cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Search patients.
+
+    Args:
+        q (str): Free-text query matched against MRN, ID card number, phone and name
+        first_name (str): First name prefix
+        last_name (str): Last name prefix
+        date_of_birth (date): Exact date of birth
+        gender (str): Exact gender
+        phone (str): Phone number prefix
+        cursor (str): Cursor returned with the previous page, or None for the first page
+        limit (int): Page size, capped at MAX_PAGE_SIZE
+
+    Returns:
+        SearchPage: The matching patients (column-limited rows) and the cursor of the next page,
+        or None if this is the last page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    first_name = normalize_name(first_name)
+    last_name = normalize_name(last_name)
+    phone = normalize_digits(phone)
+
+    first_name_match = _prefix(Patient.search_name, first_name) if first_name else None
+    last_name_match = _prefix(Patient.search_name_reversed, last_name) if last_name else None
+    phone_match = _prefix(Patient.search_phone, phone) if phone else None
+
+    # Field filters narrow whichever branches the search is made of
+    filters = [match for match in (first_name_match, last_name_match, phone_match) if match is not None]
+    if date_of_birth:
+        filters.append(Patient.date_of_birth == date_of_birth)
+    if gender:
+        filters.append(Patient.gender == gender)
+
+    if q:
+        branches = _free_text_branches(q)
+    elif last_name_match is not None:
+        branches = [Branch(RANK_NAME_REVERSED, Patient.search_name_reversed, last_name_match)]
+    elif first_name_match is not None:
+        branches = [Branch(RANK_NAME, Patient.search_name, first_name_match)]
+    elif phone_match is not None:
+        branches = [Branch(RANK_PHONE, Patient.search_phone, phone_match)]
+    elif filters:
+        branches = [Branch(RANK_OTHER, Patient.id, and_(*filters))]
+    else:
+        # Never scan the whole registry for an empty search
+        branches = []
+
+    start_rank, start_value, start_id = decode_cursor(cursor) if cursor else (None, None, None)
+    rows = []
+    excluded = []
+    for branch in branches:
+        if start_rank is None or branch.rank >= start_rank:
+            query = db.session.query(*RESULT_COLUMNS, branch.column.label('sort_value')).filter(
+                branch.condition, *filters, *excluded
+            )
+            if branch.rank == start_rank:
+                query = query.filter(tuple_(branch.column, Patient.id) > tuple_(start_value, start_id))
+            matches = query.order_by(branch.column, Patient.id).limit(limit + 1 - len(rows)).all()
+            rows.extend((branch.rank, row) for row in matches)
+            if len(rows) > limit:
+                break
+        # Patients listed by this branch are not listed again by later ones
+        excluded.append(or_(branch.column.is_(None), ~branch.condition))
+
+    if len(rows) > limit:
+        rank, last_row = rows[limit - 1]
+        return SearchPage([row for _, row in rows[:limit]], encode_cursor(rank, last_row.sort_value, last_row.id))
+    return SearchPage([row for _, row in rows], None)
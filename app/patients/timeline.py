@@ -0,0 +1,145 @@
+"""
+Patient timeline.
+
+Clinical notes, vital signs and completed lab results of a patient, newest
+first, in one list. The entries of a page are picked by a single UNION ALL
+query that selects only ``(type, id, date)`` from each source. Each branch
+is read backwards along its ``(patient_id, date, id)`` index and stops after
+a page worth of rows, and the branches are merged, ordered and limited in
+SQL. The picked entries are then loaded with one query per type, so a page
+costs the same few queries however long the patient's history is.
+
+Pages are addressed with the keyset cursors of the search engine, carrying
+the position ``(date, type, id)`` of the last entry shown.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import and_, literal, or_, select, union_all
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.auth.models import User
+from app.clinical_notes.models import ClinicalNote
+from app.lab.models import LabOrder, LabResult
+from app.patients.models import Vitals
+from app.patients.search import decode_cursor, encode_cursor
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Entry types; entries with the same date are listed in the reverse of this order
+TIMELINE_TYPES = ('clinical_note', 'vital_signs', 'lab_result')
+
+TimelinePage = namedtuple('TimelinePage', ['entries', 'next_cursor'])
+
+# ``data`` is the ClinicalNote, the Vitals, or {'order': LabOrder, 'result': LabResult};
+# ``author`` is the User who wrote, recorded or performed it, if known
+TimelineEntry = namedtuple('TimelineEntry', ['type', 'date', 'data', 'author'])
+
+
+def _sources(patient_id):
+    """Map each entry type to its (id column, date column, conditions)."""
+    return {
+        'clinical_note': (ClinicalNote.id, ClinicalNote.date, [ClinicalNote.patient_id == patient_id]),
+        'vital_signs': (Vitals.id, Vitals.date, [Vitals.patient_id == patient_id]),
+        'lab_result': (LabResult.id, LabResult.result_date, [
+            LabResult.order_id == LabOrder.id,
+            LabOrder.patient_id == patient_id,
+            LabOrder.status == 'Completed',
+        ]),
+    }
+
+
+def _after(rank, id_column, date_column, position):
+    """Condition selecting the rows of one branch that come after ``position`` in timeline order."""
+    cursor_rank, cursor_date, cursor_id = position
+    if rank < cursor_rank:
+        return date_column <= cursor_date
+    if rank > cursor_rank:
+        return date_column < cursor_date
+    return or_(date_column < cursor_date, and_(date_column == cursor_date, id_column < cursor_id))
+
+
+def _decode_position(cursor):
+    rank, date_value, entry_id = decode_cursor(cursor)
+    if not isinstance(rank, int) or not 0 <= rank < len(TIMELINE_TYPES) or not isinstance(date_value, str):
+        raise ValueError('Invalid timeline cursor')
+    return rank, datetime.fromisoformat(date_value), entry_id
+
+
+def _load_entries(keys):
+    """Load the timeline entries for a list of (type, id, date) rows, keeping their order."""
+    ids = {entry_type: [entry_id for key_type, entry_id, _ in keys if key_type == entry_type]
+           for entry_type in TIMELINE_TYPES}
+    loaded = {}
+    if ids['clinical_note']:
+        notes = ClinicalNote.query.options(joinedload(ClinicalNote.author)) \
+            .filter(ClinicalNote.id.in_(ids['clinical_note']))
+        loaded.update((('clinical_note', note.id), (note, note.author)) for note in notes)
+    if ids['vital_signs']:
+        # recorded_by holds the id of the recording user but is not a foreign key
+        rows = db.session.query(Vitals, User).outerjoin(User, User.id == Vitals.recorded_by) \
+            .filter(Vitals.id.in_(ids['vital_signs']))
+        loaded.update((('vital_signs', vitals.id), (vitals, recorder)) for vitals, recorder in rows)
+    if ids['lab_result']:
+        results = LabResult.query.options(joinedload(LabResult.order), joinedload(LabResult.performer)) \
+            .filter(LabResult.id.in_(ids['lab_result']))
+        loaded.update((('lab_result', result.id), ({'order': result.order, 'result': result}, result.performer))
+                      for result in results)
+
+    entries = []
+    for entry_type, entry_id, entry_date in keys:
+        if (entry_type, entry_id) in loaded:
+            data, author = loaded[(entry_type, entry_id)]
+            entries.append(TimelineEntry(entry_type, entry_date, data, author))
+    return entries
+
+
+def get_patient_timeline(patient_id, types=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Get one page of a patient's timeline, newest entries first.
+
+    Args:
+        patient_id (str): ID of the patient
+        types (list): Entry types to include (see TIMELINE_TYPES), or None for all of them
+        cursor (str): Cursor returned with the previous page, or None for the first page
+        limit (int): Page size, capped at MAX_PAGE_SIZE
+
+    Returns:
+        TimelinePage: The TimelineEntry objects on this page and the cursor of the next page,
+        or None if this is the last page
+
+    Raises:
+        ValueError: If the cursor is malformed or a type is unknown
+    """
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    types = set(types or TIMELINE_TYPES)
+    if not types.issubset(TIMELINE_TYPES):
+        raise ValueError('Unknown timeline type')
+    position = _decode_position(cursor) if cursor else None
+
+    branches = []
+    for rank, (entry_type, (id_column, date_column, conditions)) in enumerate(_sources(patient_id).items()):
+        if entry_type not in types:
+            continue
+        if position:
+            conditions = conditions + [_after(rank, id_column, date_column, position)]
+        # Each branch is limited on its own so it stops early along its index
+        branch = select(literal(rank).label('rank'), id_column.label('entry_id'), date_column.label('entry_date')) \
+            .where(*conditions).order_by(date_column.desc(), id_column.desc()).limit(limit + 1).subquery()
+        branches.append(select(*branch.c))
+
+    timeline = union_all(*branches).subquery()
+    rows = db.session.execute(
+        select(timeline).order_by(timeline.c.entry_date.desc(), timeline.c.rank.desc(), timeline.c.entry_id.desc())
+        .limit(limit + 1)
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_row = rows[-1]
+        next_cursor = encode_cursor(last_row.rank, last_row.entry_date.isoformat(), last_row.entry_id)
+    keys = [(TIMELINE_TYPES[row.rank], row.entry_id, row.entry_date) for row in rows]
+    return TimelinePage(_load_entries(keys), next_cursor)
@@ -0,0 +1,130 @@
+"""
+Receptionist front-desk board.
+
+The board lists today's appointments, the appointments of the next seven
+days and the latest patient registrations. Each panel is read with one
+joined, column-limited query (see app.appointments.queries), so the page
+costs the same handful of queries however busy the clinic is.
+
+Desks keep the board open all day. Instead of reloading the page they poll
+``board_feed`` every few seconds with the appointment change version of their
+last sync and receive only the appointments booked, checked in, cancelled or
+moved since, plus the ids of appointments to drop. When nothing changed, a
+poll costs one read of the change counter, and the endpoint answers the
+browser's revalidation with 304 Not Modified.
+"""
+from collections import namedtuple
+
+from app import db
+from app.appointments.models import AppointmentTombstone, current_change_version
+from app.appointments.queries import appointment_rows
+from app.appointments.windows import day_window, hospital_today, upcoming_days_window
+from app.patients.models import Patient
+
+# Days after today listed in the upcoming panel
+UPCOMING_DAYS = 7
+
+# Latest registrations listed on the board
+RECENT_PATIENTS = 5
+
+BoardPatient = namedtuple('BoardPatient', ['id', 'first_name', 'last_name', 'date_of_birth', 'gender', 'phone'])
+ReceptionistBoard = namedtuple('ReceptionistBoard', [
+    'today', 'version', 'today_appointments', 'upcoming_appointments', 'recent_patients'])
+
+
+def load_board(today=None):
+    """
+    Load the panels of the receptionist board.
+
+    Args:
+        today (date): Day of the today panel; defaults to today at the hospital
+
+    Returns:
+        ReceptionistBoard: The panels, and the change version they are current as of
+    """
+    today = today or hospital_today()
+    # Read the version first; appointments changed in the meantime are simply sent again by the feed
+    version = current_change_version()
+    today_window = day_window(today)
+    upcoming_window = upcoming_days_window(UPCOMING_DAYS, today)
+    recent_patients = db.session.query(
+        Patient.id, Patient.first_name, Patient.last_name, Patient.date_of_birth, Patient.gender, Patient.phone
+    ).order_by(Patient.created_at.desc()).limit(RECENT_PATIENTS)
+    return ReceptionistBoard(
+        today=today,
+        version=version,
+        today_appointments=appointment_rows(start=today_window.start, end=today_window.end),
+        upcoming_appointments=appointment_rows(start=upcoming_window.start, end=upcoming_window.end),
+        recent_patients=[BoardPatient(*row) for row in recent_patients],
+    )
+
+
+def board_appointment_json(row, today):
+    """
+    Format an appointment row for the board feed.
+
+    Args:
+        row: Row from appointment_rows
+        today (date): Day of the today panel
+
+    Returns:
+        dict: The appointment, with ``panel`` set to "today" or "upcoming"
+    """
+    return {
+        'id': row.id,
+        'panel': 'today' if row.scheduled_time.date() == today else 'upcoming',
+        'scheduled_time': row.scheduled_time.isoformat(),
+        'date': row.scheduled_time.strftime('%Y-%m-%d'),
+        'time': row.scheduled_time.strftime('%H:%M'),
+        'duration': row.duration,
+        'patient_name': f"{row.patient_first_name} {row.patient_last_name}",
+        'doctor_name': f"Dr. {row.doctor_first_name} {row.doctor_last_name}",
+        'room_name': row.room_name,
+        'status': row.status,
+    }
+
+
+def board_feed(since=None, today=None):
+    """
+    Build the board feed, in full or as a delta.
+
+    Args:
+        since (int): Change version of the client's last sync, or None for a full load
+        today (date): Day of the today panel; defaults to today at the hospital
+
+    Returns:
+        dict: ``version`` to send back as ``since`` next time, ``today`` (clients showing
+        another day reload), ``delta`` telling whether this is a delta, ``appointments``
+        to add or replace and, for deltas, ``removed`` ids
+    """
+    today = today or hospital_today()
+    start = day_window(today).start
+    end = upcoming_days_window(UPCOMING_DAYS, today).end
+    version = current_change_version()
+    feed = {'version': version, 'today': today.isoformat()}
+    if since is None or since < 0 or since > version:
+        feed.update(delta=False, appointments=[
+            board_appointment_json(row, today) for row in appointment_rows(start=start, end=end)
+        ])
+        return feed
+    if since == version:
+        # Nothing changed since the client's last sync
+        feed.update(delta=True, appointments=[], removed=[])
+        return feed
+
+    appointments = []
+    removed = []
+    for row in appointment_rows(changed_since=since):
+        # Appointments moved off the board are dropped by the client
+        if start <= row.scheduled_time < end:
+            appointments.append(board_appointment_json(row, today))
+        else:
+            removed.append(row.id)
+    removed.extend(
+        appointment_id for appointment_id, in db.session.query(AppointmentTombstone.appointment_id).filter(
+            AppointmentTombstone.change_version > since
+        )
+    )
+    feed.update(delta=True, appointments=appointments, removed=removed)
+    return feed
+
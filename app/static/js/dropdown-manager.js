@@ -1,5 +1,46 @@
 console.log('Dropdown manager script loaded');
 
+// Reference data for the form comes from one versioned bootstrap document.
+// Pages pass its URL (which names the current version) on the script tag; the
+// document is kept in localStorage and only fetched again when the version changes.
+const BOOTSTRAP_STORAGE_KEY = 'registrationBootstrap';
+const BOOTSTRAP_URL = (document.currentScript && document.currentScript.dataset.bootstrapUrl) || '/api/registration-bootstrap';
+
+function loadRegistrationBootstrap() {
+    const version = new URL(BOOTSTRAP_URL, window.location.href).searchParams.get('v');
+    try {
+        const cached = JSON.parse(localStorage.getItem(BOOTSTRAP_STORAGE_KEY));
+        if (cached && version && cached.version === version) {
+            return Promise.resolve(cached);
+        }
+    } catch (error) {
+        console.warn('Ignoring unreadable cached reference data:', error);
+    }
+    return fetch(BOOTSTRAP_URL)
+        .then(response => response.json())
+        .then(data => {
+            try {
+                localStorage.setItem(BOOTSTRAP_STORAGE_KEY, JSON.stringify(data));
+            } catch (error) {
+                console.warn('Could not cache reference data:', error);
+            }
+            return data;
+        });
+}
+
+function replaceOptions(select, items, valueOf) {
+    // Clear existing options except the first one
+    while (select.options.length > 1) {
+        select.remove(1);
+    }
+    items.forEach(function(item) {
+        const option = document.createElement('option');
+        option.value = valueOf(item);
+        option.textContent = item.name;
+        select.appendChild(option);
+    });
+}
+
 // Main initialization function
 function initializeDropdowns() {
     console.log('Dropdown manager initialized');
@@ -28,46 +69,20 @@ function initializeDropdowns() {
         }
     });
 
-    // Fetch ID types from API
-    fetch('/api/id-types')
-        .then(response => response.json())
-        .then(data => {
-            const idTypeSelect = document.getElementById('id_type');
-            // Clear existing options except the first one
-            while (idTypeSelect.options.length > 1) {
-                idTypeSelect.remove(1);
-            }
-            // Add ID types from API
-            data.forEach(function(idType) {
-                const option = document.createElement('option');
-                option.value = idType.name;
-                option.textContent = idType.name;
-                idTypeSelect.appendChild(option);
-            });
-        })
-        .catch(error => {
-            console.error('Error fetching ID types:', error);
-        });
+    // Payor details by payor type name, filled in once the bootstrap document has loaded
+    let payorDetailsByType = {};
 
-    // Fetch nationalities from API
-    fetch('/api/nationalities')
-        .then(response => response.json())
+    // ID types, nationalities and payor types from the bootstrap document
+    const bootstrap = loadRegistrationBootstrap();
+    bootstrap
         .then(data => {
-            const nationalitySelect = document.getElementById('nationality_id');
-            // Clear existing options except the first one
-            while (nationalitySelect.options.length > 1) {
-                nationalitySelect.remove(1);
-            }
-            // Add nationalities from API
-            data.forEach(function(nationality) {
-                const option = document.createElement('option');
-                option.value = nationality.id;
-                option.textContent = nationality.name;
-                nationalitySelect.appendChild(option);
-            });
+            replaceOptions(document.getElementById('id_type'), data.id_types, idType => idType.name);
+            replaceOptions(document.getElementById('nationality_id'), data.nationalities, nationality => nationality.id);
+            replaceOptions(document.getElementById('payor-type'), data.payor_types, payorType => payorType.name);
+            payorDetailsByType = data.payor_details;
         })
         .catch(error => {
-            console.error('Error fetching nationalities:', error);
+            console.error('Error loading reference data:', error);
         });
 
     // Enhanced conditional field visibility with ARIA
@@ -141,27 +156,6 @@ function initializeDropdowns() {
     const payorTypeSelect = document.getElementById('payor-type');
     const payorDetailSelect = document.getElementById('payor-detail');
 
-    // Fetch payor types from API
-    fetch('/api/payor-types')
-        .then(response => response.json())
-        .then(data => {
-            // Clear existing options except the first one
-            while (payorTypeSelect.options.length > 1) {
-                payorTypeSelect.remove(1);
-            }
-
-            // Add payor types from API
-            data.forEach(function(payorType) {
-                const option = document.createElement('option');
-                option.value = payorType.name;
-                option.textContent = payorType.name;
-                payorTypeSelect.appendChild(option);
-            });
-        })
-        .catch(error => {
-            console.error('Error fetching payor types:', error);
-        });
-
     // Handle payor type selection
     payorTypeSelect.addEventListener('change', function() {
         const selectedType = this.value;
@@ -188,33 +182,18 @@ function initializeDropdowns() {
             defaultOption.textContent = 'Select ' + selectedType + ' Detail';
             payorDetailSelect.appendChild(defaultOption);
 
-            // Fetch payor details based on selected payor type
-            // Get payor type ID from the selected type name
-            fetch(`/api/payor-types`)
-                .then(response => response.json())
-                .then(payorTypes => {
-                    const payorType = payorTypes.find(pt => pt.name === selectedType);
-                    if (payorType) {
-                        return fetch(`/api/payor-details/${payorType.id}`);
-                    }
-                    return Promise.reject('Payor type not found');
-                })
-                .then(response => response.json())
-                .then(data => {
-                    // Add payor details from API
-                    data.forEach(function(detail) {
-                        const option = document.createElement('option');
-                        option.value = detail.name;
-                        option.textContent = detail.name;
-                        payorDetailSelect.appendChild(option);
-                    });
-                    
-                    // Focus the payor detail field when enabled and data is loaded
-                    payorDetailSelect.focus();
-                })
-                .catch(error => {
-                    console.error('Error fetching payor details:', error);
+            // Add payor details of the selected payor type
+            bootstrap.then(() => {
+                (payorDetailsByType[selectedType] || []).forEach(function(detail) {
+                    const option = document.createElement('option');
+                    option.value = detail.name;
+                    option.textContent = detail.name;
+                    payorDetailSelect.appendChild(option);
                 });
+
+                // Focus the payor detail field when enabled and data is loaded
+                payorDetailSelect.focus();
+            });
         }
     });
 }
@@ -0,0 +1,71 @@
+"""
+Registration form bootstrap payload.
+
+Every lookup list the patient registration and edit forms need, bundled into
+one JSON document so the page fetches reference data with a single request.
+The document's version combines the version counters of the tables it is
+built from. It is serialised (and gzipped) once per version and kept in
+memory, and the pages embed the current version so browsers can keep the
+document in local storage and skip the request entirely until it changes.
+"""
+import gzip
+import json
+import threading
+from collections import namedtuple
+
+from flask import current_app
+
+from app.system_params.reference import get_reference_tables
+
+BOOTSTRAP_TABLES = ('id_types', 'payor_types', 'payor_details', 'ethnicities', 'languages', 'races',
+                    'nationalities')
+
+RegistrationBootstrap = namedtuple('RegistrationBootstrap', ['version', 'body', 'gzip_body'])
+
+_bootstrap_lock = threading.Lock()
+
+
+def _build_payload(version, tables):
+    payor_type_names = {row.id: row.name for row in tables['payor_types'].items(active_only=True)}
+    payor_details = {name: [] for name in payor_type_names.values()}
+    for row in tables['payor_details'].items(active_only=True):
+        if row.parent_id in payor_type_names:
+            payor_details[payor_type_names[row.parent_id]].append({'id': row.id, 'name': row.name})
+    return {
+        'version': version,
+        'id_types': [{'id': row.id, 'name': row.name} for row in tables['id_types'].items(active_only=True)],
+        'payor_types': [{'id': row.id, 'name': row.name} for row in tables['payor_types'].items(active_only=True)],
+        # Keyed by payor type name, which is what the payor type dropdown submits
+        'payor_details': payor_details,
+        'ethnicities': [row.name for row in tables['ethnicities'].items()],
+        'languages': [row.name for row in tables['languages'].items()],
+        'races': [row.name for row in tables['races'].items()],
+        'nationalities': [{'id': row.id, 'name': row.name} for row in tables['nationalities'].items()],
+    }
+
+
+def get_registration_bootstrap():
+    """
+    Get the registration bootstrap document for the current reference data.
+
+    Costs one query (the version counters) when nothing changed since it was last built.
+
+    Returns:
+        RegistrationBootstrap: Version, compact JSON body and its gzipped form
+    """
+    tables = get_reference_tables(BOOTSTRAP_TABLES)
+    version = '.'.join(str(tables[table].version) for table in BOOTSTRAP_TABLES)
+    bootstrap = current_app.extensions.get('registration_bootstrap')
+    if bootstrap is None or bootstrap.version != version:
+        with _bootstrap_lock:
+            bootstrap = current_app.extensions.get('registration_bootstrap')
+            if bootstrap is None or bootstrap.version != version:
+                body = json.dumps(_build_payload(version, tables), separators=(',', ':'), sort_keys=True).encode()
+                bootstrap = RegistrationBootstrap(version, body, gzip.compress(body, mtime=0))
+                current_app.extensions['registration_bootstrap'] = bootstrap
+    return bootstrap
+
+
+def registration_bootstrap_version():
+    """Get the current version of the registration bootstrap document, for embedding in pages."""
+    return get_registration_bootstrap().version
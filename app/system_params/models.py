@@ -124,3 +124,74 @@ def get_last_updated():
     """Get the most recent update timestamp"""
     last_update = SystemParameter.query.order_by(SystemParameter.updated_at.desc()).first()
     return last_update.updated_at if last_update else None
+
+
+def get_counter_parameter(name, connection=None):
+    """
+    Get the value of a system parameter used as an integer counter.
+
+    Args:
+        name (str): Parameter name
+        connection: Connection to read with; defaults to the current session's connection
+
+    Returns:
+        int: The counter value, 0 if the parameter does not exist yet
+    """
+    parameters = SystemParameter.__table__
+    connection = connection if connection is not None else db.session.connection()
+    value = connection.execute(
+        db.select(parameters.c.value).where(parameters.c.name == name)
+    ).scalar()
+    return int(value) if value else 0
+
+
+def get_counter_parameters(names, connection=None):
+    """
+    Get the values of several counter parameters with a single query.
+
+    Args:
+        names (iterable): Parameter names
+        connection: Connection to read with; defaults to the current session's connection
+
+    Returns:
+        dict: Parameter name -> counter value, 0 for parameters that do not exist yet
+    """
+    names = list(names)
+    parameters = SystemParameter.__table__
+    connection = connection if connection is not None else db.session.connection()
+    rows = connection.execute(
+        db.select(parameters.c.name, parameters.c.value).where(parameters.c.name.in_(names))
+    )
+    values = {name: int(value) if value else 0 for name, value in rows}
+    return {name: values.get(name, 0) for name in names}
+
+
+def increment_counter_parameter(name, connection, description=None):
+    """
+    Increment a system parameter used as an integer counter and return the new value.
+
+    The counter is bumped with a single UPDATE, so its row stays locked until the
+    calling transaction ends. Values therefore become visible in the order they
+    were handed out.
+
+    Args:
+        name (str): Parameter name; the parameter is created if it does not exist
+        connection: Connection of the transaction making the change
+        description (str): Description used when the parameter is created
+
+    Returns:
+        int: The new counter value
+    """
+    parameters = SystemParameter.__table__
+    now = datetime.utcnow()
+    result = connection.execute(
+        parameters.update()
+        .where(parameters.c.name == name)
+        .values(value=db.cast(db.cast(parameters.c.value, db.Integer) + 1, db.Text), updated_at=now)
+    )
+    if result.rowcount == 0:
+        connection.execute(
+            parameters.insert().values(name=name, value='1', description=description, created_at=now, updated_at=now)
+        )
+        return 1
+    return get_counter_parameter(name, connection)
@@ -0,0 +1,195 @@
+"""
+Reference data cache.
+
+The lookup tables behind the registration form's dropdowns (ID types, payor
+types and details, ethnicities, languages, races and nationalities) change
+rarely and are read on every page load. Each table is loaded into memory once
+per process, sorted by name, and searched there by prefix and substring.
+
+Flushes that add, change or delete rows of a table bump that table's version
+counter in ``system_parameters`` in the same transaction. A lookup reads the
+counter and reloads the table if it has moved, so edits made through the
+system_params CRUD routes in any worker show up on the next lookup. The
+counter also serves as the table's ETag, so browsers can revalidate with a
+cheap 304.
+"""
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+
+from flask import current_app, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.system_params.models import (Ethnicity, IDType, Language, PayorDetail, PayorType, Race,
+                                      get_counter_parameter, get_counter_parameters, increment_counter_parameter)
+
+DEFAULT_MAX_AGE = 60
+
+ReferenceRow = namedtuple('ReferenceRow', ['id', 'name', 'is_active', 'parent_id'])
+
+_cache_lock = threading.Lock()
+
+
+def _reference_models():
+    # Table name -> (model, parent key column); Nationality lives with the patient models
+    from app.patients.models import Nationality
+    return {
+        'id_types': (IDType, None),
+        'payor_types': (PayorType, None),
+        'payor_details': (PayorDetail, 'payor_type_id'),
+        'ethnicities': (Ethnicity, None),
+        'languages': (Language, None),
+        'races': (Race, None),
+        'nationalities': (Nationality, None),
+    }
+
+
+def version_parameter(table):
+    """Name of the system parameter counting changes to a reference table."""
+    return f'{table}_reference_version'
+
+
+class ReferenceTable:
+    """The rows of one reference table, as of one value of its version counter."""
+
+    def __init__(self, table, version, rows):
+        self.table = table
+        self.version = version
+        self.rows = sorted(rows, key=lambda row: (row.name.lower(), row.name))
+        self._names = [row.name.lower() for row in self.rows]
+
+    @classmethod
+    def load(cls, table):
+        """
+        Load a reference table from the database.
+
+        Args:
+            table (str): Reference table name, e.g. 'ethnicities'
+
+        Returns:
+            ReferenceTable: All rows of the table, tagged with the counter value read before loading
+        """
+        model, parent_key = _reference_models()[table]
+        version = get_counter_parameter(version_parameter(table))
+        columns = [model.id, model.name,
+                   getattr(model, 'is_active', db.literal(True)).label('is_active'),
+                   (getattr(model, parent_key) if parent_key else db.literal(None)).label('parent_id')]
+        rows = [ReferenceRow(*row) for row in db.session.query(*columns)]
+        return cls(table, version, rows)
+
+    @property
+    def etag(self):
+        return f'{self.table}-{self.version}'
+
+    def items(self, active_only=False, parent_id=None):
+        """
+        Get rows sorted by name.
+
+        Args:
+            active_only (bool): Only rows flagged active
+            parent_id: Only rows under this parent (e.g. payor details of a payor type)
+
+        Returns:
+            list: Matching ReferenceRow tuples
+        """
+        return [row for row in self.rows
+                if (not active_only or row.is_active) and (parent_id is None or row.parent_id == parent_id)]
+
+    def search(self, term):
+        """
+        Find rows whose name contains ``term``, ignoring case.
+
+        Names starting with the term come first, then the other matches, each in name order.
+
+        Args:
+            term (str): Search term; an empty term matches every row
+
+        Returns:
+            list: Matching ReferenceRow tuples
+        """
+        term = (term or '').strip().lower()
+        if not term:
+            return list(self.rows)
+        start = bisect_left(self._names, term)
+        end = start
+        while end < len(self._names) and self._names[end].startswith(term):
+            end += 1
+        prefix_matches = self.rows[start:end]
+        other_matches = [row for index, (name, row) in enumerate(zip(self._names, self.rows))
+                         if (index < start or index >= end) and term in name]
+        return prefix_matches + other_matches
+
+
+def get_reference_tables(tables):
+    """
+    Get several cached reference tables, reading all their version counters with one query.
+
+    Args:
+        tables (iterable): Reference table names
+
+    Returns:
+        dict: Table name -> up to date ReferenceTable
+    """
+    tables = list(tables)
+    versions = get_counter_parameters(version_parameter(table) for table in tables)
+    cache = current_app.extensions.setdefault('reference_data', {})
+    result = {}
+    for table in tables:
+        version = versions[version_parameter(table)]
+        cached = cache.get(table)
+        if cached is None or cached.version != version:
+            with _cache_lock:
+                cached = cache.get(table)
+                if cached is None or cached.version != version:
+                    cached = ReferenceTable.load(table)
+                    cache[table] = cached
+        result[table] = cached
+    return result
+
+
+def get_reference_table(table):
+    """
+    Get a cached reference table, reloading it if it changed in any worker.
+
+    Costs one lookup of the table's version counter when the cache is current.
+
+    Args:
+        table (str): Reference table name, e.g. 'ethnicities'
+
+    Returns:
+        ReferenceTable: The up to date table
+    """
+    return get_reference_tables([table])[table]
+
+
+def reference_response(reference_table, payload):
+    """
+    Build a JSON response for reference data, with the table's ETag and caching headers.
+
+    Args:
+        reference_table (ReferenceTable): Table the payload was built from
+        payload: JSON-serialisable response body
+
+    Returns:
+        Response: The response, or a 304 if the client's copy is current
+    """
+    response = jsonify(payload)
+    response.set_etag(reference_table.etag)
+    max_age = current_app.config.get('REFERENCE_DATA_MAX_AGE', DEFAULT_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    return response.make_conditional(request)
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_reference_changes(session, flush_context, instances):
+    # Bump the version counter of every reference table with new, changed or deleted rows
+    tables_by_model = {model: table for table, (model, _) in _reference_models().items()}
+    changed = {tables_by_model[type(obj)] for obj in list(session.new) + list(session.deleted)
+               if type(obj) in tables_by_model}
+    changed.update(tables_by_model[type(obj)] for obj in session.dirty
+                   if type(obj) in tables_by_model and session.is_modified(obj))
+    for table in sorted(changed):
+        increment_counter_parameter(version_parameter(table), session.connection(),
+                                    f'Change counter of the {table} reference table')
@@ -2,8 +2,9 @@ from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import current_user
 from app.system_params import bp
 from app.utils import roles_required
-from app.system_params.models import get_all_nationalities, PayorType, PayorDetail, IDType, db
+from app.system_params.models import PayorType, PayorDetail, IDType, Ethnicity, Language, db
 from app.system_params.forms import PayorTypeForm, PayorDetailForm, IDTypeForm, EthnicityForm, LanguageForm
+from app.system_params.reference import get_reference_table, reference_response
 
 @bp.route('/admin/system-params', methods=['GET'])
 @roles_required('Admin')
@@ -32,23 +33,24 @@ def manage_settings():
 
 @bp.route('/api/nationalities', methods=['GET'])
 def get_nationalities():
-    nationalities = get_all_nationalities()
-    return jsonify([{'id': n.id, 'name': n.name} for n in nationalities])
+    nationalities = get_reference_table('nationalities')
+    return reference_response(nationalities, [{'id': n.id, 'name': n.name} for n in nationalities.items()])
 
 @bp.route('/api/payor-types', methods=['GET'])
 def get_payor_types():
-    payor_types = PayorType.query.all()
-    return jsonify([{'id': pt.id, 'name': pt.name} for pt in payor_types])
+    payor_types = get_reference_table('payor_types')
+    return reference_response(payor_types, [{'id': pt.id, 'name': pt.name} for pt in payor_types.items()])
 
 @bp.route('/api/payor-details/<int:payor_type_id>', methods=['GET'])
 def get_payor_details_by_type(payor_type_id):
-    payor_details = PayorDetail.query.filter_by(payor_type_id=payor_type_id).all()
-    return jsonify([{'id': pd.id, 'name': pd.name} for pd in payor_details])
+    payor_details = get_reference_table('payor_details')
+    return reference_response(payor_details,
+                              [{'id': pd.id, 'name': pd.name} for pd in payor_details.items(parent_id=payor_type_id)])
 
 @bp.route('/api/id-types', methods=['GET'])
 def get_id_types():
-    id_types = IDType.query.all()
-    return jsonify([{'id': it.id, 'name': it.name} for it in id_types])
+    id_types = get_reference_table('id_types')
+    return reference_response(id_types, [{'id': it.id, 'name': it.name} for it in id_types.items()])
 
 @bp.route('/admin/system-params/payor-types', methods=['GET'])
 @roles_required('Admin')
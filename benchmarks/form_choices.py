@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark of patient form construction.
+
+Seeds payor types, payor details and nationalities, then constructs
+PatientRegistrationForm and PatientForm inside a request context, first with
+the choice caches cleared before every construction (loading the lookup
+tables each time, as the forms did before the shared choice lists) and then
+with warm caches. Reports SQL statements and microseconds per construction
+for both.
+
+Usage:
+    python benchmarks/form_choices.py
+    python benchmarks/form_choices.py --nationalities 250 --iterations 5000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+CACHE_KEYS = ('reference_data', 'patient_form_choices')
+
+
+def seed(db, nationalities, payor_details):
+    from app.patients.models import Nationality
+    from app.system_params.models import PayorDetail, PayorType
+
+    payor_types = [PayorType(name=name, is_active=True) for name in ('Insurance', 'Company', 'Stakeholder', 'Self')]
+    db.session.add_all(payor_types)
+    db.session.flush()
+    db.session.add_all(PayorDetail(name=f'Payor {index}', payor_type_id=payor_types[index % len(payor_types)].id,
+                                   is_active=True)
+                       for index in range(payor_details))
+    db.session.add_all(Nationality(id=f'N{index:03d}', name=f'Nationality {index:03d}')
+                       for index in range(nationalities))
+    db.session.commit()
+
+
+def measure(app, iterations, cold, statements):
+    from app.patients.forms import PatientForm, PatientRegistrationForm
+
+    del statements[:]
+    started = time.perf_counter()
+    for index in range(iterations):
+        if cold:
+            for key in CACHE_KEYS:
+                app.extensions.pop(key, None)
+        form_class = PatientRegistrationForm if index % 2 == 0 else PatientForm
+        form_class()
+    elapsed = time.perf_counter() - started
+    return elapsed / iterations * 1e6, len(statements) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark patient form construction.')
+    parser.add_argument('--nationalities', type=int, default=200)
+    parser.add_argument('--payor-details', type=int, default=60)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    # The testing config reads its database URL from the environment at import time
+    os.environ['TEST_DATABASE_URL'] = 'sqlite:///' + os.path.join(tmpdir.name, 'form_choices_bench.db')
+
+    from sqlalchemy import event
+
+    from app import create_app, db
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        seed(db, args.nationalities, args.payor_details)
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *rest: statements.append(statement))
+
+        with app.test_request_context('/patients/new'):
+            for label, cold in (('uncached', True), ('cached', False)):
+                measure(app, 10, cold, statements)
+                micros, queries = measure(app, args.iterations, cold, statements)
+                print(f"{label:>8}: {micros:8.1f}us per form, {queries:.1f} queries per form")
+
+        db.session.remove()
+        db.drop_all()
+    tmpdir.cleanup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,6 +17,24 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     ADMINS = ['admin@example.com']
     API_BASE_URL = os.environ.get('API_BASE_URL')
+    # Number of MRNs each worker leases from the database per round-trip
+    MRN_BLOCK_SIZE = int(os.environ.get('MRN_BLOCK_SIZE') or 20)
+    # Seconds a logged-in user's names and roles are served from the process cache
+    PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL') or 30)
+    # Seconds a doctor's dashboard panels are served from the process cache; 0 turns the cache off
+    DOCTOR_DASHBOARD_CACHE_TTL = int(os.environ.get('DOCTOR_DASHBOARD_CACHE_TTL') or 5)
+    # Seconds browsers may reuse reference data (ID types, payor types, ...) before revalidating
+    REFERENCE_DATA_MAX_AGE = int(os.environ.get('REFERENCE_DATA_MAX_AGE') or 60)
+    # Time zone of the hospital; decides which appointments are "today" on the dashboards
+    HOSPITAL_TIMEZONE = os.environ.get('HOSPITAL_TIMEZONE') or 'Asia/Jakarta'
+    # Per-request SQL timing: Server-Timing header, /admin/perf statistics and slow-query log
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', 'true').lower() in ['true', 'on', '1']
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', 'true').lower() in ['true', 'on', '1']
+    # Statements and requests slower than these many milliseconds are logged; 0 turns the log off
+    SLOW_QUERY_THRESHOLD_MS = int(os.environ.get('SLOW_QUERY_THRESHOLD_MS') or 100)
+    SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('SLOW_REQUEST_THRESHOLD_MS') or 1000)
+    # Recent requests per endpoint the /admin/perf percentiles are computed from
+    PERF_SAMPLE_SIZE = int(os.environ.get('PERF_SAMPLE_SIZE') or 500)
 
 
 
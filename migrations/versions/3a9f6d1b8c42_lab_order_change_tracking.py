@@ -0,0 +1,39 @@
+"""Lab order change tracking
+
+Revision ID: 3a9f6d1b8c42
+Revises: 7c1e9a53d2f6
+Create Date: 2026-10-18 18:03:27.905114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a9f6d1b8c42'
+down_revision = '7c1e9a53d2f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('lab_order', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_version', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index(batch_op.f('ix_lab_order_change_version'), ['change_version'], unique=False)
+        batch_op.create_index('ix_lab_order_order_date_id', ['order_date', 'id'], unique=False)
+
+    # Seed the counter so concurrent first orders do not race to create it
+    op.execute(sa.text(
+        "INSERT INTO system_parameters (name, value, description) "
+        "SELECT 'lab_order_version', '0', 'Change counter for incremental lab worklist polling' "
+        "WHERE NOT EXISTS (SELECT 1 FROM system_parameters WHERE name = 'lab_order_version')"
+    ))
+
+
+def downgrade():
+    op.execute(sa.text("DELETE FROM system_parameters WHERE name = 'lab_order_version'"))
+
+    with op.batch_alter_table('lab_order', schema=None) as batch_op:
+        batch_op.drop_index('ix_lab_order_order_date_id')
+        batch_op.drop_index(batch_op.f('ix_lab_order_change_version'))
+        batch_op.drop_column('change_version')
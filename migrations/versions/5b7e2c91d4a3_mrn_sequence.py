@@ -0,0 +1,63 @@
+"""MRN sequence
+
+Revision ID: 5b7e2c91d4a3
+Revises: 083046879bbd
+Create Date: 2026-10-18 09:12:41.305118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e2c91d4a3'
+down_revision = '083046879bbd'
+branch_labels = None
+depends_on = None
+
+
+def _last_mrn_number(bind):
+    value = bind.execute(
+        sa.text("SELECT value FROM system_parameters WHERE name = 'last_mrn'")
+    ).scalar()
+    return int(value.replace('-', '')) if value else 0
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        # Other databases keep using the last_mrn system parameter as a locked counter
+        return
+
+    # Continue numbering after the last MRN handed out by the old generator
+    start = _last_mrn_number(bind) + 1
+    op.execute(sa.text(
+        f'CREATE SEQUENCE IF NOT EXISTS patient_mrn_seq START WITH {start} MINVALUE 1 MAXVALUE 99999999'
+    ))
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    # Hand the high-water mark back to the last_mrn system parameter
+    last_value, is_called = bind.execute(
+        sa.text('SELECT last_value, is_called FROM patient_mrn_seq')
+    ).first()
+    if is_called:
+        digits = f'{last_value:08d}'
+        last_mrn = '-'.join(digits[i:i + 2] for i in range(0, 8, 2))
+        updated = bind.execute(
+            sa.text("UPDATE system_parameters SET value = :value WHERE name = 'last_mrn'"),
+            {'value': last_mrn}
+        )
+        if updated.rowcount == 0:
+            bind.execute(
+                sa.text(
+                    "INSERT INTO system_parameters (name, value, description) "
+                    "VALUES ('last_mrn', :value, 'Last used Medical Record Number for patient registration')"
+                ),
+                {'value': last_mrn}
+            )
+    op.execute(sa.text('DROP SEQUENCE IF EXISTS patient_mrn_seq'))
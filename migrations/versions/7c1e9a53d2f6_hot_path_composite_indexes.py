@@ -0,0 +1,40 @@
+"""Hot path composite indexes
+
+Revision ID: 7c1e9a53d2f6
+Revises: b6d2f81c4e07
+Create Date: 2026-10-18 17:11:05.264917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e9a53d2f6'
+down_revision = 'b6d2f81c4e07'
+branch_labels = None
+depends_on = None
+
+# (table, index name, columns); the (patient_id, date) indexes of vitals and
+# clinical_note were added with the patient timeline in b6d2f81c4e07
+INDEXES = (
+    ('appointment', 'ix_appointment_scheduled_time', ['scheduled_time']),
+    ('appointment', 'ix_appointment_doctor_id_scheduled_time', ['doctor_id', 'scheduled_time']),
+    ('appointment', 'ix_appointment_status_scheduled_time', ['status', 'scheduled_time']),
+    ('admission', 'ix_admission_bed_id_status', ['bed_id', 'status']),
+    ('admission', 'ix_admission_patient_id_status', ['patient_id', 'status']),
+    ('lab_order', 'ix_lab_order_status_order_date', ['status', 'order_date']),
+    ('bed', 'ix_bed_is_occupied_is_active', ['is_occupied', 'is_active']),
+)
+
+
+def upgrade():
+    for table, name, columns in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(name)
@@ -0,0 +1,112 @@
+"""Patient search columns
+
+Revision ID: 9d41f0c3a7b6
+Revises: 5b7e2c91d4a3
+Create Date: 2026-10-18 11:03:27.518842
+
+"""
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d41f0c3a7b6'
+down_revision = '5b7e2c91d4a3'
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def _search_string(length):
+    return sa.String(length=length).with_variant(sa.String(length=length, collation='C'), 'postgresql')
+
+
+# Normalization must match app.patients.search at the time of this revision
+def _normalize_name(value):
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value)
+    ascii_only = ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', ascii_only).split())
+
+
+def _normalize_digits(value):
+    return re.sub(r'\D', '', value) if value else ''
+
+
+def _normalize_identifier(value):
+    return re.sub(r'[^a-z0-9]', '', value.lower()) if value else ''
+
+
+def _search_values(row):
+    first_name = _normalize_name(row.first_name)
+    last_name = _normalize_name(row.last_name)
+    return {
+        'patient_id': row.id,
+        'new_name': f'{first_name} {last_name}'.strip()[:101],
+        'new_name_reversed': f'{last_name} {first_name}'.strip()[:101],
+        'new_phone': _normalize_digits(row.phone)[:20] or None,
+        'new_id_card': _normalize_identifier(row.id_card_number)[:50] or None,
+    }
+
+
+def upgrade():
+    with op.batch_alter_table('patient', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_name', _search_string(101), nullable=True))
+        batch_op.add_column(sa.Column('search_name_reversed', _search_string(101), nullable=True))
+        batch_op.add_column(sa.Column('search_phone', _search_string(20), nullable=True))
+        batch_op.add_column(sa.Column('search_id_card', _search_string(50), nullable=True))
+        batch_op.create_index('ix_patient_search_name', ['search_name', 'id'], unique=False)
+        batch_op.create_index('ix_patient_search_name_reversed', ['search_name_reversed', 'id'], unique=False)
+        batch_op.create_index('ix_patient_search_phone', ['search_phone', 'id'], unique=False)
+        batch_op.create_index('ix_patient_search_id_card', ['search_id_card', 'id'], unique=False)
+
+    # Backfill the normalized columns for existing patients in keyset-paginated chunks
+    bind = op.get_bind()
+    patient = sa.table(
+        'patient',
+        sa.column('id', sa.String),
+        sa.column('first_name', sa.String),
+        sa.column('last_name', sa.String),
+        sa.column('phone', sa.String),
+        sa.column('id_card_number', sa.String),
+        sa.column('search_name', sa.String),
+        sa.column('search_name_reversed', sa.String),
+        sa.column('search_phone', sa.String),
+        sa.column('search_id_card', sa.String),
+    )
+    update = patient.update().where(patient.c.id == sa.bindparam('patient_id')).values(
+        search_name=sa.bindparam('new_name'),
+        search_name_reversed=sa.bindparam('new_name_reversed'),
+        search_phone=sa.bindparam('new_phone'),
+        search_id_card=sa.bindparam('new_id_card'),
+    )
+    last_id = ''
+    while True:
+        rows = bind.execute(
+            sa.select(patient.c.id, patient.c.first_name, patient.c.last_name, patient.c.phone,
+                      patient.c.id_card_number)
+            .where(patient.c.id > last_id)
+            .order_by(patient.c.id)
+            .limit(BACKFILL_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(update, [_search_values(row) for row in rows])
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('patient', schema=None) as batch_op:
+        batch_op.drop_index('ix_patient_search_id_card')
+        batch_op.drop_index('ix_patient_search_phone')
+        batch_op.drop_index('ix_patient_search_name_reversed')
+        batch_op.drop_index('ix_patient_search_name')
+        batch_op.drop_column('search_id_card')
+        batch_op.drop_column('search_phone')
+        batch_op.drop_column('search_name_reversed')
+        batch_op.drop_column('search_name')
@@ -0,0 +1,44 @@
+"""Patient timeline indexes
+
+Revision ID: b6d2f81c4e07
+Revises: e4a17c2d9b58
+Create Date: 2026-10-18 16:02:41.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2f81c4e07'
+down_revision = 'e4a17c2d9b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('clinical_note', schema=None) as batch_op:
+        batch_op.create_index('ix_clinical_note_patient_id_date', ['patient_id', 'date', 'id'], unique=False)
+
+    with op.batch_alter_table('vitals', schema=None) as batch_op:
+        batch_op.create_index('ix_vitals_patient_id_date', ['patient_id', 'date', 'id'], unique=False)
+
+    with op.batch_alter_table('lab_order', schema=None) as batch_op:
+        batch_op.create_index('ix_lab_order_patient_id_status', ['patient_id', 'status'], unique=False)
+
+    with op.batch_alter_table('lab_result', schema=None) as batch_op:
+        batch_op.create_index('ix_lab_result_order_id_result_date', ['order_id', 'result_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('lab_result', schema=None) as batch_op:
+        batch_op.drop_index('ix_lab_result_order_id_result_date')
+
+    with op.batch_alter_table('lab_order', schema=None) as batch_op:
+        batch_op.drop_index('ix_lab_order_patient_id_status')
+
+    with op.batch_alter_table('vitals', schema=None) as batch_op:
+        batch_op.drop_index('ix_vitals_patient_id_date')
+
+    with op.batch_alter_table('clinical_note', schema=None) as batch_op:
+        batch_op.drop_index('ix_clinical_note_patient_id_date')
@@ -0,0 +1,51 @@
+"""Appointment change tracking
+
+Revision ID: e4a17c2d9b58
+Revises: 9d41f0c3a7b6
+Create Date: 2026-10-18 14:26:09.731402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a17c2d9b58'
+down_revision = '9d41f0c3a7b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_version', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index(batch_op.f('ix_appointment_change_version'), ['change_version'], unique=False)
+
+    op.create_table('appointment_tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.String(length=36), nullable=False),
+    sa.Column('change_version', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('appointment_tombstone', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_appointment_tombstone_change_version'), ['change_version'], unique=False)
+
+    # Seed the counter so concurrent first bookings do not race to create it
+    op.execute(sa.text(
+        "INSERT INTO system_parameters (name, value, description) "
+        "SELECT 'appointment_version', '0', 'Change counter for incremental appointment calendar sync' "
+        "WHERE NOT EXISTS (SELECT 1 FROM system_parameters WHERE name = 'appointment_version')"
+    ))
+
+
+def downgrade():
+    op.execute(sa.text("DELETE FROM system_parameters WHERE name = 'appointment_version'"))
+
+    with op.batch_alter_table('appointment_tombstone', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_appointment_tombstone_change_version'))
+    op.drop_table('appointment_tombstone')
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_appointment_change_version'))
+        batch_op.drop_column('change_version')
@@ -1,51 +1,128 @@
 #!/usr/bin/env python
 """
 Script to generate MRNs for existing patients in the database.
-This script should be run once after deploying the MRN feature to assign 
+This script should be run once after deploying the MRN feature to assign
 MRNs to all patients who don't already have one.
+
+Patients are streamed in keyset-paginated chunks ordered by id. For each chunk
+a range of MRNs is leased in one round-trip and the assignments are written
+with a single executemany UPDATE, then the chunk is committed and the last
+processed patient id is recorded in a checkpoint file. An interrupted run
+picks up after the checkpoint when started again.
+
+Usage:
+    python scripts/generate_mrns_for_existing_patients.py [--chunk-size 5000]
+        [--checkpoint mrn_backfill.checkpoint.json] [--restart]
 """
 
-import sys
+import argparse
+import json
 import os
+import sys
+import time
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from sqlalchemy import bindparam, or_, select
+
 from app import create_app, db
-from app.patients.models import Patient, generate_mrn
+from app.patients.models import Patient
+from app.patients.mrn import format_mrn, get_mrn_allocator
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_CHECKPOINT = 'mrn_backfill.checkpoint.json'
+
+
+def load_checkpoint(path):
+    """Load the checkpoint written by a previous run, if any."""
+    if not os.path.exists(path):
+        return {'last_id': None, 'assigned': 0}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, checkpoint):
+    """Write the checkpoint atomically so a crash never leaves it half-written."""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
 
-def generate_mrns_for_existing_patients():
+def iter_patient_chunks(chunk_size, after_id=None):
+    """
+    Yield lists of ids of patients without an MRN, in keyset-paginated chunks.
+
+    Args:
+        chunk_size (int): Maximum number of patient ids per chunk
+        after_id (str): Only return patients whose id sorts after this one
+    """
+    patients = Patient.__table__
+    while True:
+        query = select(patients.c.id).where(
+            or_(patients.c.mrn.is_(None), patients.c.mrn == '')
+        )
+        if after_id is not None:
+            query = query.where(patients.c.id > after_id)
+        ids = db.session.execute(query.order_by(patients.c.id).limit(chunk_size)).scalars().all()
+        if not ids:
+            return
+        yield ids
+        after_id = ids[-1]
+
+
+def generate_mrns_for_existing_patients(chunk_size=DEFAULT_CHUNK_SIZE, checkpoint_path=DEFAULT_CHECKPOINT,
+                                        restart=False):
     """Generate MRNs for all existing patients who don't have one."""
     app = create_app()
-    
+
     with app.app_context():
-        # Get all patients without an MRN
-        patients_without_mrn = Patient.query.filter(
-            (Patient.mrn.is_(None)) | (Patient.mrn == '')
-        ).all()
-        
-        print(f"Found {len(patients_without_mrn)} patients without MRNs")
-        
-        # Generate MRNs for each patient
-        for i, patient in enumerate(patients_without_mrn, 1):
-            # Generate a new MRN
-            new_mrn = generate_mrn()
-            
-            # Assign the MRN to the patient
-            patient.mrn = new_mrn
-            
-            # Print progress
-            print(f"Assigned MRN {new_mrn} to patient {patient.first_name} {patient.last_name}")
-            
-            # Commit every 100 patients to avoid memory issues with large datasets
-            if i % 100 == 0:
-                db.session.commit()
-                print(f"Committed {i} patients...")
-        
-        # Commit any remaining patients
-        db.session.commit()
-        
-        print(f"Successfully assigned MRNs to {len(patients_without_mrn)} patients")
+        checkpoint = {'last_id': None, 'assigned': 0} if restart else load_checkpoint(checkpoint_path)
+        if checkpoint['last_id']:
+            print(f"Resuming after patient {checkpoint['last_id']} ({checkpoint['assigned']} already assigned)")
+
+        allocator = get_mrn_allocator()
+        patients = Patient.__table__
+        assign_mrn = patients.update().where(
+            patients.c.id == bindparam('patient_id')
+        ).values(mrn=bindparam('new_mrn'))
+
+        assigned = 0
+        started = time.perf_counter()
+        for ids in iter_patient_chunks(chunk_size, checkpoint['last_id']):
+            # Reserve one MRN range for the whole chunk
+            numbers = allocator.lease_block(len(ids))
+            assignments = [
+                {'patient_id': patient_id, 'new_mrn': format_mrn(number)}
+                for patient_id, number in zip(ids, numbers)
+            ]
+            db.session.execute(assign_mrn, assignments)
+            db.session.commit()
+
+            assigned += len(ids)
+            checkpoint = {'last_id': ids[-1], 'assigned': checkpoint['assigned'] + len(ids)}
+            save_checkpoint(checkpoint_path, checkpoint)
+
+            elapsed = time.perf_counter() - started
+            print(f"Assigned {assigned} MRNs ({assigned / elapsed:.0f} rows/sec), "
+                  f"last MRN {assignments[-1]['new_mrn']}")
+
+        elapsed = time.perf_counter() - started
+        rate = assigned / elapsed if elapsed else 0
+        print(f"Successfully assigned MRNs to {assigned} patients in {elapsed:.1f}s ({rate:.0f} rows/sec)")
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
 
 if __name__ == "__main__":
-    generate_mrns_for_existing_patients()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Assign MRNs to patients that do not have one.')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='Patients updated per transaction')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT,
+                        help='File recording progress so an interrupted run can resume')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignore any existing checkpoint and scan from the beginning')
+    args = parser.parse_args()
+    generate_mrns_for_existing_patients(args.chunk_size, args.checkpoint, args.restart)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Script to import a batch of lab results exported by an analyzer.
+
+The batch is a CSV file with order_id, result_data and optional result_date
+columns, or a JSON list of objects with the same keys. All results of the
+batch are recorded in one transaction; rows that cannot be accepted are
+listed with their row number and the rest of the batch is still imported.
+
+Usage:
+    python scripts/import_lab_results.py results.csv --performed-by labtech
+        [--format csv|json] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.auth.models import User
+from app.lab.ingest import BATCH_FORMATS, BatchFormatError, ingest_batch
+
+
+def import_lab_results(path, performed_by, batch_format=None, dry_run=False):
+    """Import the results in a batch file, returning the process exit code."""
+    app = create_app()
+
+    with app.app_context():
+        user = User.query.filter_by(username=performed_by).first()
+        if user is None:
+            print(f"Unknown user: {performed_by}")
+            return 1
+
+        batch_format = batch_format or ('json' if path.lower().endswith('.json') else 'csv')
+        with open(path, encoding='utf-8-sig') as f:
+            content = f.read()
+
+        try:
+            report = ingest_batch(content, batch_format, performed_by=user.id, dry_run=dry_run)
+        except BatchFormatError as e:
+            print(f"Cannot read {path}: {e}")
+            return 1
+
+        for error in report.errors:
+            print(f"Row {error.row_number} ({error.order_id or 'no order id'}): {error.message}")
+        verb = 'Would accept' if dry_run else 'Accepted'
+        print(f"{verb} {len(report.accepted)} results, rejected {len(report.errors)} rows")
+        return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Import a batch of lab results from an analyzer run.')
+    parser.add_argument('path', help='CSV or JSON batch file')
+    parser.add_argument('--performed-by', required=True,
+                        help='Username of the lab technician recording the results')
+    parser.add_argument('--format', choices=BATCH_FORMATS,
+                        help='Batch format; guessed from the file extension by default')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Validate the batch without recording anything')
+    args = parser.parse_args()
+    sys.exit(import_lab_results(args.path, args.performed_by, args.format, args.dry_run))
@@ -0,0 +1,51 @@
+"""
+Helpers shared by the test cases.
+
+The tests directory is on the import path when the tests run, so test modules
+import these as ``from helpers import capture_statements, login``.
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import db
+
+
+@contextmanager
+def capture_statements(expire=False, parameters=False):
+    """
+    Collect the SQL statements the engine runs inside the block.
+
+    Args:
+        expire (bool): Expire the session first, so that objects it already holds are
+            loaded again, like in a new request
+        parameters (bool): Collect (statement, parameters) pairs instead of statements
+
+    Yields:
+        list: The statements, appended to as they run
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, statement_parameters, context, executemany):
+        statements.append((statement, statement_parameters) if parameters else statement)
+
+    if expire:
+        db.session.expire_all()
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def login(client, principal_id):
+    """
+    Log a test client in, as Flask-Login does after a successful login.
+
+    Args:
+        client: The test client
+        principal_id (str): What the principal's ``get_id()`` returns, e.g. a user id
+    """
+    with client.session_transaction() as session:
+        session['_user_id'] = principal_id
+        session['_fresh'] = True
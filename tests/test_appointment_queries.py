@@ -0,0 +1,119 @@
+import unittest
+from datetime import date, datetime
+from flask_testing import TestCase
+from app import create_app, db
+from app.patients.models import Patient
+from app.auth.models import Role, User
+from app.appointments.models import Appointment, current_change_version
+from app.appointments.queries import appointment_rows, calendar_event, calendar_feed, parse_window_bound
+from helpers import capture_statements, login
+
+
+class TestAppointmentQueries(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        role = Role(name='Receptionist')
+        self.doctor = User(username='doctor', email='doctor@example.com', first_name='Gregory', last_name='House')
+        self.doctor.roles.append(role)
+        db.session.add_all([role, self.doctor])
+        for day in range(1, 11):
+            patient = Patient(first_name=f'Patient{day}', last_name='Test', date_of_birth=date(1990, 1, 1),
+                              gender='Male')
+            db.session.add(patient)
+            db.session.flush()
+            db.session.add(Appointment(patient_id=patient.id, doctor_id=self.doctor.id,
+                                       scheduled_time=datetime(2024, 1, day, 9, 45), duration=30))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def count_queries(self, func):
+        with capture_statements() as statements:
+            result = func()
+        return result, len(statements)
+
+    def test_rows_are_loaded_in_one_query(self):
+        rows, queries = self.count_queries(appointment_rows)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(queries, 1)
+        self.assertEqual(rows[0].patient_first_name, 'Patient1')
+        self.assertEqual(rows[0].doctor_last_name, 'House')
+        self.assertIsNone(rows[0].room_name)
+
+    def test_window(self):
+        rows = appointment_rows(start=datetime(2024, 1, 3), end=datetime(2024, 1, 6))
+        self.assertEqual([row.scheduled_time.day for row in rows], [3, 4, 5])
+
+    def test_parse_window_bound(self):
+        self.assertEqual(parse_window_bound('2024-01-03'), datetime(2024, 1, 3))
+        self.assertEqual(parse_window_bound('2024-01-03T00:00:00+07:00'), datetime(2024, 1, 3))
+        self.assertIsNone(parse_window_bound(''))
+        with self.assertRaises(ValueError):
+            parse_window_bound('next week')
+
+    def test_calendar_event_end_crosses_the_hour(self):
+        event_data = calendar_event(appointment_rows()[0])
+        self.assertEqual(event_data['end'], '2024-01-01T10:15:00')
+        self.assertEqual(event_data['extendedProps']['doctor_name'], 'Dr. Gregory House')
+
+    def test_changes_bump_the_version(self):
+        version = current_change_version()
+        self.assertGreater(version, 0)
+
+        appointment = Appointment.query.order_by(Appointment.scheduled_time).first()
+        appointment.status = 'Cancelled'
+        db.session.commit()
+        self.assertEqual(current_change_version(), version + 1)
+        self.assertEqual(appointment.change_version, version + 1)
+
+    def test_delta_feed(self):
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 8)
+        full = calendar_feed(start, end)
+        self.assertFalse(full['delta'])
+        self.assertEqual(len(full['events']), 7)
+
+        unchanged = calendar_feed(start, end, since=full['version'])
+        self.assertEqual((unchanged['events'], unchanged['removed']), ([], []))
+
+        appointments = Appointment.query.order_by(Appointment.scheduled_time).all()
+        appointments[0].status = 'Cancelled'
+        appointments[1].scheduled_time = datetime(2024, 2, 1, 9)
+        db.session.delete(appointments[2])
+        db.session.commit()
+
+        delta = calendar_feed(start, end, since=full['version'])
+        self.assertTrue(delta['delta'])
+        self.assertEqual([event['id'] for event in delta['events']], [appointments[0].id])
+        self.assertEqual(delta['events'][0]['extendedProps']['status'], 'Cancelled')
+        self.assertEqual(sorted(delta['removed']), sorted([appointments[1].id, appointments[2].id]))
+
+    def test_calendar_route(self):
+        login(self.client, self.doctor.id)
+        response = self.client.get('/api/appointments/calendar?start=2024-01-01T00:00:00%2B07:00&end=2024-01-08')
+        self.assert200(response)
+        self.assertEqual(len(response.json['events']), 7)
+        self.assert400(self.client.get('/api/appointments/calendar?start=yesterday'))
+
+    def test_calendar_route_etag(self):
+        login(self.client, self.doctor.id)
+        response = self.client.get('/api/appointments/calendar?start=2024-01-01&end=2024-01-08')
+        etag = response.headers['ETag']
+        response = self.client.get('/api/appointments/calendar?start=2024-01-01&end=2024-01-08',
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        Appointment.query.first().status = 'Completed'
+        db.session.commit()
+        response = self.client.get('/api/appointments/calendar?start=2024-01-01&end=2024-01-08',
+                                   headers={'If-None-Match': etag})
+        self.assert200(response)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+
+if __name__ == '__main__':
+    unittest.main()
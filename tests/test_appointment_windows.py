@@ -0,0 +1,94 @@
+import unittest
+from datetime import date, datetime, timedelta
+import pytz
+from flask_testing import TestCase
+from app import create_app, db
+from app.patients.models import Patient
+from app.auth.models import Role, User
+from app.appointments.models import Appointment
+from app.appointments.queries import appointment_rows
+from app.appointments.windows import day_window, hospital_today, upcoming_appointments, upcoming_days_window
+from helpers import capture_statements, login
+
+
+class TestAppointmentWindows(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        role = Role(name='Doctor')
+        self.doctor = User(username='doctor', email='doctor@example.com', first_name='Gregory', last_name='House')
+        self.doctor.roles.append(role)
+        self.patient = Patient(first_name='Ada', last_name='Test', date_of_birth=date(1990, 1, 1), gender='Female')
+        db.session.add_all([role, self.doctor, self.patient])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def add_appointment(self, scheduled_time, status='Scheduled'):
+        db.session.add(Appointment(patient_id=self.patient.id, doctor_id=self.doctor.id,
+                                   scheduled_time=scheduled_time, status=status))
+
+    def test_windows_are_half_open_days(self):
+        self.assertEqual(day_window(date(2026, 3, 4)), (datetime(2026, 3, 4), datetime(2026, 3, 5)))
+        self.assertEqual(day_window(date(2026, 3, 2), days=7), (datetime(2026, 3, 2), datetime(2026, 3, 9)))
+        self.assertEqual(upcoming_days_window(7, date(2026, 3, 4)), (datetime(2026, 3, 5), datetime(2026, 3, 12)))
+
+    def test_today_follows_hospital_timezone(self):
+        for timezone in ('Pacific/Kiritimati', 'Pacific/Pago_Pago'):
+            self.app.config['HOSPITAL_TIMEZONE'] = timezone
+            self.assertIn((hospital_today() - datetime.now(pytz.timezone(timezone)).date()).days, (0, 1))
+        # UTC+14 and UTC-11 are always on different dates
+        self.app.config['HOSPITAL_TIMEZONE'] = 'Pacific/Kiritimati'
+        east = hospital_today()
+        self.app.config['HOSPITAL_TIMEZONE'] = 'Pacific/Pago_Pago'
+        self.assertNotEqual(east, hospital_today())
+
+    def test_day_boundaries(self):
+        day = date(2026, 3, 4)
+        for scheduled_time in (datetime(2026, 3, 3, 23, 59), datetime(2026, 3, 4, 0, 0), datetime(2026, 3, 4, 23, 59),
+                               datetime(2026, 3, 5, 0, 0)):
+            self.add_appointment(scheduled_time)
+        db.session.commit()
+
+        window = day_window(day)
+        appointments = appointment_rows(start=window.start, end=window.end, doctor_id=self.doctor.id)
+        self.assertEqual([appointment.scheduled_time for appointment in appointments],
+                         [datetime(2026, 3, 4, 0, 0), datetime(2026, 3, 4, 23, 59)])
+
+    def test_filters_compare_the_bare_column(self):
+        doctor_id = self.doctor.id
+        with capture_statements() as statements:
+            window = day_window(date(2026, 3, 4))
+            appointment_rows(start=window.start, end=window.end, doctor_id=doctor_id)
+        self.assertNotIn('date(', statements[0].lower())
+        self.assertIn('appointment.scheduled_time >=', statements[0])
+
+    def test_upcoming(self):
+        now = datetime(2026, 3, 4, 12, 0)
+        for hours in (-1, 1, 2, 3):
+            self.add_appointment(now + timedelta(hours=hours))
+        self.add_appointment(now + timedelta(minutes=30), status='Cancelled')
+        db.session.commit()
+
+        appointments = upcoming_appointments(2, patient_id=self.patient.id, after=now).all()
+        self.assertEqual([appointment.scheduled_time.hour for appointment in appointments], [13, 14])
+
+    def test_today_view(self):
+        today = hospital_today()
+        self.add_appointment(datetime.combine(today, datetime.min.time()) + timedelta(hours=9))
+        self.add_appointment(datetime.combine(today, datetime.min.time()) - timedelta(minutes=1))
+        db.session.commit()
+        login(self.client, self.doctor.id)
+
+        response = self.client.get('/appointments/today')
+        self.assert200(response)
+        self.assertIn(today.strftime('%Y-%m-%d').encode(), response.data)
+        self.assertEqual(response.data.count(b'Ada Test'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
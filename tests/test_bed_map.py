@@ -0,0 +1,98 @@
+import unittest
+from datetime import date
+from flask_testing import TestCase
+from app import create_app, db
+from app.auth.models import Role, User
+from app.patients.models import Patient
+from app.hospital.models import Admission, Bed, Hospital, RoomClass, Ward, WardRoom
+from app.hospital.bed_map import build_bed_map, get_bed_map_structure
+from helpers import capture_statements, login
+
+
+class TestBedMap(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        role = Role(name='Nurse')
+        self.nurse = User(username='nurse', email='nurse@example.com', first_name='Florence', last_name='N')
+        self.nurse.roles.append(role)
+        hospital = Hospital(name='General Hospital', code='GH')
+        self.general = RoomClass(name='Class 1', code='C1')
+        self.icu = RoomClass(name='ICU', code='ICU')
+        db.session.add_all([role, self.nurse, hospital, self.general, self.icu])
+        db.session.flush()
+        self.ward = Ward(hospital_id=hospital.id, name='North', code='N')
+        db.session.add(self.ward)
+        db.session.flush()
+        self.general_room = WardRoom(ward_id=self.ward.id, room_class_id=self.general.id, name='N1', code='N1',
+                                     capacity=4)
+        self.icu_room = WardRoom(ward_id=self.ward.id, room_class_id=self.icu.id, name='N2', code='N2')
+        db.session.add_all([self.general_room, self.icu_room])
+        db.session.flush()
+        self.occupied = Bed(ward_room_id=self.general_room.id, name='Bed A', code='N1-A', is_occupied=True)
+        self.free = Bed(ward_room_id=self.general_room.id, name='Bed B', code='N1-B')
+        patient = Patient(first_name='Ada', last_name='Lovelace', date_of_birth=date(1980, 1, 1), gender='Female')
+        db.session.add_all([self.occupied, self.free, Bed(ward_room_id=self.icu_room.id, name='Bed A', code='N2-A'),
+                            patient])
+        db.session.flush()
+        db.session.add(Admission(patient_id=patient.id, bed_id=self.occupied.id, admitted_by=self.nurse.id))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def get_bed_map(self):
+        with capture_statements() as statements:
+            response = self.client.get('/admin/beds')
+        return response, len(statements)
+
+    def test_tree(self):
+        bed_data, wards, room_classes = build_bed_map()
+        self.assertEqual([ward.name for ward in wards], ['North'])
+        self.assertEqual([room_class.name for room_class in room_classes], ['Class 1', 'ICU'])
+
+        class_data = bed_data[self.ward.id]['room_classes'][self.general.id]
+        (room,) = class_data['rooms']
+        self.assertEqual(room['ward_room'].capacity, 4)
+        self.assertEqual([bed['name'] for bed in room['beds']], ['Bed A', 'Bed B'])
+        self.assertTrue(room['beds'][0]['is_occupied'])
+        self.assertEqual(room['beds'][0]['patient_name'], 'Ada Lovelace')
+        self.assertIsNone(room['beds'][1]['patient_name'])
+
+    def test_structure_cached_until_layout_changes(self):
+        structure = get_bed_map_structure()
+        self.free.is_occupied = True
+        db.session.commit()
+        self.assertIs(get_bed_map_structure(), structure)
+
+        db.session.add(Bed(ward_room_id=self.icu_room.id, name='Bed B', code='N2-B'))
+        db.session.commit()
+        self.assertIsNot(get_bed_map_structure(), structure)
+        bed_data, _, _ = build_bed_map()
+        (icu_room,) = bed_data[self.ward.id]['room_classes'][self.icu.id]['rooms']
+        self.assertEqual(len(icu_room['beds']), 2)
+
+    def test_page_query_count_is_constant(self):
+        login(self.client, self.nurse.id)
+
+        response, _ = self.get_bed_map()
+        self.assert200(response)
+        self.assertIn(b'Ada Lovelace', response.data)
+        response, small_map_queries = self.get_bed_map()
+
+        for index in range(30):
+            db.session.add(Bed(ward_room_id=self.general_room.id, name=f'Bed {index:02d}', code=f'N1-{index}',
+                               is_occupied=index % 2 == 0))
+        db.session.commit()
+        self.get_bed_map()
+        response, large_map_queries = self.get_bed_map()
+        self.assert200(response)
+        self.assertIn(b'Bed 29', response.data)
+        self.assertEqual(small_map_queries, large_map_queries)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from app.patients.models import Patient
+from app.hospital.models import Bed, Hospital, RoomClass, Ward, WardRoom
+from app.hospital.occupancy import OCCUPANCY_VERSION_PARAMETER, get_bed_occupancy_index
+from app.system_params.models import increment_counter_parameter
+
+
+class TestBedOccupancyIndex(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        hospital = Hospital(name='General Hospital', code='GH')
+        self.general = RoomClass(name='Class 1', code='C1', care_level='General')
+        self.icu = RoomClass(name='ICU', code='ICU', care_level='ICU')
+        db.session.add_all([hospital, self.general, self.icu])
+        db.session.flush()
+        self.ward = Ward(hospital_id=hospital.id, name='North', code='N')
+        db.session.add(self.ward)
+        db.session.flush()
+        self.general_room = WardRoom(ward_id=self.ward.id, room_class_id=self.general.id, name='N1', code='N1')
+        self.icu_room = WardRoom(ward_id=self.ward.id, room_class_id=self.icu.id, name='N2', code='N2')
+        db.session.add_all([self.general_room, self.icu_room])
+        db.session.flush()
+        self.beds = [Bed(ward_room_id=self.general_room.id, name=f'Bed {i}', code=f'N1-{i}', is_occupied=i == 0)
+                     for i in range(3)]
+        self.beds.append(Bed(ward_room_id=self.icu_room.id, name='Bed 0', code='N2-0'))
+        db.session.add_all(self.beds)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def test_free_bed_counts(self):
+        index = get_bed_occupancy_index()
+        self.assertEqual(index.free_beds(), 3)
+        self.assertEqual(index.free_beds(ward_id=self.ward.id, room_class_id=self.general.id), 2)
+        self.assertEqual(index.free_beds(room_class_id=self.icu.id), 1)
+        self.assertEqual(index.free_beds(room_id=self.icu_room.id), 1)
+        self.assertFalse(index.is_free(self.beds[0].id))
+        self.assertIn((self.beds[1].id, 'Bed 1 - North - N1'), index.free_bed_choices())
+
+    def test_commit_swaps_in_an_updated_copy(self):
+        index = get_bed_occupancy_index()
+        self.beds[1].is_occupied = True
+        self.beds[0].is_occupied = False
+        db.session.commit()
+
+        updated = get_bed_occupancy_index()
+        self.assertIsNot(updated, index)
+        self.assertTrue(updated.is_free(self.beds[0].id))
+        self.assertFalse(updated.is_free(self.beds[1].id))
+        self.assertEqual(updated.free_beds(ward_id=self.ward.id, room_class_id=self.general.id), 2)
+        # Requests still holding the previous index see it unchanged
+        self.assertFalse(index.is_free(self.beds[0].id))
+        self.assertTrue(index.is_free(self.beds[1].id))
+        self.assertEqual(index.free_bed_ids(room_id=self.general_room.id), {self.beds[1].id, self.beds[2].id})
+        # Sets of beds that did not change are shared
+        self.assertIs(updated._free_by_room[self.icu_room.id], index._free_by_room[self.icu_room.id])
+
+    def test_rollback_leaves_index_untouched(self):
+        index = get_bed_occupancy_index()
+        self.beds[1].is_occupied = True
+        db.session.flush()
+        db.session.rollback()
+
+        self.assertIs(get_bed_occupancy_index(), index)
+        self.assertTrue(index.is_free(self.beds[1].id))
+
+    def test_index_read_before_rollback_is_not_cached(self):
+        index = get_bed_occupancy_index()
+        self.beds[1].is_occupied = True
+        db.session.flush()
+        # The transaction sees its own change, but the index built for it is not shared
+        self.assertFalse(get_bed_occupancy_index().is_free(self.beds[1].id))
+        db.session.rollback()
+
+        self.assertIs(get_bed_occupancy_index(), index)
+        self.assertTrue(get_bed_occupancy_index().is_free(self.beds[1].id))
+
+    def test_change_by_another_worker_rebuilds_index(self):
+        index = get_bed_occupancy_index()
+        with db.engine.begin() as connection:
+            connection.execute(Bed.__table__.update().where(Bed.id == self.beds[3].id).values(is_occupied=True))
+            increment_counter_parameter(OCCUPANCY_VERSION_PARAMETER, connection)
+        db.session.rollback()
+
+        rebuilt = get_bed_occupancy_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(rebuilt.free_beds(room_class_id=self.icu.id), 0)
+
+    def test_new_bed_rebuilds_index(self):
+        get_bed_occupancy_index()
+        db.session.add(Bed(ward_room_id=self.icu_room.id, name='Bed 1', code='N2-1'))
+        db.session.commit()
+        self.assertEqual(get_bed_occupancy_index().free_beds(room_class_id=self.icu.id), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
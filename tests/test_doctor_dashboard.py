@@ -0,0 +1,146 @@
+import unittest
+from datetime import date, datetime, timedelta
+from flask_testing import TestCase
+from app import create_app, db
+from app.auth.models import Role, User
+from app.patients.models import Patient
+from app.appointments.models import Appointment
+from app.appointments.windows import hospital_now
+from app.clinical_notes.models import ClinicalNote
+from app.hospital.models import Clinic, Hospital, Room
+from app.lab.models import LabOrder
+from app.lab.ingest import ResultRow, ingest_results
+from app.doctor.dashboard import get_dashboard
+from helpers import capture_statements, login
+
+
+class TestDoctorDashboard(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        role = Role(name='Doctor')
+        self.doctor = User(username='house', email='house@example.com', first_name='Gregory', last_name='House')
+        self.other = User(username='wilson', email='wilson@example.com', first_name='James', last_name='Wilson')
+        self.doctor.roles.append(role)
+        self.other.roles.append(role)
+        hospital = Hospital(name='General', code='GEN')
+        db.session.add_all([role, self.doctor, self.other, hospital])
+        db.session.flush()
+        clinic = Clinic(hospital_id=hospital.id, name='Internal Medicine', code='IM')
+        db.session.add(clinic)
+        db.session.flush()
+        self.room = Room(clinic_id=clinic.id, name='Exam 1', code='EX1')
+        db.session.add(self.room)
+        db.session.flush()
+        self.add_patients(3)
+        db.session.commit()
+        self.doctor_id = self.doctor.id
+        self.other_id = self.other.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def add_patients(self, count):
+        now = hospital_now().replace(hour=9, minute=0, second=0, microsecond=0)
+        for index in range(count):
+            patient = Patient(first_name=f'Patient{index}', last_name='Test', date_of_birth=date(1990, 1, 1),
+                              gender='Female')
+            db.session.add(patient)
+            db.session.flush()
+            db.session.add_all([
+                Appointment(patient_id=patient.id, doctor_id=self.doctor.id, scheduled_time=now + timedelta(minutes=index),
+                            room_id=self.room.id if index % 2 else None),
+                ClinicalNote(patient_id=patient.id, written_by=self.doctor.id, note_type='Progress Note',
+                             content='Stable', date=datetime(2026, 5, 1, 8, index)),
+                LabOrder(patient_id=patient.id, ordered_by=self.doctor.id, test_type='Lipid Panel',
+                         order_date=datetime(2026, 5, 1, 7, index), status='Completed'),
+            ])
+
+    def dashboard_statements(self, doctor_id):
+        with capture_statements(expire=True) as statements:
+            dashboard = get_dashboard(doctor_id)
+        return dashboard, statements
+
+    def test_page(self):
+        login(self.client, self.doctor_id)
+        response = self.client.get('/doctor')
+        self.assert200(response)
+        self.assertIn(b'Patient2 Test', response.data)
+        self.assertIn(b'Exam 1', response.data)
+        self.assertIn(b'Not assigned', response.data)
+        self.assertIn(b'Lipid Panel', response.data)
+
+    def test_three_queries_whatever_the_number_of_rows(self):
+        self.app.config['DOCTOR_DASHBOARD_CACHE_TTL'] = 0
+        dashboard, statements = self.dashboard_statements(self.doctor_id)
+        self.assertEqual((len(dashboard.appointments), len(dashboard.recent_notes), len(dashboard.lab_results)),
+                         (3, 3, 3))
+        self.assertEqual(len(statements), 3)
+
+        self.add_patients(10)
+        db.session.commit()
+        dashboard, statements = self.dashboard_statements(self.doctor_id)
+        self.assertEqual((len(dashboard.appointments), len(dashboard.recent_notes)), (13, 5))
+        self.assertEqual(len(statements), 3)
+
+    def test_cached_until_the_doctor_changes_something(self):
+        self.dashboard_statements(self.doctor_id)
+        _, statements = self.dashboard_statements(self.doctor_id)
+        self.assertEqual(statements, [])
+
+        # Another doctor's note leaves the entry alone
+        patient = Patient.query.first()
+        db.session.add(ClinicalNote(patient_id=patient.id, written_by=self.other_id, note_type='Consultation Note',
+                                    content='Seen'))
+        db.session.commit()
+        _, statements = self.dashboard_statements(self.doctor_id)
+        self.assertEqual(statements, [])
+
+        db.session.add(ClinicalNote(patient_id=patient.id, written_by=self.doctor_id, note_type='Consultation Note',
+                                    content='Seen', date=datetime(2026, 6, 1)))
+        db.session.commit()
+        dashboard, statements = self.dashboard_statements(self.doctor_id)
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(dashboard.recent_notes[0].note_type, 'Consultation Note')
+
+    def test_reassigned_appointment_drops_both_dashboards(self):
+        self.dashboard_statements(self.doctor_id)
+        self.dashboard_statements(self.other_id)
+        appointment = Appointment.query.first()
+        appointment.doctor_id = self.other_id
+        db.session.commit()
+
+        dashboard, _ = self.dashboard_statements(self.doctor_id)
+        self.assertEqual(len(dashboard.appointments), 2)
+        dashboard, _ = self.dashboard_statements(self.other_id)
+        self.assertEqual(len(dashboard.appointments), 1)
+
+    def test_rolled_back_changes_keep_the_entry(self):
+        self.dashboard_statements(self.doctor_id)
+        Appointment.query.first().status = 'Cancelled'
+        db.session.flush()
+        db.session.rollback()
+        _, statements = self.dashboard_statements(self.doctor_id)
+        self.assertEqual(statements, [])
+
+    def test_ingested_results_drop_the_dashboard(self):
+        patient = Patient.query.first()
+        order = LabOrder(patient_id=patient.id, ordered_by=self.doctor_id, test_type='Glucose',
+                         order_date=datetime(2026, 6, 1))
+        db.session.add(order)
+        db.session.commit()
+        order_id = order.id
+        dashboard, _ = self.dashboard_statements(self.doctor_id)
+        self.assertNotIn('Glucose', [lab_order.test_type for lab_order in dashboard.lab_results])
+
+        ingest_results([ResultRow(1, order_id, 'Glucose 90', None)], self.doctor_id)
+        dashboard, statements = self.dashboard_statements(self.doctor_id)
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(dashboard.lab_results[0].test_type, 'Glucose')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from app.patients.models import Nationality
+from app.patients.forms import PatientForm, PatientRegistrationForm
+from app.system_params.models import PayorDetail, PayorType
+from helpers import capture_statements
+
+
+class TestPatientFormChoices(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        insurance = PayorType(name='Insurance', is_active=True)
+        db.session.add_all([insurance, PayorType(name='Retired', is_active=False),
+                            Nationality(id='ID', name='Indonesian')])
+        db.session.flush()
+        db.session.add(PayorDetail(name='BPJS', payor_type_id=insurance.id, is_active=True))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def test_choices(self):
+        with self.app.test_request_context():
+            form = PatientRegistrationForm()
+            self.assertEqual(list(form.payor_type.choices), [('', 'Select Payor Type'), ('Insurance', 'Insurance')])
+            self.assertEqual(list(form.nationality_id.choices), [('', 'Select Nationality'), ('ID', 'Indonesian')])
+            self.assertEqual(list(form.payor_detail.choices), [('', 'Select Payor Type First')])
+
+            edit_form = PatientForm(obj=type('Patient', (), {'payor_type': 'Insurance'})())
+            self.assertEqual(list(edit_form.payor_detail.choices), [('', 'Select Insurance Detail'), ('BPJS', 'BPJS')])
+
+    def test_lists_are_shared_and_cost_one_query(self):
+        with self.app.test_request_context():
+            first = PatientRegistrationForm()
+            with capture_statements() as statements:
+                second = PatientRegistrationForm()
+            self.assertIs(first.nationality_id.choices, second.nationality_id.choices)
+            self.assertEqual(len(statements), 1)
+
+    def test_rebuilt_when_reference_data_changes(self):
+        with self.app.test_request_context():
+            PatientRegistrationForm()
+            db.session.add(Nationality(id='MY', name='Malaysian'))
+            db.session.commit()
+            form = PatientRegistrationForm()
+            self.assertIn(('MY', 'Malaysian'), form.nationality_id.choices)
+
+
+if __name__ == '__main__':
+    unittest.main()
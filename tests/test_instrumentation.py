@@ -0,0 +1,96 @@
+import json
+import unittest
+from datetime import date
+from flask_testing import TestCase
+from app import create_app, db
+from app.auth.models import Role, User
+from app.patients.models import Patient
+from app.instrumentation import RequestStats, get_registry
+from helpers import capture_statements, login
+
+
+class TestInstrumentation(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        admin_role = Role(name='Admin')
+        doctor_role = Role(name='Doctor')
+        self.admin = User(username='admin', email='admin@example.com', first_name='Ada', last_name='Admin')
+        self.admin.roles.append(admin_role)
+        self.doctor = User(username='doctor', email='doctor@example.com', first_name='Gregory', last_name='House')
+        self.doctor.roles.append(doctor_role)
+        db.session.add_all([admin_role, doctor_role, self.admin, self.doctor,
+                            Patient(first_name='Ana', last_name='Test', date_of_birth=date(1990, 1, 1),
+                                    gender='Female')])
+        db.session.commit()
+        self.admin_id = self.admin.id
+        self.doctor_id = self.doctor.id
+        get_registry().reset()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def test_server_timing_counts_the_request_statements(self):
+        login(self.client, self.doctor_id)
+        with capture_statements() as statements:
+            response = self.client.get('/patients/list')
+        self.assert200(response)
+        timings = response.headers.getlist('Server-Timing')
+        self.assertTrue(timings[0].startswith('db;dur='))
+        self.assertIn(f'desc="{len(statements)} queries"', timings[0])
+        self.assertTrue(timings[1].startswith('app;dur='))
+
+        summary, = [summary for summary in get_registry().summaries() if summary.endpoint == 'patients.list_patients']
+        self.assertEqual((summary.requests, summary.max_queries), (1, len(statements)))
+        self.assertEqual(sum(summary.histogram), 1)
+        self.assertTrue(summary.slowest)
+
+    def test_percentiles(self):
+        registry = get_registry()
+        for milliseconds in range(1, 101):
+            stats = RequestStats()
+            stats.add(milliseconds / 2000, 'SELECT 1')
+            registry.record('example', milliseconds / 1000, stats)
+        summary, = registry.summaries()
+        self.assertEqual((summary.p50_ms, summary.p95_ms), (50, 95))
+        self.assertEqual(summary.db_p95_ms, 47.5)
+        self.assertEqual(summary.histogram[:3], [10, 15, 25])
+        self.assertEqual(len(summary.slowest), 5)
+
+    def test_slow_query_log(self):
+        self.app.config['SLOW_QUERY_THRESHOLD_MS'] = 0.0001
+        login(self.client, self.doctor_id)
+        with self.assertLogs('app.instrumentation', 'WARNING') as logs:
+            self.client.get('/patients/list')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['event'], record['endpoint']), ('slow_query', 'patients.list_patients'))
+        self.assertIn('SELECT', record['statement'])
+        self.assertNotIn('parameters', record)
+
+    def test_disabled(self):
+        self.app.config['SQL_INSTRUMENTATION'] = False
+        login(self.client, self.doctor_id)
+        response = self.client.get('/patients/list')
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertEqual(get_registry().summaries(), [])
+
+    def test_perf_page_is_admin_only(self):
+        login(self.client, self.doctor_id)
+        self.assert403(self.client.get('/admin/perf'))
+
+    def test_perf_page(self):
+        login(self.client, self.admin_id)
+        self.client.get('/admin/users')
+        response = self.client.get('/admin/perf')
+        self.assert200(response)
+        self.assertIn(b'admin.list_users', response.data)
+
+        self.client.post('/admin/perf/reset')
+        self.assertNotIn(b'admin.list_users', self.client.get('/admin/perf').data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import io
+import json
+import unittest
+from datetime import date, datetime
+from flask_testing import TestCase
+from app import create_app, db
+from app.auth.models import Role, User
+from app.patients.models import Patient
+from app.lab.models import LabOrder, LabResult, current_change_version
+from app.lab.ingest import BatchFormatError, ingest_batch, parse_batch
+from app.lab.worklist import WorklistFilters, worklist_feed
+from helpers import capture_statements, login
+
+
+class TestLabResultIngest(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        role = Role(name='Lab Technician')
+        self.technician = User(username='lab', email='lab@example.com', first_name='Rosalind', last_name='F')
+        self.technician.roles.append(role)
+        self.patient = Patient(first_name='Ana', last_name='Test', date_of_birth=date(1990, 1, 1), gender='Female')
+        db.session.add_all([role, self.technician, self.patient])
+        db.session.flush()
+        self.orders = [LabOrder(patient_id=self.patient.id, ordered_by=self.technician.id, test_type='Lipid Panel',
+                                order_date=datetime(2026, 5, 1, 7, index)) for index in range(4)]
+        self.orders[2].status = 'Cancelled'
+        db.session.add_all(self.orders)
+        db.session.commit()
+        self.order_ids = [order.id for order in self.orders]
+        self.technician_id = self.technician.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def test_parse_csv_and_json(self):
+        content = ('order_id,result_data,result_date\n'
+                   'a,LDL 120,2026-05-02T08:30:00\n'
+                   ',HDL 50,\n'
+                   'b,,\n'
+                   'c,HDL 50,yesterday\n'
+                   'd,LDL 90,2026-03-02T10:00:00+07:00\n')
+        rows, errors = parse_batch(content, 'csv')
+        self.assertEqual([(row.row_number, row.order_id) for row in rows], [(1, 'a'), (5, 'd')])
+        self.assertEqual(rows[0].result_date, datetime(2026, 5, 2, 8, 30))
+        # Times with an offset are stored in UTC
+        self.assertEqual(rows[1].result_date, datetime(2026, 3, 2, 3, 0))
+        self.assertEqual([(error.row_number, error.message) for error in errors],
+                         [(2, 'Missing order_id'), (3, 'Missing result_data'), (4, 'Invalid result_date')])
+
+        rows, errors = parse_batch(json.dumps({'results': [{'order_id': 'a', 'result_data': {'LDL': 120}}]}), 'json')
+        self.assertEqual((rows[0].result_data, errors), ('{"LDL": 120}', []))
+
+        for content, batch_format in (('id,value\n1,2\n', 'csv'), ('{', 'json'), ('{"results": 1}', 'json'),
+                                      ('', 'xml')):
+            with self.assertRaises(BatchFormatError):
+                parse_batch(content, batch_format)
+
+    def test_partial_batch(self):
+        db.session.add(LabResult(order_id=self.order_ids[3], performed_by=self.technician_id, result_data='Done'))
+        db.session.commit()
+        version = current_change_version()
+        content = '\n'.join(['order_id,result_data', f'{self.order_ids[0]},LDL 120', 'missing,LDL 90',
+                             f'{self.order_ids[2]},LDL 100', f'{self.order_ids[3]},LDL 80',
+                             f'{self.order_ids[0]},LDL 121', f'{self.order_ids[1]},LDL 130'])
+
+        report = ingest_batch(content, 'csv', self.technician_id)
+        self.assertEqual(report.accepted, [self.order_ids[0], self.order_ids[1]])
+        self.assertEqual([(error.row_number, error.message) for error in report.errors],
+                         [(2, 'Unknown lab order'), (3, 'Lab order is cancelled'), (4, 'Results already entered'),
+                          (5, 'Duplicate order in batch')])
+
+        db.session.expire_all()
+        self.assertEqual([db.session.get(LabOrder, order_id).status for order_id in self.order_ids],
+                         ['Completed', 'Completed', 'Cancelled', 'Ordered'])
+        self.assertEqual(LabResult.query.filter_by(order_id=self.order_ids[0]).one().result_data, 'LDL 120')
+
+        # Polling clients see the completed orders leave the pending view
+        self.assertGreater(current_change_version(), version)
+        feed = worklist_feed(WorklistFilters(status='Ordered'), since=version)
+        self.assertEqual(sorted(feed['removed']), sorted(self.order_ids[:2]))
+
+    def test_statement_count_does_not_grow_with_batch_size(self):
+        counts = []
+        for order_ids in (self.order_ids[:1], self.order_ids[:2] + [self.order_ids[3]]):
+            db.session.query(LabResult).delete()
+            db.session.query(LabOrder).filter(LabOrder.id.in_(order_ids)).update({'status': 'Ordered'})
+            db.session.commit()
+            content = json.dumps([{'order_id': order_id, 'result_data': 'Normal'} for order_id in order_ids])
+            with capture_statements() as statements:
+                report = ingest_batch(content, 'json', self.technician_id)
+            self.assertEqual(len(report.accepted), len(order_ids))
+            counts.append(len(statements))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_dry_run_writes_nothing(self):
+        version = current_change_version()
+        report = ingest_batch(json.dumps([{'order_id': self.order_ids[0], 'result_data': 'Normal'}]), 'json',
+                              self.technician_id, dry_run=True)
+        self.assertEqual(report.accepted, [self.order_ids[0]])
+        self.assertEqual(LabResult.query.count(), 0)
+        self.assertEqual(db.session.get(LabOrder, self.order_ids[0]).status, 'Ordered')
+        self.assertEqual(current_change_version(), version)
+
+    def test_endpoint(self):
+        login(self.client, self.technician_id)
+        response = self.client.post('/api/lab/results/batch',
+                                    json=[{'order_id': self.order_ids[0], 'result_data': 'Normal'},
+                                          {'order_id': 'missing', 'result_data': 'Normal'}])
+        self.assert200(response)
+        self.assertEqual((response.json['accepted'], response.json['rejected']), (1, 1))
+        self.assertEqual(response.json['errors'][0]['message'], 'Unknown lab order')
+
+        upload = io.BytesIO(f'order_id,result_data\n{self.order_ids[1]},Normal\n'.encode())
+        response = self.client.post('/api/lab/results/batch?dry_run=1', data={'file': (upload, 'run.csv')},
+                                    content_type='multipart/form-data')
+        self.assertEqual((response.json['accepted_order_ids'], response.json['dry_run']), ([self.order_ids[1]], True))
+
+        response = self.client.post('/api/lab/results/batch?format=csv', data='not,a,batch\n')
+        self.assert400(response)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+from datetime import date, datetime, timedelta
+from flask_testing import TestCase
+from app import create_app, db
+from app.auth.models import Role, User
+from app.patients.models import Patient
+from app.lab.models import LabOrder, LabResult
+from app.lab.worklist import WorklistFilters, status_counts, worklist_feed, worklist_page
+from helpers import capture_statements, login
+
+START = datetime(2026, 5, 1, 7, 0, 0)
+
+
+class TestLabWorklist(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        role = Role(name='Lab Technician')
+        self.technician = User(username='lab', email='lab@example.com', first_name='Rosalind', last_name='F')
+        self.technician.roles.append(role)
+        self.doctor = User(username='doctor', email='doctor@example.com', first_name='Gregory', last_name='House')
+        self.patients = [Patient(first_name=first_name, last_name='Test', date_of_birth=date(1990, 1, 1),
+                                 gender='Female') for first_name in ('Ana', 'Budi', 'Citra')]
+        db.session.add_all([role, self.technician, self.doctor] + self.patients)
+        db.session.flush()
+        self.orders = []
+        for index in range(9):
+            order = LabOrder(patient_id=self.patients[index % 3].id, ordered_by=self.doctor.id,
+                             test_type='Lipid Panel' if index % 2 else 'Urinalysis',
+                             order_date=START + timedelta(hours=index // 2),
+                             status='Completed' if index < 3 else 'Ordered')
+            self.orders.append(order)
+        db.session.add_all(self.orders)
+        db.session.flush()
+        db.session.add(LabResult(order_id=self.orders[0].id, performed_by=self.technician.id, result_data='Normal',
+                                 result_date=START + timedelta(days=1)))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def test_pages_are_newest_first_and_complete(self):
+        ids = []
+        page = worklist_page(WorklistFilters(), limit=2)
+        while True:
+            self.assertLessEqual(len(page.orders), 2)
+            ids.extend(order.id for order in page.orders)
+            if not page.next_cursor:
+                break
+            page = worklist_page(WorklistFilters(), cursor=page.next_cursor, limit=2)
+        expected = sorted(self.orders, key=lambda order: (order.order_date, order.id), reverse=True)
+        self.assertEqual(ids, [order.id for order in expected])
+
+    def test_rows_carry_names_and_results(self):
+        orders = {order.id: order for order in worklist_page(WorklistFilters(status='Completed')).orders}
+        self.assertEqual(len(orders), 3)
+        first = orders[self.orders[0].id]
+        self.assertEqual((first.patient_first_name, first.orderer_last_name), ('Ana', 'House'))
+        self.assertEqual((first.result_date, first.performer_first_name), (START + timedelta(days=1), 'Rosalind'))
+        self.assertIsNone(orders[self.orders[1].id].result_date)
+
+    def test_rows_carry_the_first_result(self):
+        db.session.add_all([
+            LabResult(order_id=self.orders[0].id, performed_by=self.doctor.id, result_data='Repeat',
+                      result_date=START + timedelta(days=3)),
+            LabResult(order_id=self.orders[0].id, performed_by=self.doctor.id, result_data='Earlier',
+                      result_date=START + timedelta(hours=20)),
+        ])
+        db.session.commit()
+        orders = {order.id: order for order in worklist_page(WorklistFilters(status='Completed')).orders}
+        first = orders[self.orders[0].id]
+        self.assertEqual((first.result_date, first.performer_first_name), (START + timedelta(hours=20), 'Gregory'))
+
+    def test_filters(self):
+        orders = worklist_page(WorklistFilters(patient_name='bud', test_type='Lipid Panel')).orders
+        self.assertEqual({order.patient_first_name for order in orders}, {'Budi'})
+        self.assertTrue(all(order.test_type == 'Lipid Panel' for order in orders))
+        self.assertEqual(len(worklist_page(WorklistFilters(ordered_by='hous')).orders), 9)
+        self.assertEqual(len(worklist_page(WorklistFilters(start_date=date(2026, 5, 2))).orders), 0)
+
+    def test_status_counts(self):
+        self.assertEqual(status_counts(WorklistFilters(status='Ordered')),
+                         {'Ordered': 6, 'Completed': 3, 'Cancelled': 0})
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            worklist_page(WorklistFilters(), cursor='garbage')
+
+    def test_feed_delta(self):
+        filters = WorklistFilters(status='Ordered')
+        feed = worklist_feed(filters)
+        self.assertFalse(feed['delta'])
+        self.assertEqual(len(feed['orders']), 6)
+
+        # Completing an order through a new result moves it out of the pending view
+        pending = self.orders[5]
+        pending.status = 'Completed'
+        db.session.add(LabResult(order_id=pending.id, performed_by=self.technician.id, result_data='High'))
+        db.session.add(LabOrder(patient_id=self.patients[0].id, ordered_by=self.doctor.id, test_type='Urinalysis',
+                                order_date=START + timedelta(days=2)))
+        db.session.commit()
+
+        delta = worklist_feed(filters, since=feed['version'])
+        self.assertTrue(delta['delta'])
+        self.assertEqual(delta['removed'], [pending.id])
+        self.assertEqual([order['order_date'] for order in delta['orders']], [(START + timedelta(days=2)).isoformat()])
+        self.assertEqual(delta['counts']['Ordered'], 6)
+
+        with capture_statements() as statements:
+            unchanged = worklist_feed(filters, since=delta['version'])
+        self.assertEqual((unchanged['orders'], unchanged['removed']), ([], []))
+        # Only the change counter is read
+        self.assertEqual(len(statements), 1)
+
+    def test_dashboard_query_count_does_not_grow_with_history(self):
+        login(self.client, self.technician.id)
+        self.client.get('/lab/dashboard?status=all')
+        counts = []
+        for extra in (0, 200):
+            db.session.add_all(LabOrder(patient_id=self.patients[index % 3].id, ordered_by=self.doctor.id,
+                                        test_type='Urinalysis', order_date=START - timedelta(days=index + 1),
+                                        status='Completed')
+                               for index in range(extra))
+            db.session.commit()
+            with capture_statements(expire=True) as statements:
+                response = self.client.get('/lab/dashboard?status=all')
+            self.assert200(response)
+            counts.append(len(statements))
+        self.assertEqual(counts[0], counts[1])
+        self.assertIn(b'Older orders', response.data)
+
+    def test_feed_endpoint(self):
+        login(self.client, self.technician.id)
+        response = self.client.get('/api/lab/worklist?status=Ordered')
+        self.assert200(response)
+        self.assertEqual(len(response.json['orders']), 6)
+        response = self.client.get('/api/lab/worklist?status=Ordered&since=0',
+                                   headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from datetime import date
+from flask_testing import TestCase
+from app import create_app, db
+from app.patients.models import Patient, generate_mrn
+from app.patients.mrn import MRNAllocator, format_mrn, parse_mrn
+from app.system_params.models import SystemParameter
+
+
+class TestMRNAllocator(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def test_format_and_parse(self):
+        self.assertEqual(format_mrn(1), '00-00-00-01')
+        self.assertEqual(format_mrn(1234567), '01-23-45-67')
+        self.assertEqual(parse_mrn('01-23-45-67'), 1234567)
+        with self.assertRaises(ValueError):
+            format_mrn(100000000)
+
+    def test_allocators_never_share_numbers(self):
+        first = MRNAllocator(db.engine, block_size=5)
+        second = MRNAllocator(db.engine, block_size=5)
+        mrns = [first.allocate() for _ in range(7)] + [second.allocate() for _ in range(7)]
+        self.assertEqual(len(mrns), len(set(mrns)))
+
+    def test_counter_continues_after_last_mrn(self):
+        if db.engine.dialect.name == 'postgresql':
+            self.skipTest('PostgreSQL allocates from the MRN sequence')
+        db.session.add(SystemParameter(name='last_mrn', value='00-00-00-99'))
+        db.session.commit()
+
+        allocator = MRNAllocator(db.engine, block_size=10)
+        self.assertEqual(allocator.allocate(), '00-00-01-00')
+        self.assertEqual(allocator.allocate(), '00-00-01-01')
+        db.session.expire_all()
+        last_mrn = SystemParameter.query.filter_by(name='last_mrn').first()
+        self.assertEqual(last_mrn.value, '00-00-01-09')
+
+    def test_generate_mrn_does_not_commit_session(self):
+        patient = Patient(first_name='Jane', last_name='Doe', date_of_birth=date(1990, 1, 1), gender='Female')
+        db.session.add(patient)
+        patient.mrn = generate_mrn()
+        db.session.rollback()
+        self.assertEqual(Patient.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
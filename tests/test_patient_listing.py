@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+import unittest
+from datetime import date
+from flask_testing import TestCase
+from app import create_app, db
+from app.auth.models import Role, User
+from app.patients.listing import generate_export, list_patients_page
+from app.patients.models import Patient
+from helpers import login
+
+
+class TestPatientListing(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        for i, last_name in enumerate(['Wijaya', 'Santoso', 'Halim', 'Lubis', 'Purba']):
+            db.session.add(Patient(first_name=f'Patient{i}', last_name=last_name, date_of_birth=date(1990, 1, i + 1),
+                                   gender='Female', mrn=f'00-00-00-0{i + 1}'))
+        role = Role(name='Receptionist')
+        self.user = User(username='reception', email='reception@example.com', first_name='Front', last_name='Desk')
+        self.user.roles.append(role)
+        db.session.add_all([role, self.user])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def test_pages_follow_last_name_order(self):
+        last_names = []
+        page = list_patients_page(limit=2)
+        while True:
+            self.assertLessEqual(len(page.patients), 2)
+            last_names.extend(patient.last_name for patient in page.patients)
+            if not page.next_cursor:
+                break
+            page = list_patients_page(cursor=page.next_cursor, limit=2)
+        self.assertEqual(last_names, ['Halim', 'Lubis', 'Purba', 'Santoso', 'Wijaya'])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            list_patients_page(cursor='garbage')
+
+    def test_csv_export_streams_in_batches(self):
+        chunks = list(generate_export('csv', batch_size=2))
+        self.assertEqual(len(chunks), 3)
+        rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+        self.assertEqual([row['last_name'] for row in rows], ['Halim', 'Lubis', 'Purba', 'Santoso', 'Wijaya'])
+        self.assertEqual(rows[0]['date_of_birth'], '1990-01-03')
+
+    def test_ndjson_export(self):
+        lines = ''.join(generate_export('ndjson')).splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['mrn'], '00-00-00-03')
+
+    def test_unsupported_export_format(self):
+        with self.assertRaises(ValueError):
+            generate_export('xlsx')
+
+    def test_list_and_export_routes(self):
+        login(self.client, self.user.id)
+        response = self.client.get('/patients/list')
+        self.assert200(response)
+        self.assertIn(b'Halim', response.data)
+
+        response = self.client.get('/patients/export.csv')
+        self.assert200(response)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertIn(b'Wijaya', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
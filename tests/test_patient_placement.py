@@ -0,0 +1,76 @@
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from app.patients.models import Patient
+from app.hospital.models import Bed, Hospital, RoomClass, Ward, WardRoom, WardRoomClassAssignment
+from app.hospital.services import PatientPlacementService, PlacementSnapshot
+from helpers import capture_statements
+
+
+class TestPatientPlacement(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        hospital = Hospital(name='General Hospital', code='GH')
+        self.general = RoomClass(name='Class 1', code='C1', care_level='General')
+        self.icu = RoomClass(name='ICU', code='ICU', care_level='ICU', specialty='Critical Care')
+        db.session.add_all([hospital, self.general, self.icu])
+        db.session.flush()
+        self.general_ward = self.add_ward(hospital, 'GW', self.general, beds=4, occupied=1)
+        self.icu_ward = self.add_ward(hospital, 'ICUW', self.icu, beds=2, occupied=0)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def add_ward(self, hospital, code, room_class, beds, occupied):
+        ward = Ward(hospital_id=hospital.id, name=code, code=code, preferred_room_class_id=room_class.id)
+        db.session.add(ward)
+        db.session.flush()
+        db.session.add(WardRoomClassAssignment(ward_id=ward.id, room_class_id=room_class.id, priority=1,
+                                               min_capacity=1, max_capacity=10))
+        room = WardRoom(ward_id=ward.id, room_class_id=room_class.id, name=f'{code} room', code=f'{code}-R')
+        db.session.add(room)
+        db.session.flush()
+        for index in range(beds):
+            db.session.add(Bed(ward_room_id=room.id, name=f'Bed {index}', code=f'{code}-B{index}',
+                               is_occupied=index < occupied))
+        return ward
+
+    def count_queries(self, func):
+        with capture_statements() as statements:
+            result = func()
+        return result, len(statements)
+
+    def test_snapshot_counts_available_beds(self):
+        snapshot = PlacementSnapshot.load()
+        self.assertEqual(snapshot.available_in_ward(self.general_ward.id), 3)
+        self.assertEqual(snapshot.available_in_ward(self.icu_ward.id, self.icu.id), 2)
+        self.assertEqual(snapshot.available_in_ward(self.icu_ward.id, self.general.id), 0)
+
+    def test_places_by_care_level(self):
+        ward, bed = PatientPlacementService.place_patient(None, required_care_level='ICU')
+        self.assertEqual(ward.id, self.icu_ward.id)
+        self.assertEqual(bed.code, 'ICUW-B0')
+
+        ward, bed = PatientPlacementService.place_patient(None, required_care_level='General')
+        self.assertEqual(ward.id, self.general_ward.id)
+        self.assertFalse(bed.is_occupied)
+
+    def test_query_count_does_not_grow_with_beds(self):
+        _, queries = self.count_queries(lambda: PatientPlacementService.place_patient(None, 'ICU'))
+
+        hospital = Hospital.query.first()
+        for index in range(10):
+            self.add_ward(hospital, f'EXTRA{index}', self.general, beds=20, occupied=5)
+        db.session.commit()
+
+        _, more_queries = self.count_queries(lambda: PatientPlacementService.place_patient(None, 'ICU'))
+        self.assertEqual(queries, more_queries)
+
+
+if __name__ == '__main__':
+    unittest.main()
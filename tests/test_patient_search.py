@@ -0,0 +1,86 @@
+import unittest
+from datetime import date
+from flask_testing import TestCase
+from app import create_app, db
+from app.patients.models import Patient
+from app.patients.search import decode_cursor, find_patients
+
+
+class TestPatientSearch(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        patients = [
+            ('Budi', 'Santoso', '0812-3456-7890', '3171010101900001', '00-00-00-01'),
+            ('Budiman', 'Wijaya', '0813 1111 2222', '3171010101900002', '00-00-00-02'),
+            ('Siti', 'Budiarti', '+62 811 000 333', '3171010101900003', '00-00-00-03'),
+            ('José', 'Álvarez', '0819-9999-0000', 'A1234567', '00-00-00-04'),
+        ]
+        for first_name, last_name, phone, id_card_number, mrn in patients:
+            db.session.add(Patient(first_name=first_name, last_name=last_name, date_of_birth=date(1990, 1, 1),
+                                   gender='Male', phone=phone, id_card_number=id_card_number, mrn=mrn))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def names(self, page):
+        return [f'{patient.first_name} {patient.last_name}' for patient in page.patients]
+
+    def test_search_columns_follow_updates(self):
+        patient = Patient.query.filter_by(mrn='00-00-00-04').first()
+        self.assertEqual(patient.search_name, 'jose alvarez')
+        self.assertEqual(patient.search_name_reversed, 'alvarez jose')
+        self.assertEqual(patient.search_id_card, 'a1234567')
+
+        patient.phone = '(021) 555-0101'
+        db.session.commit()
+        self.assertEqual(patient.search_phone, '0215550101')
+
+    def test_mrn_id_card_and_phone(self):
+        self.assertEqual(self.names(find_patients(q='00-00-00-03')), ['Siti Budiarti'])
+        self.assertEqual(self.names(find_patients(q='00000003')), ['Siti Budiarti'])
+        self.assertEqual(self.names(find_patients(q='3171010101900002')), ['Budiman Wijaya'])
+        self.assertEqual(self.names(find_patients(q='a-1234567')), ['José Álvarez'])
+        self.assertEqual(self.names(find_patients(q='0812 3456')), ['Budi Santoso'])
+
+    def test_name_prefix_ranks_first_name_before_last_name(self):
+        self.assertEqual(self.names(find_patients(q='budi')), ['Budi Santoso', 'Budiman Wijaya', 'Siti Budiarti'])
+        self.assertEqual(self.names(find_patients(q='santoso b')), ['Budi Santoso'])
+        self.assertEqual(self.names(find_patients(q='jose alv')), ['José Álvarez'])
+
+    def test_field_filters(self):
+        self.assertEqual(self.names(find_patients(last_name='budi')), ['Siti Budiarti'])
+        self.assertEqual(self.names(find_patients(first_name='budi', last_name='wij')), ['Budiman Wijaya'])
+        self.assertEqual(self.names(find_patients(q='budi', gender='Female')), [])
+
+    def test_empty_search_returns_nothing(self):
+        page = find_patients()
+        self.assertEqual(page.patients, [])
+        self.assertIsNone(page.next_cursor)
+
+    def test_cursor_pages_through_all_branches(self):
+        seen = []
+        page = find_patients(q='budi', limit=1)
+        while True:
+            seen.extend(self.names(page))
+            if not page.next_cursor:
+                break
+            page = find_patients(q='budi', cursor=page.next_cursor, limit=1)
+        self.assertEqual(seen, ['Budi Santoso', 'Budiman Wijaya', 'Siti Budiarti'])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            decode_cursor('not-a-cursor')
+
+    def test_search_route(self):
+        response = self.client.get('/api/patients/search?q=budi')
+        # Anonymous requests are redirected to the login page
+        self.assertIn(response.status_code, (302, 401))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+from datetime import date, datetime, timedelta
+from flask_testing import TestCase
+from app import create_app, db
+from app.auth.models import Role, User
+from app.patients.models import Patient, Vitals
+from app.clinical_notes.models import ClinicalNote
+from app.lab.models import LabOrder, LabResult
+from app.patients.timeline import get_patient_timeline
+from helpers import capture_statements, login
+
+START = datetime(2026, 1, 1, 8, 0, 0)
+
+
+class TestPatientTimeline(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        role = Role(name='Doctor')
+        self.doctor = User(username='doctor', email='doctor@example.com', first_name='Gregory', last_name='H')
+        self.doctor.roles.append(role)
+        self.patient = Patient(first_name='Long', last_name='Stay', date_of_birth=date(1970, 1, 1), gender='Male')
+        other = Patient(first_name='Other', last_name='Patient', date_of_birth=date(1980, 1, 1), gender='Female')
+        db.session.add_all([role, self.doctor, self.patient, other])
+        db.session.flush()
+        self.other_id = other.id
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def add_vitals(self, patient_id, hours):
+        db.session.add_all(Vitals(patient_id=patient_id, recorded_by=self.doctor.id, date=START + timedelta(hours=hour),
+                                  bp_systolic=120, bp_diastolic=80, heart_rate=70, temperature=36.8, weight=70,
+                                  height=170)
+                           for hour in hours)
+
+    def add_note(self, hour):
+        db.session.add(ClinicalNote(patient_id=self.patient.id, written_by=self.doctor.id,
+                                    date=START + timedelta(hours=hour), note_type='Progress Note', content='Stable'))
+
+    def add_lab_result(self, hour, status='Completed'):
+        order = LabOrder(patient_id=self.patient.id, ordered_by=self.doctor.id, test_type='CBC', status=status,
+                         order_date=START)
+        db.session.add(order)
+        db.session.flush()
+        db.session.add(LabResult(order_id=order.id, performed_by=self.doctor.id, result_data='Normal',
+                                 result_date=START + timedelta(hours=hour)))
+
+    def collect(self, **kwargs):
+        entries = []
+        page = get_patient_timeline(self.patient.id, **kwargs)
+        while True:
+            entries.extend(page.entries)
+            if not page.next_cursor:
+                return entries
+            page = get_patient_timeline(self.patient.id, cursor=page.next_cursor, **kwargs)
+
+    def test_merged_newest_first(self):
+        self.add_vitals(self.patient.id, [1, 4])
+        self.add_vitals(self.other_id, [5])
+        self.add_note(3)
+        self.add_lab_result(2)
+        self.add_lab_result(6, status='Ordered')
+        db.session.commit()
+
+        entries = get_patient_timeline(self.patient.id).entries
+        self.assertEqual([(entry.type, entry.date.hour) for entry in entries],
+                         [('vital_signs', 12), ('clinical_note', 11), ('lab_result', 10), ('vital_signs', 9)])
+        self.assertEqual(entries[2].data['order'].test_type, 'CBC')
+        self.assertEqual(entries[2].data['result'].result_data, 'Normal')
+        self.assertEqual(entries[0].author.id, self.doctor.id)
+
+    def test_pages_cover_every_entry_once(self):
+        # Entries sharing a timestamp across and within types straddle the page boundaries
+        self.add_vitals(self.patient.id, [0, 0, 1, 2, 2, 3])
+        for hour in (0, 1, 2):
+            self.add_note(hour)
+        self.add_lab_result(2)
+        db.session.commit()
+
+        expected = get_patient_timeline(self.patient.id, limit=100).entries
+        self.assertEqual(len(expected), 10)
+        for limit in (1, 2, 3, 4):
+            entries = self.collect(limit=limit)
+            self.assertEqual([(entry.type, entry.data['result'].id if entry.type == 'lab_result' else entry.data.id)
+                              for entry in entries],
+                             [(entry.type, entry.data['result'].id if entry.type == 'lab_result' else entry.data.id)
+                              for entry in expected])
+
+    def test_type_filter(self):
+        self.add_vitals(self.patient.id, [1, 2])
+        self.add_note(3)
+        db.session.commit()
+
+        self.assertEqual([entry.type for entry in self.collect(types=['vital_signs'], limit=1)],
+                         ['vital_signs', 'vital_signs'])
+        with self.assertRaises(ValueError):
+            get_patient_timeline(self.patient.id, types=['billing'])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            get_patient_timeline(self.patient.id, cursor='garbage')
+
+    def test_page_query_count_does_not_grow_with_history(self):
+        login(self.client, self.doctor.id)
+        self.add_note(0)
+        self.add_lab_result(0)
+        self.add_vitals(self.patient.id, range(1, 11))
+        db.session.commit()
+        self.client.get(f'/patients/{self.patient.id}/encounters')
+
+        counts = []
+        for extra in (0, 300):
+            # Older history only adds to the pages after the first one
+            self.add_vitals(self.patient.id, range(-extra, 0))
+            db.session.commit()
+            with capture_statements(expire=True) as statements:
+                response = self.client.get(f'/patients/{self.patient.id}/encounters')
+            self.assert200(response)
+            self.assertEqual(b'Older entries' in response.data, bool(extra))
+            counts.append(len(statements))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_view_redirects_on_invalid_cursor(self):
+        login(self.client, self.doctor.id)
+        response = self.client.get(f'/patients/{self.patient.id}/encounters?cursor=garbage')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.location, f'/patients/{self.patient.id}/encounters')
+
+
+if __name__ == '__main__':
+    unittest.main()
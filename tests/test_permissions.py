@@ -0,0 +1,82 @@
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from app.patients.models import Patient
+from app.auth.models import Role, User, user_roles
+from app.auth.permissions import ROLE_VERSION_PARAMETER
+from app.system_params.models import get_counter_parameter, increment_counter_parameter
+from helpers import capture_statements
+
+
+class TestRoleResolution(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        self.doctor = Role(name='Doctor')
+        self.nurse = Role(name='Nurse')
+        self.user = User(username='doc', email='doc@example.com', first_name='Gregory', last_name='H')
+        self.user.roles.extend([self.doctor, self.nurse])
+        db.session.add_all([self.doctor, self.nurse, self.user])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def count_queries(self, func):
+        with capture_statements() as statements:
+            func()
+        return len(statements)
+
+    def test_has_role(self):
+        with self.app.test_request_context():
+            self.assertEqual(self.user.role_names, frozenset({'Doctor', 'Nurse'}))
+            self.assertTrue(self.user.has_role('Admin', 'Nurse'))
+            self.assertFalse(self.user.has_role('Admin', 'Receptionist'))
+            self.assertFalse(self.user.has_role())
+
+    def test_repeated_checks_are_free(self):
+        with self.app.test_request_context():
+            self.user.has_role('Doctor')
+            queries = self.count_queries(lambda: [self.user.has_role('Admin', 'Doctor') for _ in range(20)])
+            self.assertEqual(queries, 0)
+
+        # A later request only reads the role counter
+        with self.app.test_request_context():
+            self.app.preprocess_request()
+            self.assertEqual(self.count_queries(lambda: self.user.has_role('Doctor')), 1)
+
+    def test_role_removal_is_seen_in_the_same_request(self):
+        with self.app.test_request_context():
+            self.assertTrue(self.user.has_role('Nurse'))
+            self.user.roles.remove(self.nurse)
+            # Unflushed changes are read from the relationship
+            self.assertFalse(self.user.has_role('Nurse'))
+            db.session.commit()
+            self.assertFalse(self.user.has_role('Nurse'))
+        self.assertEqual(get_counter_parameter(ROLE_VERSION_PARAMETER), 1)
+
+    def test_change_by_another_worker_invalidates_cache(self):
+        with self.app.test_request_context():
+            self.assertTrue(self.user.has_role('Nurse'))
+
+        with db.engine.begin() as connection:
+            connection.execute(user_roles.delete().where(user_roles.c.role_id == self.nurse.id))
+            increment_counter_parameter(ROLE_VERSION_PARAMETER, connection)
+        db.session.rollback()
+
+        with self.app.test_request_context():
+            self.app.preprocess_request()
+            self.assertFalse(self.user.has_role('Nurse'))
+            self.assertTrue(self.user.has_role('Doctor'))
+
+    def test_new_user_without_session(self):
+        user = User(username='new', email='new@example.com', first_name='New', last_name='User')
+        user.roles.append(self.doctor)
+        self.assertTrue(user.has_role('Doctor'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+from datetime import date
+from flask_testing import TestCase
+from app import create_app, db
+from app.patients.models import Patient, PatientUser
+from app.auth.models import Role, User, user_roles
+from app.auth.principal import load_principal
+from app.auth.permissions import ROLE_VERSION_PARAMETER
+from app.system_params.models import increment_counter_parameter
+from helpers import capture_statements, login
+
+
+class TestPrincipal(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        self.doctor = Role(name='Doctor')
+        self.nurse = Role(name='Nurse')
+        self.user = User(username='doc', email='doc@example.com', first_name='Gregory', last_name='H')
+        self.user.roles.append(self.doctor)
+        patient = Patient(first_name='Ada', last_name='Lovelace', date_of_birth=date(1980, 1, 1), gender='Female')
+        db.session.add_all([self.doctor, self.nurse, self.user, patient])
+        db.session.flush()
+        self.patient_user = PatientUser(username='ada', email='ada@example.com', patient_id=patient.id)
+        self.patient_user.set_password('secret')
+        db.session.add(self.patient_user)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def load(self, session_id):
+        # Like a new request, start without the user already in the session
+        with capture_statements(expire=True) as statements:
+            principal = load_principal(session_id)
+        return principal, statements
+
+    def test_typed_session_ids(self):
+        self.assertEqual(self.user.get_id(), f'user:{self.user.id}')
+        self.assertEqual(self.patient_user.get_id(), f'patient:{self.patient_user.id}')
+
+    def test_staff_principal_is_cached(self):
+        principal, statements = self.load(self.user.get_id())
+        self.assertEqual(principal.first_name, 'Gregory')
+        self.assertTrue(principal.has_role('Doctor', 'Admin'))
+        self.assertFalse(principal.is_patient)
+        self.assertNotIn('patient_user', ' '.join(statements))
+
+        principal, statements = self.load(self.user.get_id())
+        self.assertEqual(statements, [])
+        self.assertEqual(principal.username, 'doc')
+        self.assertEqual(principal.get_id(), self.user.get_id())
+
+    def test_patient_principal_queries_patient_table_only(self):
+        principal, statements = self.load(self.patient_user.get_id())
+        self.assertTrue(principal.is_patient)
+        self.assertFalse(principal.has_role('Doctor'))
+        self.assertEqual(len(statements), 1)
+        self.assertIn('patient_user', statements[0])
+        self.assertEqual(principal.patient.first_name, 'Ada')
+
+    def test_legacy_session_id(self):
+        principal, _ = self.load(self.patient_user.id)
+        self.assertTrue(principal.is_patient)
+        self.assertIsNone(load_principal('user:missing'))
+
+    def test_role_edit_invalidates_cache(self):
+        self.load(self.user.get_id())
+        self.user.roles.append(self.nurse)
+        db.session.commit()
+        principal, statements = self.load(self.user.get_id())
+        self.assertTrue(principal.has_role('Nurse'))
+        self.assertTrue(statements)
+
+    def test_role_revoked_by_another_worker(self):
+        with self.app.test_request_context():
+            self.app.preprocess_request()
+            principal, _ = self.load(self.user.get_id())
+            self.assertTrue(principal.has_role('Doctor'))
+
+        with db.engine.begin() as connection:
+            connection.execute(user_roles.delete().where(user_roles.c.user_id == self.user.id))
+            increment_counter_parameter(ROLE_VERSION_PARAMETER, connection)
+        db.session.rollback()
+
+        # The names are still cached, the roles are not
+        with self.app.test_request_context():
+            self.app.preprocess_request()
+            principal, statements = self.load(self.user.get_id())
+            self.assertEqual(statements, [])
+            self.assertFalse(principal.has_role('Doctor'))
+
+    def test_writes_go_to_the_user_row(self):
+        principal, _ = self.load(self.user.get_id())
+        principal.first_name = 'Greg'
+        self.assertEqual(principal.first_name, 'Greg')
+        db.session.commit()
+        self.assertEqual(User.query.get(self.user.id).first_name, 'Greg')
+        principal, _ = self.load(self.user.get_id())
+        self.assertEqual(principal.first_name, 'Greg')
+
+    def test_patient_dashboard(self):
+        login(self.client, self.patient_user.get_id())
+        response = self.client.get('/patients/dashboard')
+        self.assert200(response)
+        self.assertIn(b'Ada', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
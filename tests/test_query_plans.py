@@ -0,0 +1,160 @@
+import unittest
+from datetime import date, datetime, timedelta
+from flask_testing import TestCase
+from app import create_app, db
+from app.auth.models import Role, User
+from app.patients.models import Patient, Vitals
+from app.appointments.models import Appointment
+from app.appointments.queries import appointment_rows
+from app.clinical_notes.models import ClinicalNote
+from app.hospital.models import Admission, Bed, Hospital, RoomClass, Ward, WardRoom
+from app.hospital.queries import ward_census
+from app.hospital.services import PatientPlacementService
+from app.lab.models import LabOrder
+from app.lab.worklist import WorklistFilters, worklist_page
+from app.patients.routes import is_patient_admitted
+from app.patients.timeline import get_patient_timeline
+from helpers import capture_statements
+
+START = datetime(2026, 3, 2, 8, 0, 0)
+
+
+class TestQueryPlans(TestCase):
+    """Check that the hot queries read their main table through an index rather than a full scan."""
+
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        role = Role(name='Doctor')
+        self.doctors = [User(username=f'doctor{index}', email=f'doctor{index}@example.com', first_name='Doc',
+                             last_name=str(index)) for index in range(5)]
+        for doctor in self.doctors:
+            doctor.roles.append(role)
+        self.patients = [Patient(first_name=f'Patient{index}', last_name='Test', date_of_birth=date(1980, 1, 1),
+                                 gender='Female') for index in range(100)]
+        hospital = Hospital(name='General Hospital', code='GH')
+        room_class = RoomClass(name='Class 1', code='C1')
+        db.session.add_all([role, hospital, room_class] + self.doctors + self.patients)
+        db.session.flush()
+
+        self.ward = Ward(hospital_id=hospital.id, name='Ward 1', code='W1')
+        db.session.add(self.ward)
+        db.session.flush()
+        room = WardRoom(ward_id=self.ward.id, room_class_id=room_class.id, name='Room 1', code='R1')
+        db.session.add(room)
+        db.session.flush()
+        # Most beds are occupied, as in a busy hospital
+        self.beds = [Bed(ward_room_id=room.id, name=f'Bed {index}', code=f'B{index}', is_occupied=index % 5 != 0)
+                     for index in range(100)]
+        db.session.add_all(self.beds)
+        db.session.flush()
+
+        for index, patient in enumerate(self.patients):
+            doctor = self.doctors[index % len(self.doctors)]
+            db.session.add(Admission(patient_id=patient.id, bed_id=self.beds[index].id, admitted_by=doctor.id,
+                                     status='Admitted' if self.beds[index].is_occupied else 'Discharged'))
+            for day in range(20):
+                db.session.add(Appointment(patient_id=patient.id, doctor_id=doctor.id,
+                                           scheduled_time=START + timedelta(days=day - 10, minutes=index),
+                                           status='Scheduled' if day >= 10 else 'Completed'))
+                db.session.add(Vitals(patient_id=patient.id, recorded_by=doctor.id,
+                                      date=START + timedelta(hours=day), bp_systolic=120, bp_diastolic=80,
+                                      heart_rate=70, temperature=36.8, weight=70, height=170))
+            for day in range(3):
+                db.session.add(ClinicalNote(patient_id=patient.id, written_by=doctor.id,
+                                            date=START + timedelta(days=day), note_type='Progress Note',
+                                            content='Stable'))
+                db.session.add(LabOrder(patient_id=patient.id, ordered_by=doctor.id, test_type='CBC',
+                                        order_date=START + timedelta(days=day - 3),
+                                        status='Ordered' if day == 2 else 'Completed'))
+        db.session.commit()
+        # Let the planner see the data distribution
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def capture(self, function):
+        """Run ``function`` and return the (statement, parameters) of each SELECT it issued."""
+        with capture_statements(parameters=True) as statements:
+            function()
+        statements = [(statement, parameters) for statement, parameters in statements
+                      if statement.lstrip().upper().startswith('SELECT')]
+        self.assertTrue(statements)
+        return statements
+
+    def query_plan(self, statement, parameters):
+        """Get the query plan of a statement as text, one line per step."""
+        connection = db.session.connection()
+        if connection.dialect.name == 'postgresql':
+            # On a test-sized table a sequential scan is always cheapest; ask whether an index can be used
+            connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).all()
+            return '\n'.join(row[0] for row in rows)
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+        return '\n'.join(row[-1] for row in rows)
+
+    def assertUsesIndex(self, function, table):
+        plans = [self.query_plan(statement, parameters) for statement, parameters in self.capture(function)
+                 if f'FROM {table}' in statement or f'JOIN {table}' in statement]
+        self.assertTrue(plans, f'no query read {table}')
+        for plan in plans:
+            if db.session.connection().dialect.name == 'postgresql':
+                self.assertNotIn(f'Seq Scan on {table}', plan)
+            else:
+                steps = [line.strip() for line in plan.splitlines()]
+                self.assertFalse([step for step in steps if step == f'SCAN {table}'], plan)
+                # SQLite builds a throwaway index per statement when no real one fits
+                self.assertNotIn('AUTOMATIC', plan)
+                index_steps = [step for step in steps if step.startswith((f'SEARCH {table} ', f'SCAN {table} USING'))]
+                self.assertTrue(index_steps, plan)
+
+    def test_doctor_day_appointments(self):
+        doctor_id = self.doctors[0].id
+        self.assertUsesIndex(lambda: appointment_rows(START, START + timedelta(days=1), doctor_id=doctor_id),
+                             'appointment')
+
+    def test_appointments_by_status(self):
+        self.assertUsesIndex(lambda: appointment_rows(START, START + timedelta(days=7), status='Scheduled'),
+                             'appointment')
+
+    def test_current_admission_of_bed(self):
+        bed_id = self.beds[1].id
+        self.assertUsesIndex(lambda: Admission.query.filter_by(bed_id=bed_id, status='Admitted').first(),
+                             'admission')
+
+    def test_current_admission_of_patient(self):
+        patient_id = self.patients[1].id
+        self.assertUsesIndex(lambda: is_patient_admitted(patient_id), 'admission')
+
+    def test_ward_census(self):
+        self.assertUsesIndex(ward_census, 'admission')
+
+    def test_lab_orders_by_status(self):
+        self.assertUsesIndex(lambda: LabOrder.query.filter(LabOrder.status == 'Ordered',
+                                                           LabOrder.order_date >= START - timedelta(days=7))
+                             .order_by(LabOrder.order_date.desc()).all(), 'lab_order')
+
+    def test_lab_worklist(self):
+        self.assertUsesIndex(lambda: worklist_page(WorklistFilters()), 'lab_order')
+        self.assertUsesIndex(lambda: worklist_page(WorklistFilters(status='Ordered')), 'lab_order')
+
+    def test_patient_timeline(self):
+        patient_id = self.patients[1].id
+        self.assertUsesIndex(lambda: get_patient_timeline(patient_id), 'vitals')
+        self.assertUsesIndex(lambda: get_patient_timeline(patient_id), 'clinical_note')
+
+    def test_occupied_bed_count(self):
+        self.assertUsesIndex(lambda: Bed.query.filter_by(is_occupied=True, is_active=True).count(), 'bed')
+
+    def test_available_beds(self):
+        ward = self.ward
+        self.assertUsesIndex(lambda: PatientPlacementService.get_optimal_bed(self.patients[0], ward), 'bed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+from datetime import date, timedelta
+from flask_testing import TestCase
+from app import create_app, db
+from app.auth.models import Role, User
+from app.patients.models import Patient
+from app.appointments.models import Appointment
+from app.appointments.windows import hospital_now
+from app.receptionist.board import board_feed, load_board
+from helpers import capture_statements, login
+
+
+class TestReceptionistBoard(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        receptionist_role = Role(name='Receptionist')
+        doctor_role = Role(name='Doctor')
+        self.receptionist = User(username='desk', email='desk@example.com', first_name='Pam', last_name='Desk')
+        self.receptionist.roles.append(receptionist_role)
+        self.doctor = User(username='house', email='house@example.com', first_name='Gregory', last_name='House')
+        self.doctor.roles.append(doctor_role)
+        db.session.add_all([receptionist_role, doctor_role, self.receptionist, self.doctor])
+        db.session.flush()
+        self.morning = hospital_now().replace(hour=9, minute=0, second=0, microsecond=0)
+        self.appointments = self.add_appointments(3)
+        db.session.commit()
+        self.receptionist_id = self.receptionist.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def add_appointments(self, count):
+        appointments = []
+        for index in range(count):
+            patient = Patient(first_name=f'Patient{index}', last_name='Test', date_of_birth=date(1990, 1, 1),
+                              gender='Female')
+            db.session.add(patient)
+            db.session.flush()
+            # One today and one in the next days for every patient
+            appointments += [
+                Appointment(patient_id=patient.id, doctor_id=self.doctor.id,
+                            scheduled_time=self.morning + timedelta(minutes=index)),
+                Appointment(patient_id=patient.id, doctor_id=self.doctor.id,
+                            scheduled_time=self.morning + timedelta(days=2, minutes=index)),
+            ]
+        db.session.add_all(appointments)
+        return appointments
+
+    def board_statements(self):
+        with capture_statements(expire=True) as statements:
+            board = load_board()
+        return board, statements
+
+    def test_page(self):
+        login(self.client, self.receptionist_id)
+        response = self.client.get('/receptionist')
+        self.assert200(response)
+        self.assertIn(b'Patient2 Test', response.data)
+        self.assertIn(b'Dr. Gregory House', response.data)
+        self.assertIn(b'data-feed-url="/api/receptionist/board"', response.data)
+
+    def test_one_query_per_panel(self):
+        board, statements = self.board_statements()
+        self.assertEqual((len(board.today_appointments), len(board.upcoming_appointments), len(board.recent_patients)),
+                         (3, 3, 3))
+        self.assertEqual(len(statements), 4)
+
+        self.add_appointments(10)
+        db.session.commit()
+        board, statements = self.board_statements()
+        self.assertEqual((len(board.today_appointments), len(board.recent_patients)), (13, 5))
+        self.assertEqual(len(statements), 4)
+
+    def test_feed_sends_only_changes(self):
+        feed = board_feed()
+        self.assertFalse(feed['delta'])
+        self.assertEqual([appointment['panel'] for appointment in feed['appointments']], ['today'] * 3 + ['upcoming'] * 3)
+        version = feed['version']
+
+        checked_in, cancelled, moved, deleted = self.appointments[0], self.appointments[1], self.appointments[2], \
+            self.appointments[3]
+        checked_in.status = 'Checked In'
+        cancelled.status = 'Cancelled'
+        moved.scheduled_time = self.morning + timedelta(days=30)
+        db.session.delete(deleted)
+        booked = Appointment(patient_id=checked_in.patient_id, doctor_id=self.doctor.id,
+                             scheduled_time=self.morning + timedelta(hours=3))
+        db.session.add(booked)
+        db.session.commit()
+
+        feed = board_feed(since=version)
+        self.assertTrue(feed['delta'])
+        self.assertGreater(feed['version'], version)
+        statuses = {appointment['id']: (appointment['panel'], appointment['status']) for appointment in feed['appointments']}
+        self.assertEqual(statuses, {checked_in.id: ('today', 'Checked In'), cancelled.id: ('upcoming', 'Cancelled'),
+                                    booked.id: ('today', 'Scheduled')})
+        self.assertEqual(sorted(feed['removed']), sorted([moved.id, deleted.id]))
+
+        feed = board_feed(since=feed['version'])
+        self.assertEqual((feed['appointments'], feed['removed']), ([], []))
+
+    def test_unchanged_poll(self):
+        login(self.client, self.receptionist_id)
+        response = self.client.get('/api/receptionist/board')
+        feed = response.json
+        self.assertEqual(len(feed['appointments']), 6)
+
+        with capture_statements() as statements:
+            self.assertEqual(board_feed(since=feed['version'])['appointments'], [])
+        # Only the change counter is read
+        self.assertEqual(len(statements), 1)
+
+        url = f"/api/receptionist/board?since={feed['version']}"
+        etag = self.client.get(url).headers['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+if __name__ == '__main__':
+    unittest.main()
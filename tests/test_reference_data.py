@@ -0,0 +1,85 @@
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from app.patients.models import Nationality
+from app.auth.models import Role, User
+from app.system_params.models import Ethnicity, IDType, PayorDetail, PayorType
+from app.system_params.reference import get_reference_table
+from helpers import capture_statements, login
+
+
+class TestReferenceData(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        db.session.add_all([Ethnicity(name=name) for name in ('Javanese', 'Sundanese', 'Batak', 'Javanese Arab')])
+        db.session.add_all([IDType(name='KTP', is_active=True), IDType(name='Passport', is_active=True),
+                            IDType(name='Old Card', is_active=False)])
+        payor_type = PayorType(name='Insurance', is_active=True)
+        db.session.add_all([payor_type, Nationality(id='ID', name='Indonesian')])
+        db.session.flush()
+        db.session.add(PayorDetail(name='BPJS', payor_type_id=payor_type.id, is_active=True))
+        role = Role(name='Admin')
+        self.admin = User(username='admin', email='admin@example.com', first_name='Ad', last_name='Min')
+        self.admin.roles.append(role)
+        db.session.add_all([role, self.admin])
+        db.session.commit()
+        self.payor_type_id = payor_type.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def count_queries(self, func):
+        with capture_statements() as statements:
+            result = func()
+        return result, len(statements)
+
+    def test_search_prefix_before_substring(self):
+        ethnicities = get_reference_table('ethnicities')
+        self.assertEqual([row.name for row in ethnicities.search('jav')], ['Javanese', 'Javanese Arab'])
+        self.assertEqual([row.name for row in ethnicities.search('anese')], ['Javanese', 'Javanese Arab', 'Sundanese'])
+        self.assertEqual([row.name for row in ethnicities.search('ara')], ['Javanese Arab'])
+        self.assertEqual(len(ethnicities.search('')), 4)
+
+    def test_active_and_parent_filters(self):
+        response = self.client.get('/api/id-types')
+        self.assertEqual([item['name'] for item in response.json], ['KTP', 'Passport'])
+        response = self.client.get(f'/api/payor-details/{self.payor_type_id}')
+        self.assertEqual(response.json, [{'id': 1, 'name': 'BPJS'}])
+
+    def test_cached_lookup_reads_only_the_counter(self):
+        self.client.get('/api/ethnicities?search=jav')
+        response, queries = self.count_queries(lambda: self.client.get('/api/ethnicities?search=sun'))
+        self.assertEqual(response.json, {'results': [{'id': 'Sundanese', 'text': 'Sundanese'}]})
+        self.assertEqual(queries, 1)
+
+    def test_etag_revalidation(self):
+        response = self.client.get('/api/nationalities')
+        self.assertEqual(response.json, [{'id': 'ID', 'name': 'Indonesian'}])
+        self.assertIn('max-age', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+
+        response = self.client.get('/api/nationalities', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        db.session.add(Nationality(id='MY', name='Malaysian'))
+        db.session.commit()
+        response = self.client.get('/api/nationalities', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 2)
+
+    def test_crud_route_invalidates_cache(self):
+        login(self.client, self.admin.id)
+        self.assertEqual(len(self.client.get('/api/ethnicities').json['results']), 4)
+
+        ethnicity = Ethnicity.query.filter_by(name='Batak').first()
+        self.client.post(f'/admin/system-params/ethnicities/{ethnicity.id}/delete')
+        results = self.client.get('/api/ethnicities').json['results']
+        self.assertNotIn('Batak', [result['text'] for result in results])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import gzip
+import json
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from app.patients.models import Nationality
+from app.system_params.models import IDType, PayorDetail, PayorType
+from helpers import capture_statements
+
+
+class TestRegistrationBootstrap(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        insurance = PayorType(name='Insurance', is_active=True)
+        company = PayorType(name='Company', is_active=True)
+        db.session.add_all([insurance, company, IDType(name='KTP', is_active=True),
+                            Nationality(id='ID', name='Indonesian')])
+        db.session.flush()
+        db.session.add_all([PayorDetail(name='BPJS', payor_type_id=insurance.id, is_active=True),
+                            PayorDetail(name='Retired Plan', payor_type_id=insurance.id, is_active=False)])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def get_bootstrap(self, **kwargs):
+        with capture_statements() as statements:
+            response = self.client.get('/api/registration-bootstrap', **kwargs)
+        return response, len(statements)
+
+    def test_payload(self):
+        response, _ = self.get_bootstrap()
+        self.assert200(response)
+        data = response.json
+        self.assertEqual(data['id_types'], [{'id': 1, 'name': 'KTP'}])
+        self.assertEqual([payor_type['name'] for payor_type in data['payor_types']], ['Company', 'Insurance'])
+        self.assertEqual(data['payor_details'], {'Company': [], 'Insurance': [{'id': 1, 'name': 'BPJS'}]})
+        self.assertEqual(data['nationalities'], [{'id': 'ID', 'name': 'Indonesian'}])
+        self.assertEqual(data['ethnicities'], [])
+
+    def test_gzip(self):
+        response, _ = self.get_bootstrap(headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.data))['id_types'][0]['name'], 'KTP')
+
+    def test_warm_request_costs_one_query(self):
+        self.get_bootstrap()
+        response, queries = self.get_bootstrap()
+        self.assert200(response)
+        self.assertEqual(queries, 1)
+
+        response, _ = self.get_bootstrap(headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_versioned_url(self):
+        version = self.get_bootstrap()[0].json['version']
+        response, _ = self.get_bootstrap(query_string={'v': version})
+        self.assertIn('immutable', response.headers['Cache-Control'])
+
+        db.session.add(IDType(name='Passport', is_active=True))
+        db.session.commit()
+        response, _ = self.get_bootstrap()
+        self.assertNotEqual(response.json['version'], version)
+        self.assertEqual(len(response.json['id_types']), 2)
+        response, _ = self.get_bootstrap(query_string={'v': version})
+        self.assertNotIn('immutable', response.headers['Cache-Control'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,364 @@
+"""
+Query budgets for every page and API endpoint.
+
+The walker seeds a fixture hospital (patients with appointments, admissions,
+lab orders and clinical records, plus the staff and reference data the pages
+list) at SCALE, requests every GET endpoint of every blueprint, then grows
+the hospital to GROWTH times SCALE and requests them all again. A route whose
+statement count grows with the data has an N+1 loop (or an unbounded
+per-row lookup) and fails the test.
+
+Each route is requested twice per walk and the second request is measured,
+so caches kept current by change counters (roles, reference data, the bed
+index) are warm and the counts are the steady state. Caches that only expire
+after a time (principals, doctor dashboards) are turned off, so the request
+pays what it pays whenever an entry has expired.
+
+New routes are walked automatically. A route that cannot be walked (it needs
+a POST, an id the URL converter cannot hold, it ends the session, or its URL
+is served by an earlier rule of another endpoint) goes in SKIPPED with the
+reason. A route with a known N+1 goes in KNOWN_GROWTH, and
+a route that fails for unrelated reasons in KNOWN_ERRORS, until it is fixed;
+the test fails once the route is fixed, so the entry is removed with the fix.
+"""
+import unittest
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from urllib.parse import urlsplit
+from flask import g, url_for
+from flask_testing import TestCase
+from app import create_app, db
+from app.auth.models import Role, User
+from app.auth.principal import PATIENT_PRINCIPAL, STAFF_PRINCIPAL, session_id
+from app.patients.models import Allergy, Medication, Nationality, Patient, PatientUser, Vitals
+from app.appointments.models import Appointment
+from app.appointments.windows import hospital_now
+from app.clinical_notes.models import ClinicalNote
+from app.hospital.models import Admission, Bed, Clinic, DoctorProfile, DoctorSchedule, Hospital, RoomClass, Ward, \
+    WardRoom, WardRoomClassAssignment
+from app.lab.models import LabOrder, LabResult
+from app.system_params.models import Ethnicity, IDType, Language, PayorDetail, PayorType, Race
+from helpers import capture_statements, login
+
+# Fixture hospital size of the first walk, and how many times bigger it is for the second
+SCALE = 3
+GROWTH = 10
+
+STAFF_ROLES = ('Admin', 'Doctor', 'Nurse', 'Receptionist', 'Lab Technician')
+
+# Settings turning off the caches that expire after a time
+UNCACHED = {'PRINCIPAL_CACHE_TTL': 0, 'DOCTOR_DASHBOARD_CACHE_TTL': 0}
+
+# Endpoints for patient-portal users; every other endpoint is walked as a staff user holding every role
+PATIENT_ENDPOINTS = {'patients.patient_dashboard', 'patients.view_lab_results'}
+
+SKIPPED = {
+    'static': 'serves files',
+    'auth.logout': 'ends the session of the walk',
+    'patient_auth.patient_logout': 'ends the session of the walk',
+    'api.get_appointment': 'integer URL converter, string primary keys',
+    'api.get_patient': 'integer URL converter, string primary keys',
+    'nurse.dashboard': 'shadowed by patients.index',
+    'patient_auth.home': 'shadowed by auth.home',
+    'system_params.get_id_types': 'shadowed by api.get_id_types',
+    'system_params.get_nationalities': 'shadowed by api.get_nationalities',
+    'system_params.get_payor_details_by_type': 'shadowed by api.get_payor_details',
+    'system_params.get_payor_types': 'shadowed by api.get_payor_types',
+}
+
+# Endpoints whose statement count still grows with the data, and why
+KNOWN_GROWTH = {
+    'clinical_notes.view_clinical_notes': 'lazy-loads the author of each note',
+    'hospital.discharge_patient': 'lazy-loads the patient and bed of each admission',
+    'hospital.list_doctors': 'lazy-loads the user and hospital of each doctor',
+    'hospital.list_ward_room_class_assignments': 'lazy-loads the ward and room class of each assignment',
+    'hospital.transfer_patient': 'lazy-loads the patient and bed of each admission',
+    'lab.view_lab_orders': 'lab/view.html lazy-loads the orderer of each order',
+    'lab.view_patient_lab_results': 'lab/view.html lazy-loads the orderer of each order',
+    'patients.patient_dashboard': 'looks up the doctor of each listed appointment, up to five per panel',
+    'system_params.manage_payor_details': 'lazy-loads the payor type of each payor detail',
+}
+
+# Endpoints that fail for reasons unrelated to their queries; their counts are not compared
+KNOWN_ERRORS = {
+    'patients.edit_patient': "template links to the missing 'patients.update_patient' endpoint",
+    'patients.view_allergies': "template reads the missing Allergy.recorder relationship",
+    'patients.view_medications': "template reads the missing Medication.prescriber relationship",
+    'system_params.create_ethnicity': 'template renders the missing is_active form field',
+    'system_params.create_id_type': 'template renders the missing is_active form field',
+    'system_params.create_language': 'template renders the missing is_active form field',
+    'system_params.create_payor_detail': 'template renders the missing is_active form field',
+    'system_params.create_payor_type': 'template renders the missing is_active form field',
+    'system_params.edit_ethnicity': 'template renders the missing is_active form field',
+    'system_params.edit_id_type': 'template renders the missing is_active form field',
+    'system_params.edit_language': 'template renders the missing is_active form field',
+    'system_params.edit_payor_detail': 'template renders the missing is_active form field',
+    'system_params.edit_payor_type': 'template renders the missing is_active form field',
+}
+
+START = datetime.combine(date(2026, 3, 2), time(8, 0))
+
+# Outcome of one measured request; ``error`` describes an exception raised by the view
+Measurement = namedtuple('Measurement', ['status', 'statements', 'error'])
+
+
+def seed_hospital(scale, offset=0):
+    """
+    Add a fixture hospital to the database, sized by ``scale``.
+
+    Every kind of row grows linearly with ``scale``: doctors, wards and beds,
+    clinics, reference data, and patients with their appointments (half of
+    them today), admissions, lab orders and results, vitals, clinical notes,
+    allergies and medications. The history of the walked patient, the one
+    patient-scoped pages are requested for, grows too, with rows by every new
+    doctor. Seeding again with a larger ``offset`` adds rows without clashing
+    with unique codes.
+
+    Args:
+        scale (int): Size of the hospital
+        offset (int): Number of rows per kind seeded before
+
+    Returns:
+        dict: Ids of one row of each kind, by URL argument name, for building URLs
+    """
+    roles = {role.name: role for role in Role.query.filter(Role.name.in_(STAFF_ROLES))}
+    for name in STAFF_ROLES:
+        if name not in roles:
+            roles[name] = Role(name=name)
+            db.session.add(roles[name])
+    walker = User.query.filter_by(username='walker').first()
+    if walker is None:
+        walker = User(username='walker', email='walker@example.com', first_name='Walter', last_name='Walker')
+        walker.roles.extend(roles.values())
+        db.session.add(walker)
+    portal_user = PatientUser.query.filter_by(username='portal').first()
+    walked_patient_id = portal_user.patient_id if portal_user else None
+    hospital = Hospital.query.first()
+    if hospital is None:
+        hospital = Hospital(name='General Hospital', code='GH')
+        db.session.add(hospital)
+    db.session.flush()
+
+    today = hospital_now().replace(hour=8, minute=0, second=0, microsecond=0)
+    ids = {}
+    for index in range(offset, offset + scale):
+        doctor = User(username=f'doctor{index}', email=f'doctor{index}@example.com', first_name='Doc',
+                      last_name=f'Tor{index}')
+        doctor.roles.append(roles['Doctor'])
+        clinic = Clinic(hospital_id=hospital.id, name=f'Clinic {index}', code=f'C{index}')
+        room_class = RoomClass(name=f'Class {index}', code=f'RC{index}')
+        ward = Ward(hospital_id=hospital.id, name=f'Ward {index}', code=f'W{index}')
+        payor_type = PayorType(name=f'Payor type {index}', is_active=True)
+        db.session.add_all([doctor, clinic, room_class, ward, payor_type,
+                            IDType(name=f'ID type {index}', is_active=True), Ethnicity(name=f'Ethnicity {index}'),
+                            Language(name=f'Language {index}'), Race(name=f'Race {index}'),
+                            Nationality(id=f'nationality-{index}', name=f'Nationality {index}')])
+        db.session.flush()
+        profile = DoctorProfile(user_id=doctor.id, hospital_id=hospital.id, license_number=f'L{index}')
+        room = WardRoom(ward_id=ward.id, room_class_id=room_class.id, name=f'Room {index}', code=f'R{index}')
+        assignment = WardRoomClassAssignment(ward_id=ward.id, room_class_id=room_class.id)
+        payor_detail = PayorDetail(name=f'Payor {index}', payor_type_id=payor_type.id, is_active=True)
+        db.session.add_all([profile, room, assignment, payor_detail])
+        db.session.flush()
+        schedule = DoctorSchedule(doctor_id=profile.id, clinic_id=clinic.id, day_of_week=index % 7,
+                                  start_time=time(8), end_time=time(12))
+        beds = [Bed(ward_room_id=room.id, name=f'Bed {index}-{number}', code=f'B{index}-{number}')
+                for number in range(4)]
+        db.session.add_all([schedule] + beds)
+        db.session.flush()
+
+        for number, bed in enumerate(beds):
+            patient = Patient(first_name=f'Patient{index}', last_name=f'Number{number}',
+                              date_of_birth=date(1980, 1, 1) + timedelta(days=index), gender='Female',
+                              phone=f'0812{index:04d}{number:02d}')
+            db.session.add(patient)
+            db.session.flush()
+            for attending in (walker, doctor):
+                db.session.add_all([
+                    Appointment(patient_id=patient.id, doctor_id=attending.id,
+                                scheduled_time=today + timedelta(minutes=index * 4 + number), status='Scheduled'),
+                    Appointment(patient_id=patient.id, doctor_id=attending.id,
+                                scheduled_time=START + timedelta(days=number - 7), status='Completed'),
+                ])
+            if number % 2 == 0:
+                bed.is_occupied = True
+                db.session.add(Admission(patient_id=patient.id, bed_id=bed.id, admitted_by=walker.id))
+            completed = LabOrder(patient_id=patient.id, ordered_by=doctor.id, test_type='Complete Blood Count',
+                                 order_date=START - timedelta(days=1), status='Completed')
+            pending = LabOrder(patient_id=patient.id, ordered_by=walker.id, test_type='Urinalysis',
+                               order_date=START)
+            note = ClinicalNote(patient_id=patient.id, written_by=walker.id, date=START, note_type='Progress Note',
+                                content='Stable')
+            allergy = Allergy(patient_id=patient.id, allergen='Penicillin', reaction='Rash', severity='Mild',
+                              recorded_by=walker.id)
+            medication = Medication(patient_id=patient.id, prescribed_by=walker.id, drug_name='Paracetamol',
+                                    dosage='500 mg', frequency='TID', start_date=START.date(), status='Active')
+            db.session.add_all([completed, pending, note, allergy, medication,
+                                Vitals(patient_id=patient.id, recorded_by=walker.id, date=START, bp_systolic=120,
+                                       bp_diastolic=80, heart_rate=70, temperature=36.8, weight=70, height=170)])
+            db.session.flush()
+            db.session.add(LabResult(order_id=completed.id, performed_by=walker.id, result_data='Normal',
+                                     result_date=START))
+            if not offset and not ids:
+                portal_user = PatientUser(username='portal', email='portal@example.com', patient_id=patient.id)
+                portal_user.set_password('portal')
+                db.session.add(portal_user)
+                db.session.flush()
+                walked_patient_id = patient.id
+                ids = {
+                    'walker': walker.id, 'portal_user': portal_user.id, 'patient_id': patient.id,
+                    'order_id': pending.id, 'note_id': note.id, 'allergy_id': allergy.id,
+                    'medication_id': medication.id, 'doctor_id': profile.id, 'bed_id': bed.id,
+                    'payor_type_id': payor_type.id, 'user_id': doctor.id,
+                    'appointment': Appointment.query.filter_by(patient_id=patient.id).first().id,
+                    'role_id': roles['Doctor'].id, 'clinic': clinic.id, 'schedule': schedule.id,
+                    'room_class': room_class.id, 'ward': ward.id, 'assignment': assignment.id,
+                    'payor_detail': payor_detail.id,
+                    'id_type': IDType.query.filter_by(name=f'ID type {index}').one().id,
+                    'ethnicity': Ethnicity.query.filter_by(name=f'Ethnicity {index}').one().id,
+                    'language': Language.query.filter_by(name=f'Language {index}').one().id,
+                }
+
+        # One more visit of the walked patient, seen by this doctor
+        order = LabOrder(patient_id=walked_patient_id, ordered_by=doctor.id, test_type='Lipid Panel',
+                         order_date=START - timedelta(days=index + 1), status='Completed')
+        db.session.add_all([
+            order,
+            Appointment(patient_id=walked_patient_id, doctor_id=doctor.id,
+                        scheduled_time=START - timedelta(days=index + 1), status='Completed'),
+            ClinicalNote(patient_id=walked_patient_id, written_by=doctor.id, date=START - timedelta(days=index + 1),
+                         note_type='Consultation Note', content='Seen'),
+            Allergy(patient_id=walked_patient_id, allergen=f'Allergen {index}', reaction='Hives', severity='Mild',
+                    recorded_by=doctor.id),
+            Medication(patient_id=walked_patient_id, prescribed_by=doctor.id, drug_name=f'Drug {index}',
+                       dosage='10 mg', frequency='QD', start_date=START.date(), status='Active'),
+            Vitals(patient_id=walked_patient_id, recorded_by=doctor.id, date=START - timedelta(days=index + 1),
+                   bp_systolic=118, bp_diastolic=78, heart_rate=72, temperature=36.7, weight=70, height=170),
+        ])
+        db.session.flush()
+        db.session.add(LabResult(order_id=order.id, performed_by=doctor.id, result_data='Normal',
+                                 result_date=START - timedelta(days=index + 1)))
+    db.session.commit()
+    return ids
+
+
+# Which fixture row an ``id`` URL argument stands for, by endpoint
+ID_ARGUMENTS = {
+    'admin.view_user': 'user_id', 'admin.edit_user': 'user_id', 'admin.edit_role': 'role_id',
+    'appointments.view_appointment': 'appointment', 'appointments.edit_appointment': 'appointment',
+    'patients.view_patient': 'patient_id', 'patients.edit_patient': 'patient_id',
+    'patients.delete_patient': 'patient_id',
+    'hospital.edit_clinic': 'clinic', 'hospital.edit_doctor': 'doctor_id',
+    'hospital.edit_doctor_schedule': 'schedule', 'hospital.edit_room_class': 'room_class',
+    'hospital.edit_ward': 'ward', 'hospital.edit_ward_room_class_assignment': 'assignment',
+    'system_params.edit_payor_type': 'payor_type_id', 'system_params.edit_payor_detail': 'payor_detail',
+    'system_params.edit_id_type': 'id_type', 'system_params.edit_ethnicity': 'ethnicity',
+    'system_params.edit_language': 'language',
+}
+
+# Values of the other URL arguments that are not fixture ids
+FIXED_ARGUMENTS = {'export_format': 'csv', 'role': 'doctor'}
+
+
+class TestRouteQueryBudgets(TestCase):
+    def create_app(self):
+        app = create_app('testing')
+        app.config.update(UNCACHED)
+        return app
+
+    def setUp(self):
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def walked_rules(self):
+        """Get the GET rules to walk, one per endpoint."""
+        rules = {}
+        for rule in self.app.url_map.iter_rules():
+            if 'GET' in rule.methods and rule.endpoint not in SKIPPED:
+                rules.setdefault(rule.endpoint, rule)
+        return rules
+
+    def build_url(self, rule, ids):
+        """Build the URL of a rule for the fixture rows, making sure the rule's endpoint serves it."""
+        values = {}
+        for argument in rule.arguments:
+            if argument == 'id':
+                values[argument] = ids[ID_ARGUMENTS[rule.endpoint]]
+            elif argument in FIXED_ARGUMENTS:
+                values[argument] = FIXED_ARGUMENTS[argument]
+            else:
+                values[argument] = ids[argument]
+        with self.app.test_request_context():
+            url = url_for(rule.endpoint, **values)
+        endpoint, _ = self.app.url_map.bind('').match(urlsplit(url).path, method='GET')
+        self.assertEqual(endpoint, rule.endpoint,
+                         f'{url} is served by {endpoint}; add {rule.endpoint} to SKIPPED as shadowed by {endpoint}')
+        return url
+
+    def measure(self, url):
+        """Request a URL twice and measure the second request."""
+        try:
+            self.client.get(url)
+        except Exception:
+            db.session.rollback()
+        error = None
+        with capture_statements(expire=True) as statements:
+            try:
+                status = self.client.get(url).status_code
+            except Exception as e:
+                # The test client re-raises errors of the view instead of answering 500
+                db.session.rollback()
+                status, error = 500, f'{type(e).__name__}: {e}'
+        return Measurement(status, len(statements), error)
+
+    def walk(self, rules, ids):
+        """Request every rule, returning endpoint -> Measurement."""
+        results = {}
+        # Staff endpoints first: flask_login keeps the loaded user for the rest of the test's app context
+        for principal, endpoints in ((session_id(STAFF_PRINCIPAL, ids['walker']),
+                                      sorted(set(rules) - PATIENT_ENDPOINTS)),
+                                     (session_id(PATIENT_PRINCIPAL, ids['portal_user']), sorted(PATIENT_ENDPOINTS))):
+            login(self.client, principal)
+            for endpoint in endpoints:
+                results[endpoint] = self.measure(self.build_url(rules[endpoint], ids))
+            g.pop('_login_user', None)
+        return results
+
+    def test_skipped_endpoints_exist(self):
+        endpoints = {rule.endpoint for rule in self.app.url_map.iter_rules()}
+        self.assertFalse(set(SKIPPED) - endpoints)
+        self.assertFalse(set(KNOWN_GROWTH) - endpoints)
+        self.assertFalse(set(KNOWN_ERRORS) - endpoints)
+        self.assertFalse(PATIENT_ENDPOINTS - endpoints)
+
+    def test_statement_counts_do_not_grow_with_the_hospital(self):
+        rules = self.walked_rules()
+        ids = seed_hospital(SCALE)
+        small = self.walk(rules, ids)
+        seed_hospital(SCALE * (GROWTH - 1), offset=SCALE)
+        large = self.walk(rules, ids)
+
+        failures = []
+        for endpoint in sorted(rules):
+            before, after = small[endpoint], large[endpoint]
+            failed = max(before.status, after.status) >= 500
+            if endpoint in KNOWN_ERRORS:
+                if not failed:
+                    failures.append(f'{endpoint}: no longer fails, remove it from KNOWN_ERRORS')
+            elif failed:
+                failures.append(f'{endpoint}: HTTP {before.status} / {after.status} {before.error or after.error or ""}')
+            elif endpoint in KNOWN_GROWTH:
+                if after.statements <= before.statements:
+                    failures.append(f'{endpoint}: no longer grows ({before.statements} statements), '
+                                    f'remove it from KNOWN_GROWTH')
+            elif after.statements > before.statements:
+                failures.append(f'{endpoint}: {before.statements} statements at scale {SCALE}, '
+                                f'{after.statements} at scale {SCALE * GROWTH}')
+        self.assertFalse(failures, '\n'.join(failures))
+
+
+if __name__ == '__main__':
+    unittest.main()
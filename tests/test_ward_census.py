@@ -0,0 +1,97 @@
+import unittest
+from datetime import date
+from flask_testing import TestCase
+from app import create_app, db
+from app.auth.models import Role, User
+from app.patients.models import Patient
+from app.hospital.models import Admission, Bed, Hospital, RoomClass, Ward, WardRoom
+from app.hospital.queries import group_census_by_ward, ward_census
+from helpers import capture_statements, login
+
+
+class TestWardCensus(TestCase):
+    def create_app(self):
+        return create_app('testing')
+
+    def setUp(self):
+        db.create_all()
+        role = Role(name='Nurse')
+        self.nurse = User(username='nurse', email='nurse@example.com', first_name='Florence', last_name='N')
+        self.nurse.roles.append(role)
+        self.hospital = Hospital(name='General Hospital', code='GH')
+        self.room_class = RoomClass(name='Class 1', code='C1')
+        db.session.add_all([role, self.nurse, self.hospital, self.room_class])
+        db.session.commit()
+        self.wards = 0
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def admit_patients(self, count):
+        """Add a ward with one room holding ``count`` admitted patients and one free bed."""
+        self.wards += 1
+        ward = Ward(hospital_id=self.hospital.id, name=f'Ward {self.wards}', code=f'W{self.wards}')
+        db.session.add(ward)
+        db.session.flush()
+        room = WardRoom(ward_id=ward.id, room_class_id=self.room_class.id, name=f'Room {self.wards}',
+                        code=f'R{self.wards}')
+        db.session.add(room)
+        db.session.flush()
+        db.session.add(Bed(ward_room_id=room.id, name='Free', code=f'R{self.wards}-free'))
+        for index in range(count):
+            bed = Bed(ward_room_id=room.id, name=f'Bed {index:02d}', code=f'R{self.wards}-{index}', is_occupied=True)
+            patient = Patient(first_name=f'Patient{self.wards}-{index}', last_name='Test',
+                              date_of_birth=date(1980, 1, 1), gender='Female')
+            db.session.add_all([bed, patient])
+            db.session.flush()
+            db.session.add(Admission(patient_id=patient.id, bed_id=bed.id, admitted_by=self.nurse.id))
+        db.session.commit()
+
+    def get_dashboard(self):
+        # Like a new request, start without the user already in the session
+        with capture_statements(expire=True) as statements:
+            response = self.client.get('/nurse/ward_dashboard')
+        return response, len(statements)
+
+    def test_census_rows(self):
+        self.admit_patients(2)
+        census = ward_census()
+        self.assertEqual([row.bed_name for row in census], ['Bed 00', 'Bed 01'])
+        self.assertEqual(census[0].first_name, 'Patient1-0')
+
+        ward_data = group_census_by_ward(census)
+        (ward,) = ward_data.values()
+        (room,) = ward['rooms'].values()
+        self.assertEqual(ward['ward_name'], 'Ward 1')
+        self.assertEqual(room['beds'][1]['patient']['first_name'], 'Patient1-1')
+
+    def test_occupied_bed_without_admission(self):
+        self.admit_patients(1)
+        room = WardRoom.query.first()
+        db.session.add(Bed(ward_room_id=room.id, name='Bed 99', code='R1-99', is_occupied=True))
+        db.session.commit()
+        census = ward_census()
+        self.assertEqual(len(census), 2)
+        self.assertIsNone(census[1].patient_id)
+
+    def test_dashboard_query_count_is_constant(self):
+        login(self.client, self.nurse.id)
+
+        self.admit_patients(2)
+        # Warm the per-process caches (roles) so both measurements are steady state
+        self.get_dashboard()
+        response, small_census_queries = self.get_dashboard()
+        self.assert200(response)
+        self.assertIn(b'Patient1-1', response.data)
+
+        self.admit_patients(25)
+        self.admit_patients(25)
+        response, large_census_queries = self.get_dashboard()
+        self.assert200(response)
+        self.assertIn(b'Patient3-24', response.data)
+        self.assertEqual(small_census_queries, large_census_queries)
+
+
+if __name__ == '__main__':
+    unittest.main()